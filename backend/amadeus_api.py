@@ -1,26 +1,123 @@
 """
 Amadeus API Integration for Flight Search
 """
-from amadeus import Client, ResponseError
+from amadeus import ResponseError
+from amadeus_transport import create_transport
+from call_scheduler import CallScheduler
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 import os
+import sys
+import threading
+import time
+from flight_record import FlightRecord, LegRecord
 from gowild_blackout import GoWildBlackoutDates
+from metrics import (STAGE_SECONDS, UPSTREAM_CALLS_AVOIDED, UPSTREAM_ERRORS, UPSTREAM_QUEUE_SECONDS,
+                     UPSTREAM_SECONDS, upstream_status)
+from search_cache import SearchCache
+from singleflight import SingleFlight
+
+# Default number of route pairs searched in parallel (override with AMADEUS_MAX_CONCURRENCY)
+DEFAULT_MAX_CONCURRENCY = 6
+
+# Negative caching: pairs with no offers, and pairs whose search failed with a
+# transient upstream error, are cached as empty for a shorter time than real results
+NEGATIVE_CACHE_EMPTY_TTL = float(os.environ.get('NEGATIVE_CACHE_EMPTY_TTL', '900'))
+NEGATIVE_CACHE_ERROR_TTL = float(os.environ.get('NEGATIVE_CACHE_ERROR_TTL', '30'))
+NEGATIVE_CACHE_ERROR_MAX_TTL = float(os.environ.get('NEGATIVE_CACHE_ERROR_MAX_TTL', '600'))
+
+
+def is_transient_error(error):
+    """True for rate limiting (429), server errors (5xx) and failures with no response"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return not status or status == 429 or status >= 500
+
+
+def _retry_after(error):
+    """Seconds from a Retry-After header on the error's response, if any"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+AIRLINE_NAMES = {
+    'F9': 'Frontier Airlines',
+    'AA': 'American Airlines',
+    'UA': 'United Airlines',
+    'DL': 'Delta Air Lines',
+    'WN': 'Southwest Airlines',
+    'B6': 'JetBlue Airways',
+    'NK': 'Spirit Airlines',
+    'AS': 'Alaska Airlines',
+}
+
+
+@lru_cache(maxsize=4096)
+def _format_timestamp(timestamp):
+    """
+    Split an ISO timestamp into interned ('02:30 PM', '2024-01-15') strings.
+
+    Offers on the same route repeat the same handful of departure and arrival
+    times, so these are memoized.
+    """
+    # Format: 2024-01-15T14:30:00
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return sys.intern(parsed.strftime('%I:%M %p')), sys.intern(parsed.strftime('%Y-%m-%d'))
 
 class AmadeusFlightSearch:
-    def __init__(self, api_key=None, api_secret=None):
-        """Initialize Amadeus client with API credentials"""
+    def __init__(self, api_key=None, api_secret=None, max_concurrency=None, pair_cache=None, transport=None,
+                 scheduler=None, route_network=None):
+        """
+        Initialize Amadeus client with API credentials
+
+        Args:
+            api_key: Amadeus API key (defaults to AMADEUS_API_KEY)
+            api_secret: Amadeus API secret (defaults to AMADEUS_API_SECRET)
+            max_concurrency: Maximum route pairs searched in parallel
+                (defaults to AMADEUS_MAX_CONCURRENCY; 1 searches sequentially)
+            pair_cache: Optional SearchCache holding results per route pair, shared
+                by every search so overlapping requests reuse each other's pairs
+            transport: Optional flight offers transport (see amadeus_transport.py);
+                defaults to the mode selected by AMADEUS_TRANSPORT
+            scheduler: Optional CallScheduler rate limiting upstream calls by
+                priority class; defaults to one sized by AMADEUS_RATE_LIMIT
+            route_network: Optional RouteNetwork (see load_route_network) used to
+                drop pairs Frontier does not fly from "ANY" searches
+
+        Raises:
+            ValueError: If credentials are missing for a transport that needs them
+        """
         self.api_key = api_key or os.environ.get('AMADEUS_API_KEY')
         self.api_secret = api_secret or os.environ.get('AMADEUS_API_SECRET')
 
-        if not self.api_key or not self.api_secret:
-            raise ValueError("Amadeus API credentials not provided")
-
-        self.amadeus = Client(
-            client_id=self.api_key,
-            client_secret=self.api_secret
-        )
-
-    def search_flights(self, origins, destinations, departure_date, return_date=None, adults=1, callback=None):
+        if transport is None:
+            transport = create_transport(api_key=self.api_key, api_secret=self.api_secret)
+        self.transport = transport
+        self.scheduler = scheduler or CallScheduler()
+
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get('AMADEUS_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._executors = {}
+        self._executor_lock = threading.Lock()
+        self.pair_cache = pair_cache
+        self.route_network = route_network
+
+        # Why each negatively cached pair is empty ('empty' or 'error') and how many
+        # times in a row it has failed; kept past the pair entry so backoff can grow
+        self.negative_pairs = SearchCache(ttl_seconds=4 * NEGATIVE_CACHE_ERROR_MAX_TTL, max_entries=20000,
+                                          max_bytes=8 * 1024 * 1024)
+        self._negative_stats = {'empty_cached': 0, 'errors_cached': 0, 'errors_not_cached': 0,
+                                'upstream_calls_avoided': 0}
+        self._negative_lock = threading.Lock()
+
+        # Concurrent searches for the same pair share one upstream call
+        self.pair_flights = SingleFlight()
+
+    def search_flights(self, origins, destinations, departure_date, return_date=None, adults=1, callback=None, stats=None,
+                       priority='interactive'):
         """
         Search for flights using Amadeus API
 
@@ -30,61 +127,324 @@ class AmadeusFlightSearch:
             departure_date: Departure date in YYYY-MM-DD format
             return_date: Optional return date for round-trip
             adults: Number of adult passengers
-            callback: Optional callback function(route, flights) called for each route with results
+            callback: Optional callback function(route, flights) called for each route with results.
+                Routes are reported in completion order, always on the calling thread.
+            stats: Optional dict filled with 'pairs_total', 'pairs_cached', 'pairs_fetched',
+                'pairs_pruned', 'pairs_failed' and 'retry_after' (see record_pair_failures)
+            priority: Scheduler priority class for upstream calls ('interactive',
+                'planner' or 'background')
 
         Returns:
-            List of flight dictionaries matching our app's format
+            List of flight dictionaries matching our app's format, ordered by
+            origin then destination regardless of which route finished first
         """
+        # Build every origin-destination pair up front so results keep a fixed order
+        pairs = self.expand_pairs(origins, destinations, stats)
+        pair_results = [None] * len(pairs)
+
+        # Serve whatever pairs are already cached, only fetch the rest
+        missing = []
+        for index, (origin, destination) in enumerate(pairs):
+            cached = self.cached_pair(origin, destination, departure_date, return_date, adults)
+            if cached is None:
+                missing.append(index)
+                continue
+
+            pair_results[index] = cached
+            if callback and cached:
+                callback(f"{origin}->{destination}", cached)
+
+        if stats is not None:
+            stats['pairs_total'] = len(pairs)
+            stats['pairs_cached'] = len(pairs) - len(missing)
+            stats['pairs_fetched'] = len(missing)
+
+        if self.max_concurrency <= 1 or len(missing) <= 1:
+            # Sequential mode: search each pair in turn
+            for index in missing:
+                origin, destination = pairs[index]
+                flights = self._search_pair(origin, destination, departure_date, return_date, adults, priority)
+                pair_results[index] = flights
+
+                # Call callback with results for this route if provided
+                if callback and flights:
+                    callback(f"{origin}->{destination}", flights)
+        else:
+            # Concurrent mode: fan pairs out to the shared pool, report each as it finishes
+            executor = self._get_executor(priority)
+            futures = {
+                executor.submit(self._search_pair, *pairs[index], departure_date, return_date, adults, priority): index
+                for index in missing
+            }
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    flights = future.result()
+                    pair_results[index] = flights
+
+                    # Callback runs on the caller's thread, in completion order
+                    if callback and flights:
+                        origin, destination = pairs[index]
+                        callback(f"{origin}->{destination}", flights)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        if stats is not None:
+            self.record_pair_failures(stats, pairs, departure_date, return_date, adults)
+
+        # Flatten in origin/destination order regardless of completion order
         all_flights = []
+        for flights in pair_results:
+            all_flights.extend(flights)
 
-        # Handle "ANY" destination
+        return all_flights
+
+    def expand_destinations(self, origins, destinations):
+        """Replace ['ANY'] with the popular destinations searched for these origins"""
         if destinations == ['ANY']:
             # Get popular destinations (we'll need to define these or use a different approach)
-            destinations = self._get_popular_destinations(origins)
+            return self._get_popular_destinations(origins)
+        return destinations
 
-        # Search each origin-destination pair
-        for origin in origins:
-            for destination in destinations:
-                if origin == destination:
-                    continue
+    def expand_pairs(self, origins, destinations, stats=None):
+        """
+        Origin-destination pairs to search, in origin then destination order.
 
-                try:
-                    # Build search parameters
-                    search_params = {
-                        'originLocationCode': origin,
-                        'destinationLocationCode': destination,
-                        'departureDate': departure_date,
-                        'adults': adults,
-                        'max': 250,  # Request more to get enough Frontier results after filtering
-                        'includedAirlineCodes': 'F9'  # Filter for Frontier Airlines only (F9)
-                    }
-
-                    # Only add returnDate if it's provided (for round-trip)
-                    if return_date:
-                        search_params['returnDate'] = return_date
-
-                    # Search one-way or round-trip
-                    response = self.amadeus.shopping.flight_offers_search.get(**search_params)
-
-                    # Convert Amadeus format to our app format
-                    flights = self._convert_amadeus_to_app_format(response.data, origin, destination)
-                    all_flights.extend(flights)
-
-                    # Call callback with results for this route if provided
-                    if callback and flights:
-                        callback(f"{origin}->{destination}", flights)
+        For ['ANY'], pairs from the popular destinations list that the route
+        network index says Frontier does not fly are dropped (counted in
+        stats['pairs_pruned']); the index only ever removes calls.
+        """
+        expanded = self.expand_destinations(origins, destinations)
+        pairs = [
+            (origin, destination)
+            for origin in origins
+            for destination in expanded
+            if origin != destination
+        ]
+
+        pruned = 0
+        if destinations == ['ANY'] and self.route_network is not None:
+            served = [pair for pair in pairs if self.route_network.serves(*pair)]
+            pruned = len(pairs) - len(served)
+            pairs = served
+        if stats is not None:
+            stats['pairs_pruned'] = pruned
+        return pairs
+
+    def refresh_pair(self, origin, destination, departure_date, return_date=None, adults=1, priority='background'):
+        """
+        Fetch a single pair upstream even if it is cached, replacing the cached results.
 
-                except ResponseError as error:
-                    print(f"Error searching {origin} to {destination}: {error}")
-                    print(f"Error details: {error.response.body if hasattr(error, 'response') else 'No details'}")
+        Used by the cache warmer to refresh popular pairs before they expire, and
+        by the fare calendar for cells missing from the pair cache.
+
+        Returns:
+            List of flight dictionaries for the pair
+        """
+        return self._search_pair(origin, destination, departure_date, return_date, adults, priority)
+
+    def _search_pair(self, origin, destination, departure_date, return_date=None, adults=1, priority='interactive'):
+        """Search a single origin-destination pair, joining an identical search already in flight"""
+        key = self.pair_cache_key(origin, destination, departure_date, return_date, adults)
+        ticket = self.scheduler.ticket(priority)
+        flights, _ = self.pair_flights.do(
+            key,
+            lambda: self._fetch_pair(origin, destination, departure_date, return_date, adults, ticket),
+            context=ticket,
+            # A follower never waits at a lower priority than its own: the leader's
+            # queued call is promoted (e.g. a user joining a warmer refresh)
+            on_join=lambda leader_ticket: self.scheduler.promote(leader_ticket, priority)
+        )
+        return flights
+
+    def _fetch_pair(self, origin, destination, departure_date, return_date, adults, ticket):
+        """Search a single origin-destination pair upstream and convert the results"""
+        search_params = self.build_search_params(origin, destination, departure_date, return_date, adults)
+
+        # Search one-way or round-trip once the scheduler grants a slot under the rate limit
+        waited = self.scheduler.acquire(ticket=ticket)
+        UPSTREAM_QUEUE_SECONDS.labels(ticket.priority).observe(waited)
+        started = time.perf_counter()
+        try:
+            offers = self.transport.search_flight_offers(search_params)
+        except ResponseError as error:
+            UPSTREAM_SECONDS.labels('error').observe(time.perf_counter() - started)
+            return self.handle_pair_error(error, origin, destination, departure_date, return_date, adults)
+        UPSTREAM_SECONDS.labels('ok').observe(time.perf_counter() - started)
+
+        return self.store_pair_offers(offers, origin, destination, departure_date, return_date, adults)
+
+    @staticmethod
+    def build_search_params(origin, destination, departure_date, return_date=None, adults=1):
+        """Flight offers search parameters for a single pair"""
+        search_params = {
+            'originLocationCode': origin,
+            'destinationLocationCode': destination,
+            'departureDate': departure_date,
+            'adults': adults,
+            'max': 250,  # Request more to get enough Frontier results after filtering
+            'includedAirlineCodes': 'F9'  # Filter for Frontier Airlines only (F9)
+        }
+
+        # Only add returnDate if it's provided (for round-trip)
+        if return_date:
+            search_params['returnDate'] = return_date
+        return search_params
+
+    def store_pair_offers(self, offers, origin, destination, departure_date, return_date=None, adults=1):
+        """
+        Convert a pair's Amadeus offers to our app format and cache them.
+
+        Pairs with no Frontier offers are cached for NEGATIVE_CACHE_EMPTY_TTL only.
+        """
+        with STAGE_SECONDS.labels('convert').time():
+            flights = self._convert_amadeus_to_app_format(offers, origin, destination)
+
+        if self.pair_cache is not None:
+            key = self.pair_cache_key(origin, destination, departure_date, return_date, adults)
+            if flights:
+                self.pair_cache.set(key, flights)
+                self.negative_pairs.delete(key)
+            else:
+                self._cache_negative(key, 'empty', NEGATIVE_CACHE_EMPTY_TTL)
+        return flights
+
+    def handle_pair_error(self, error, origin, destination, departure_date, return_date=None, adults=1):
+        """
+        Log a failed pair search; the pair contributes no flights.
+
+        Transient failures (429, 5xx, network) are cached as empty with an
+        exponential backoff TTL: NEGATIVE_CACHE_ERROR_TTL doubled for each
+        consecutive failure, at least the Retry-After delay, at most
+        NEGATIVE_CACHE_ERROR_MAX_TTL. Other 4xx (invalid request) errors are
+        not cached.
+        """
+        UPSTREAM_ERRORS.labels(upstream_status(error)).inc()
+        print(f"Error searching {origin} to {destination}: {error}")
+        print(f"Error details: {error.response.body if hasattr(error, 'response') else 'No details'}")
+
+        if self.pair_cache is None:
+            return []
+        if not is_transient_error(error):
+            self._count_negative('errors_not_cached')
+            return []
+
+        key = self.pair_cache_key(origin, destination, departure_date, return_date, adults)
+        previous = self.negative_pairs.get(key)
+        failures = previous['failures'] + 1 if previous and previous['reason'] == 'error' else 1
+        ttl = NEGATIVE_CACHE_ERROR_TTL * 2 ** (failures - 1)
+        ttl = min(max(ttl, _retry_after(error) or 0), NEGATIVE_CACHE_ERROR_MAX_TTL)
+        self._cache_negative(key, 'error', ttl, failures)
+        return []
+
+    def record_pair_failures(self, stats, pairs, departure_date, return_date=None, adults=1):
+        """
+        Record in stats which of a search's pairs failed upstream.
+
+        Sets 'pairs_failed' to the pairs answered by an error (backing off, or
+        an uncached invalid-request error) and 'retry_after' to the soonest a
+        backoff lapses, or None if no pair is backing off. Callers cache the
+        whole search no longer than retry_after, so the failed pairs are
+        searched again once their backoff ends.
+        """
+        failed = 0
+        retry_after = None
+        if self.pair_cache is not None:
+            for origin, destination in pairs:
+                key = self.pair_cache_key(origin, destination, departure_date, return_date, adults)
+                ttl = self.pair_cache.ttl_remaining(key)
+                if ttl is None:
+                    # Only invalid requests (4xx) are left uncached after a search
+                    failed += 1
                     continue
+                entry = self.negative_pairs.get(key)
+                if entry and entry['reason'] == 'error':
+                    failed += 1
+                    retry_after = ttl if retry_after is None else min(retry_after, ttl)
+        stats['pairs_failed'] = failed
+        stats['retry_after'] = retry_after
+
+    def _cache_negative(self, key, reason, ttl, failures=0):
+        """Cache a pair as empty for ttl seconds and remember why"""
+        self.pair_cache.set(key, [], ttl_seconds=ttl)
+        # The reason outlives the pair entry so the next failure backs off further
+        self.negative_pairs.set(key, {'reason': reason, 'failures': failures},
+                                ttl_seconds=ttl + NEGATIVE_CACHE_ERROR_MAX_TTL)
+        self._count_negative('errors_cached' if reason == 'error' else 'empty_cached')
+
+    def _count_negative(self, name):
+        with self._negative_lock:
+            self._negative_stats[name] += 1
+
+    def negative_reason(self, key):
+        """'empty' or 'error' if the pair cache entry for key is a negative entry, else None"""
+        if self.pair_cache is None or self.pair_cache.ttl_remaining(key) is None:
+            return None
+        entry = self.negative_pairs.get(key)
+        return entry['reason'] if entry else None
+
+    def negative_cache_stats(self):
+        """Negative entries written, and the upstream calls they answered instead"""
+        with self._negative_lock:
+            stats = dict(self._negative_stats)
+        stats['tracked_pairs'] = self.negative_pairs.stats()['total_entries']
+        stats['empty_ttl_seconds'] = NEGATIVE_CACHE_EMPTY_TTL
+        stats['error_ttl_seconds'] = [NEGATIVE_CACHE_ERROR_TTL, NEGATIVE_CACHE_ERROR_MAX_TTL]
+        return stats
+
+    @staticmethod
+    def pair_cache_key(origin, destination, departure_date, return_date=None, adults=1):
+        """Generate the cache key for a single route pair search"""
+        return f"pair:{origin}_{destination}_{departure_date}_{return_date}_{adults}"
+
+    def cached_pair(self, origin, destination, departure_date, return_date=None, adults=1):
+        """
+        Cached flights for a single pair, without searching upstream.
 
-        return all_flights
+        Used by the async search path and the fare calendar to read the pair
+        cache; an empty list is a negative entry (no offers, or backing off).
+
+        Returns:
+            List of flight dictionaries, or None if the pair is not cached
+        """
+        if self.pair_cache is None:
+            return None
+        key = self.pair_cache_key(origin, destination, departure_date, return_date, adults)
+        flights = self.pair_cache.get(key)
+        if flights is not None and not flights:
+            # A negative entry: no offers, or a recent transient failure
+            entry = self.negative_pairs.get(key)
+            UPSTREAM_CALLS_AVOIDED.labels(entry['reason'] if entry else 'empty').inc()
+            self._count_negative('upstream_calls_avoided')
+        return flights
+
+    def _get_executor(self, priority='interactive'):
+        """
+        Lazily create the pool shared by every search of a priority class.
+
+        Each class gets its own pool so interactive pairs never queue behind a
+        planner sweep's backlog; the scheduler decides who calls upstream next.
+        """
+        with self._executor_lock:
+            executor = self._executors.get(priority)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix=f"amadeus-search-{priority}"
+                )
+                self._executors[priority] = executor
+            return executor
 
     def _convert_amadeus_to_app_format(self, amadeus_offers, origin, destination):
-        """Convert Amadeus flight offers to our app's format"""
+        """Convert Amadeus flight offers to compact FlightRecords (see flight_record.py)"""
         flights = []
 
+        # Every offer on the same date pair shares one blackout info dict
+        blackout_by_dates = {}
+        origin = sys.intern(origin)
+        destination = sys.intern(destination)
+
         for offer in amadeus_offers:
             try:
                 # Get price (applies to the whole trip)
@@ -108,10 +468,14 @@ class AmadeusFlightSearch:
                 if is_round_trip:
                     return_date = itineraries[1]['segments'][0]['departure']['at'][:10]
 
-                blackout_info = GoWildBlackoutDates.is_flight_affected_by_blackout(
-                    departure_date,
-                    return_date
-                )
+                blackout_info = blackout_by_dates.get((departure_date, return_date))
+                if blackout_info is None:
+                    with STAGE_SECONDS.labels('blackout').time():
+                        blackout_info = GoWildBlackoutDates.is_flight_affected_by_blackout(
+                            departure_date,
+                            return_date
+                        )
+                    blackout_by_dates[(departure_date, return_date)] = blackout_info
 
                 # Convert to USD if needed (rough conversion for test API)
                 # In production, you'd want real-time exchange rates
@@ -121,32 +485,28 @@ class AmadeusFlightSearch:
 
                 if is_round_trip:
                     # Process as round-trip with outbound and return flights
-                    outbound = self._parse_itinerary(itineraries[0], origin, destination)
-                    return_flight = self._parse_itinerary(itineraries[1], destination, origin)
-
-                    flight = {
-                        **outbound,
-                        'price': round(price, 2),
-                        'currency': currency,
-                        'is_round_trip': True,
-                        'return_flight': return_flight,
-                        'total_price': round(price, 2),  # Total for both directions
-                        'seats_remaining': seats_remaining,
-                        'gowild_eligible': gowild_eligible,
-                        'blackout_dates': blackout_info
-                    }
+                    flight = FlightRecord(
+                        self._parse_itinerary(itineraries[0], origin, destination),
+                        round(price, 2),
+                        sys.intern(currency),
+                        is_round_trip=True,
+                        return_flight=self._parse_itinerary(itineraries[1], destination, origin),
+                        total_price=round(price, 2),  # Total for both directions
+                        seats_remaining=seats_remaining,
+                        gowild_eligible=gowild_eligible,
+                        blackout_dates=blackout_info
+                    )
                 else:
                     # One-way flight
-                    flight_data = self._parse_itinerary(itineraries[0], origin, destination)
-                    flight = {
-                        **flight_data,
-                        'price': round(price, 2),
-                        'currency': currency,
-                        'is_round_trip': False,
-                        'seats_remaining': seats_remaining,
-                        'gowild_eligible': gowild_eligible,
-                        'blackout_dates': blackout_info
-                    }
+                    flight = FlightRecord(
+                        self._parse_itinerary(itineraries[0], origin, destination),
+                        round(price, 2),
+                        sys.intern(currency),
+                        is_round_trip=False,
+                        seats_remaining=seats_remaining,
+                        gowild_eligible=gowild_eligible,
+                        blackout_dates=blackout_info
+                    )
 
                 flights.append(flight)
 
@@ -163,41 +523,40 @@ class AmadeusFlightSearch:
         last_segment = segments[-1]
 
         # Parse times
-        departure_time = self._parse_datetime(first_segment['departure']['at'])
-        arrival_time = self._parse_datetime(last_segment['arrival']['at'])
-
-        # Calculate duration
-        duration = itinerary['duration']  # Format: PT2H30M
+        departure_time, departure_date = _format_timestamp(first_segment['departure']['at'])
+        arrival_time, arrival_date = _format_timestamp(last_segment['arrival']['at'])
 
         # Count stops
         stops = len(segments) - 1
 
         # Get airline info
         airline_code = first_segment['carrierCode']
-        flight_number = f"{airline_code}{first_segment['number']}"
-
-        return {
-            'origin': origin,
-            'destination': destination,
-            'departure_time': departure_time.strftime('%I:%M %p'),  # 12-hour format with AM/PM
-            'arrival_time': arrival_time.strftime('%I:%M %p'),      # 12-hour format with AM/PM
-            'departure_date': departure_time.strftime('%Y-%m-%d'),
-            'arrival_date': arrival_time.strftime('%Y-%m-%d'),
-            'duration': self._format_duration(duration),
-            'airline': self._get_airline_name(airline_code),
-            'flight_number': flight_number,
-            'stops': stops,
-            'aircraft': last_segment.get('aircraft', {}).get('code', 'N/A'),
-            'booking_class': segments[0].get('cabin', 'Economy')
-        }
+        flight_number = sys.intern(f"{airline_code}{first_segment['number']}")
+
+        return LegRecord(
+            origin,
+            destination,
+            departure_time,  # 12-hour format with AM/PM
+            arrival_time,
+            departure_date,
+            arrival_date,
+            self._format_duration(itinerary['duration']),  # Format: PT2H30M
+            self._get_airline_name(airline_code),
+            flight_number,
+            stops,
+            sys.intern(last_segment.get('aircraft', {}).get('code', 'N/A')),
+            sys.intern(segments[0].get('cabin', 'Economy'))
+        )
 
     def _parse_datetime(self, datetime_str):
         """Parse ISO datetime string"""
         # Format: 2024-01-15T14:30:00
         return datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
 
-    def _format_duration(self, duration_str):
-        """Convert PT2H30M to '2h 30m' format"""
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _format_duration(duration_str):
+        """Convert PT2H30M to '2h 30m' format (memoized; results are interned)"""
         # Remove PT prefix
         duration_str = duration_str.replace('PT', '')
 
@@ -213,25 +572,15 @@ class AmadeusFlightSearch:
             minutes = int(duration_str.replace('M', ''))
 
         if hours and minutes:
-            return f"{hours}h {minutes}m"
+            return sys.intern(f"{hours}h {minutes}m")
         elif hours:
-            return f"{hours}h"
+            return sys.intern(f"{hours}h")
         else:
-            return f"{minutes}m"
+            return sys.intern(f"{minutes}m")
 
     def _get_airline_name(self, code):
         """Map airline codes to names"""
-        airline_map = {
-            'F9': 'Frontier Airlines',
-            'AA': 'American Airlines',
-            'UA': 'United Airlines',
-            'DL': 'Delta Air Lines',
-            'WN': 'Southwest Airlines',
-            'B6': 'JetBlue Airways',
-            'NK': 'Spirit Airlines',
-            'AS': 'Alaska Airlines',
-        }
-        return airline_map.get(code, code)
+        return AIRLINE_NAMES.get(code) or sys.intern(code)
 
     def _is_gowild_eligible(self, offer):
         """
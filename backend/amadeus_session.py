@@ -0,0 +1,318 @@
+"""
+Amadeus Session - Shared OAuth tokens and keep-alive connections
+
+The amadeus SDK opens a new urllib connection (and TLS handshake) for every
+call and each Client fetches its own OAuth token. This module plugs into the
+SDK's extension points instead:
+
+- KeepAlivePool is a urlopen-compatible `http` callable that reuses
+  persistent connections per host
+- SharedAccessToken replaces the Client's access token so every thread
+  shares one token, and with a SQLiteTokenStore every worker process on the
+  host shares it too, until it expires
+
+Both report per-minute handshake and token fetch counts.
+"""
+from collections import deque
+from urllib.error import URLError
+from urllib.parse import urlsplit
+import hashlib
+import http.client
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_HTTP_TIMEOUT = 30.0
+
+# Refresh tokens this many seconds before they expire (same as the SDK)
+TOKEN_BUFFER = 10
+
+
+class EventRate:
+    """Counts events in total and over the last minute"""
+
+    def __init__(self):
+        self.total = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def add(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.total += 1
+            self._recent.append(now)
+            self._trim(now)
+
+    def per_minute(self) -> int:
+        with self._lock:
+            self._trim(time.monotonic())
+            return len(self._recent)
+
+    def _trim(self, now):
+        while self._recent and self._recent[0] <= now - 60:
+            self._recent.popleft()
+
+
+class PooledResponse:
+    """Fully read response, shaped like what urlopen returns to the SDK"""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self._headers = headers
+        self._body = body
+
+    def getheaders(self):
+        return self._headers.items()
+
+    def info(self):
+        return self._headers
+
+    def read(self):
+        return self._body
+
+
+class KeepAlivePool:
+    """
+    urlopen-compatible callable that keeps persistent connections per host.
+
+    Up to max_idle connections per host are kept open between calls; extra
+    concurrent calls open a connection that is closed afterwards. Pass as the
+    amadeus.Client `http` option.
+    """
+
+    def __init__(self, max_idle: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            max_idle: Idle connections kept per host (defaults to AMADEUS_POOL_SIZE)
+            timeout: Socket timeout in seconds (defaults to AMADEUS_HTTP_TIMEOUT)
+        """
+        if max_idle is None:
+            max_idle = int(os.environ.get('AMADEUS_POOL_SIZE', DEFAULT_POOL_SIZE))
+        if timeout is None:
+            timeout = float(os.environ.get('AMADEUS_HTTP_TIMEOUT', DEFAULT_HTTP_TIMEOUT))
+        self.max_idle = max(0, max_idle)
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+        self.requests = EventRate()
+        self.handshakes = EventRate()
+        self.reused = 0
+
+    def __call__(self, http_request):
+        url = urlsplit(http_request.full_url)
+        host_key = (url.scheme, url.hostname, url.port)
+        path = url.path + (f"?{url.query}" if url.query else '')
+        headers = dict(http_request.header_items())
+        self.requests.add()
+
+        # A reused connection may have been closed by the server: retry once on a new one
+        for attempt in range(2):
+            connection, reused = self._checkout(host_key)
+            try:
+                connection.request(http_request.get_method(), path, body=http_request.data, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise URLError(e)
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(host_key, connection)
+            return PooledResponse(response.status, response.msg, body)
+
+    def _checkout(self, host_key):
+        with self._lock:
+            idle = self._idle.get(host_key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+
+        scheme, hostname, port = host_key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self.handshakes.add()
+        return connection_class(hostname, port, timeout=self.timeout), False
+
+    def _checkin(self, host_key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(host_key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = sum(len(connections) for connections in self._idle.values())
+        return {
+            'max_idle_per_host': self.max_idle,
+            'idle_connections': idle,
+            'requests_total': self.requests.total,
+            'requests_per_minute': self.requests.per_minute(),
+            'handshakes_total': self.handshakes.total,
+            'handshakes_per_minute': self.handshakes.per_minute(),
+            'reused_connections': self.reused
+        }
+
+
+def token_key(host: str, client_id: str) -> str:
+    """Store key for a host and API key (the secret is never stored)"""
+    return hashlib.sha256(f"{host}:{client_id}".encode()).hexdigest()
+
+
+class SQLiteTokenStore:
+    """
+    OAuth access tokens shared by every process on the host.
+
+    Fetching happens inside a write transaction, so when a token expires only
+    one process fetches a new one and the others wait for it.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 10000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS tokens ('
+            ' key TEXT PRIMARY KEY,'
+            ' access_token TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        conn.commit()
+        # Tokens are credentials: keep the file private to this user
+        os.chmod(path, 0o600)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return (access_token, expires_at) if a valid token is stored, else None"""
+        row = self._connect().execute(
+            'SELECT access_token, expires_at FROM tokens WHERE key = ? AND expires_at > ?',
+            (key, time.time() + TOKEN_BUFFER)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, key: str, access_token: str, expires_at: float) -> None:
+        self._connect().execute(
+            'INSERT OR REPLACE INTO tokens (key, access_token, expires_at) VALUES (?, ?, ?)',
+            (key, access_token, expires_at)
+        )
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Tuple[str, float]]) -> Tuple[str, float, bool]:
+        """
+        Return the stored token if still valid, otherwise fetch and store a new one.
+
+        Args:
+            key: Token key (see token_key)
+            fetch: Callable returning (access_token, expires_at_epoch)
+
+        Returns:
+            Tuple of (access_token, expires_at, fetched)
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT access_token, expires_at FROM tokens WHERE key = ? AND expires_at > ?',
+                (key, time.time() + TOKEN_BUFFER)
+            ).fetchone()
+            if row:
+                conn.execute('COMMIT')
+                return row[0], row[1], False
+
+            access_token, expires_at = fetch()
+            conn.execute(
+                'INSERT OR REPLACE INTO tokens (key, access_token, expires_at) VALUES (?, ?, ?)',
+                (key, access_token, expires_at)
+            )
+            conn.execute('COMMIT')
+            return access_token, expires_at, True
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+
+class SharedAccessToken:
+    """
+    Drop-in replacement for the amadeus SDK's per-client AccessToken.
+
+    Thread-safe (the SDK's token can be refreshed by several threads at once)
+    and optionally backed by a SQLiteTokenStore shared across processes.
+    """
+
+    def __init__(self, client, store: Optional[SQLiteTokenStore] = None):
+        self.client = client
+        self.store = store
+        self.key = token_key(client.host, client.client_id)
+        self.access_token = None
+        self.expires_at = 0
+        self._lock = threading.Lock()
+
+        self.fetches = EventRate()
+        self.store_hits = 0
+
+    def _bearer_token(self):
+        """Called by the SDK for every authenticated request"""
+        return f"Bearer {self.token()}"
+
+    def token(self) -> str:
+        if self._is_valid():
+            return self.access_token
+
+        with self._lock:
+            if not self._is_valid():
+                if self.store is not None:
+                    self.access_token, self.expires_at, fetched = self.store.get_or_fetch(self.key, self._fetch)
+                    if not fetched:
+                        self.store_hits += 1
+                else:
+                    self.access_token, self.expires_at = self._fetch()
+            return self.access_token
+
+    def _is_valid(self):
+        return self.access_token is not None and time.time() + TOKEN_BUFFER < self.expires_at
+
+    def _fetch(self):
+        response = self.client._unauthenticated_request(
+            'POST',
+            '/v1/security/oauth2/token',
+            {
+                'grant_type': 'client_credentials',
+                'client_id': self.client.client_id,
+                'client_secret': self.client.client_secret
+            }
+        )
+        self.fetches.add()
+        return response.result['access_token'], time.time() + response.result.get('expires_in', 0)
+
+    def stats(self) -> dict:
+        return {
+            'shared_store': self.store.path if self.store is not None else None,
+            'token_fetches_total': self.fetches.total,
+            'token_fetches_per_minute': self.fetches.per_minute(),
+            'token_store_hits': self.store_hits,
+            'expires_in_seconds': max(0, int(self.expires_at - time.time())) if self.access_token else None
+        }
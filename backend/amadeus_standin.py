@@ -0,0 +1,171 @@
+"""
+Amadeus Stand-in Server - Local HTTP replacement for the Amadeus API
+
+Serves the two endpoints AmadeusFlightSearch uses (OAuth token and
+flight-offers search) from recorded responses or synthetic offers, with
+per-route latency and error injection from a LatencyProfile. Point the app at
+it with AMADEUS_TRANSPORT=replay and AMADEUS_STANDIN_URL.
+
+Usage:
+    python amadeus_standin.py --mode replay --recordings fixtures/recordings --port 5055
+    python amadeus_standin.py --mode synthetic --profile profile.json
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+import argparse
+import json
+import os
+import threading
+import time
+from amadeus_transport import (
+    DEFAULT_RECORDINGS_DIR, LatencyProfile, generate_synthetic_offers, recording_key
+)
+
+STANDIN_MODES = ('replay', 'synthetic')
+
+
+class AmadeusStandInHandler(BaseHTTPRequestHandler):
+    """Request handler; configuration lives on the server object"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+
+        if urlparse(self.path).path != '/v1/security/oauth2/token':
+            self._send_json(404, {'errors': [{'status': 404, 'title': 'Not found'}]})
+            return
+
+        self.server.count('token_requests')
+        self._send_json(200, {
+            'type': 'amadeusOAuth2Token',
+            'token_type': 'Bearer',
+            'access_token': 'standin-token',
+            'expires_in': 1799,
+            'state': 'approved'
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            self._send_json(200, self.server.stats())
+            return
+        if url.path != '/v2/shopping/flight-offers':
+            self._send_json(404, {'errors': [{'status': 404, 'title': 'Not found'}]})
+            return
+
+        params = dict(parse_qsl(url.query))
+        if not all(params.get(key) for key in ('originLocationCode', 'destinationLocationCode', 'departureDate')):
+            self._send_json(400, {'errors': [{'status': 400, 'title': 'Missing required search parameters'}]})
+            return
+
+        origin, destination = params['originLocationCode'], params['destinationLocationCode']
+        profile = self.server.profile
+        time.sleep(profile.sample_latency(origin, destination))
+
+        injected = profile.sample_error(origin, destination)
+        if injected is not None:
+            self.server.count(f"errors_{injected}")
+            self._send_json(injected, {'errors': [{'status': injected, 'title': 'Injected error'}]})
+            return
+
+        status, body = self.server.respond(params)
+        self.server.count('searches')
+        self._send_json(status, body)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/vnd.amadeus+json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AmadeusStandInServer(ThreadingHTTPServer):
+    """Threaded stand-in server serving recorded or synthetic flight offers"""
+
+    daemon_threads = True
+
+    def __init__(self, address, mode='replay', recordings_dir=DEFAULT_RECORDINGS_DIR, profile=None,
+                 offers_per_pair=20, fallback_synthetic=False, verbose=False):
+        if mode not in STANDIN_MODES:
+            raise ValueError(f"Unknown stand-in mode '{mode}'")
+        super().__init__(address, AmadeusStandInHandler)
+        self.mode = mode
+        self.recordings_dir = recordings_dir
+        self.profile = profile or LatencyProfile()
+        self.offers_per_pair = offers_per_pair
+        self.fallback_synthetic = fallback_synthetic
+        self.verbose = verbose
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def respond(self, params):
+        """Status and body for a flight offers search"""
+        if self.mode == 'synthetic':
+            return 200, {'data': generate_synthetic_offers(params, self.offers_per_pair)}
+
+        path = os.path.join(self.recordings_dir, f"{recording_key(params)}.json")
+        if not os.path.exists(path):
+            self.count('replay_misses')
+            if self.fallback_synthetic:
+                return 200, {'data': generate_synthetic_offers(params, self.offers_per_pair)}
+            return 200, {'meta': {'count': 0}, 'data': []}
+
+        with open(path) as f:
+            recording = json.load(f)
+        status = recording.get('status') or 200
+        if status != 200:
+            return status, recording.get('errors') or {'errors': [{'status': status}]}
+        return 200, {'meta': {'count': len(recording['data'])}, 'data': recording['data']}
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {'mode': self.mode, **self._counters}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the Amadeus flight offers API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--mode', choices=STANDIN_MODES, default='replay')
+    parser.add_argument('--recordings', default=DEFAULT_RECORDINGS_DIR, help='Directory of recorded responses')
+    parser.add_argument('--profile', help='LatencyProfile JSON (per-route latency and error rates)')
+    parser.add_argument('--offers-per-pair', type=int, default=20, help='Offers per synthetic response')
+    parser.add_argument('--fallback-synthetic', action='store_true',
+                        help='Synthesize offers for requests with no recording')
+    parser.add_argument('--seed', type=int, help='Random seed for latency and error sampling')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    profile = LatencyProfile.from_file(args.profile, seed=args.seed) if args.profile else LatencyProfile(seed=args.seed)
+    server = AmadeusStandInServer(
+        (args.host, args.port),
+        mode=args.mode,
+        recordings_dir=args.recordings,
+        profile=profile,
+        offers_per_pair=args.offers_per_pair,
+        fallback_synthetic=args.fallback_synthetic,
+        verbose=args.verbose
+    )
+    print(f"Amadeus stand-in ({args.mode}) listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
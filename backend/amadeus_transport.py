@@ -0,0 +1,337 @@
+"""
+Amadeus Transports - Pluggable backends for flight offers searches
+
+AmadeusFlightSearch sends every flight-offers request through a transport:
+
+- sdk:       the real Amadeus API through amadeus.Client (default)
+- record:    the real API, with every response (including errors) saved to disk
+- replay:    amadeus.Client pointed at the local stand-in server
+             (amadeus_standin.py), which serves recorded or synthetic responses
+- synthetic: offers generated in-process, no network at all
+
+The replay and synthetic modes apply a LatencyProfile, so per-route latency
+distributions and error rates (429s, 5xx) can be reproduced without quota.
+"""
+from amadeus import Client, ResponseError
+from amadeus.mixins.parser import Parser
+from amadeus_session import KeepAlivePool, SharedAccessToken, SQLiteTokenStore
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from urllib.parse import urlparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+TRANSPORT_MODES = ('sdk', 'record', 'replay', 'synthetic')
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RECORDINGS_DIR = os.path.join(BACKEND_DIR, 'fixtures', 'recordings')
+DEFAULT_STANDIN_URL = 'http://127.0.0.1:5055'
+
+
+def recording_key(params):
+    """File-safe key identifying a flight offers search request"""
+    return '_'.join([
+        params['originLocationCode'],
+        params['destinationLocationCode'],
+        params['departureDate'],
+        params.get('returnDate') or 'oneway',
+        str(params.get('adults', 1))
+    ])
+
+
+def make_response_error(status_code, detail='Injected error'):
+    """Build the amadeus ResponseError subclass the SDK would raise for a status code"""
+    result = {'errors': [{'status': status_code, 'code': status_code, 'title': detail, 'detail': detail}]}
+    response = SimpleNamespace(
+        status_code=status_code,
+        parsed=True,
+        result=result,
+        body=json.dumps(result),
+        data=None,
+        request=None
+    )
+    error_class = Parser.error_for(status_code, True) or ResponseError
+    return error_class(response)
+
+
+class LatencyProfile:
+    """
+    Per-route latency distributions and error rates for stand-in traffic.
+
+    Config format (all keys optional):
+        {
+            "default": {
+                "latency_ms": {"distribution": "lognormal", "median": 400, "sigma": 0.4},
+                "error_rate": 0.01,
+                "error_statuses": [429, 500]
+            },
+            "routes": {
+                "DEN-MCO": {"latency_ms": {"distribution": "fixed", "value": 2500}},
+                "LAS-*": {"error_rate": 0.2, "error_statuses": [429]}
+            }
+        }
+
+    Distributions: fixed (value), uniform (min, max), normal (mean, stddev) and
+    lognormal (median, sigma). Route keys may use '*' for either airport; the
+    most specific match wins.
+    """
+
+    DEFAULT_SETTINGS = {
+        'latency_ms': {'distribution': 'fixed', 'value': 0},
+        'error_rate': 0.0,
+        'error_statuses': [500]
+    }
+
+    def __init__(self, config=None, seed=None):
+        config = config or {}
+        self.default = {**self.DEFAULT_SETTINGS, **config.get('default', {})}
+        self.routes = config.get('routes', {})
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, seed=None):
+        with open(path) as f:
+            return cls(json.load(f), seed=seed)
+
+    @classmethod
+    def from_env(cls):
+        """Load the profile named by AMADEUS_PROFILE, or a zero-latency default"""
+        path = os.environ.get('AMADEUS_PROFILE')
+        return cls.from_file(path) if path else cls()
+
+    def route_settings(self, origin, destination):
+        settings = dict(self.default)
+        for key in ('*-*', f"{origin}-*", f"*-{destination}", f"{origin}-{destination}"):
+            settings.update(self.routes.get(key, {}))
+        return settings
+
+    def sample_latency(self, origin, destination):
+        """Latency in seconds for one call on this route"""
+        spec = self.route_settings(origin, destination)['latency_ms']
+        if isinstance(spec, (int, float)):
+            return spec / 1000
+
+        distribution = spec.get('distribution', 'fixed')
+        with self._lock:
+            if distribution == 'uniform':
+                value = self._random.uniform(spec.get('min', 0), spec.get('max', 0))
+            elif distribution == 'normal':
+                value = self._random.gauss(spec.get('mean', 0), spec.get('stddev', 0))
+            elif distribution == 'lognormal':
+                value = spec.get('median', 0) * self._random.lognormvariate(0, spec.get('sigma', 0))
+            else:
+                value = spec.get('value', 0)
+        return max(0.0, value) / 1000
+
+    def sample_error(self, origin, destination):
+        """HTTP status to fail this call with, or None"""
+        settings = self.route_settings(origin, destination)
+        with self._lock:
+            if self._random.random() >= settings['error_rate']:
+                return None
+            return self._random.choice(settings['error_statuses'])
+
+
+def generate_synthetic_offers(params, count=20):
+    """
+    Generate Frontier flight offers in the Amadeus flight-offers format.
+
+    Offers are deterministic for a given route and dates, so repeated searches
+    (and cache comparisons) see the same results.
+    """
+    origin = params['originLocationCode']
+    destination = params['destinationLocationCode']
+    departure_date = params['departureDate']
+    return_date = params.get('returnDate')
+
+    seed = int(hashlib.md5(recording_key(params).encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    route_seed = int(hashlib.md5(f"{origin}{destination}".encode()).hexdigest()[:4], 16)
+    block_minutes = 75 + route_seed % 240
+
+    def itinerary(depart_from, arrive_at, day, depart_minute, stops):
+        segments = []
+        current = datetime.strptime(day, '%Y-%m-%d') + timedelta(minutes=depart_minute)
+        airports = [depart_from] + (['DEN' if 'DEN' not in (depart_from, arrive_at) else 'LAS'] if stops else []) + [arrive_at]
+        total = 0
+        for leg_from, leg_to in zip(airports, airports[1:]):
+            leg_minutes = block_minutes // len(airports[1:]) + 20 * stops
+            arrival = current + timedelta(minutes=leg_minutes)
+            segments.append({
+                'departure': {'iataCode': leg_from, 'at': current.strftime('%Y-%m-%dT%H:%M:%S')},
+                'arrival': {'iataCode': leg_to, 'at': arrival.strftime('%Y-%m-%dT%H:%M:%S')},
+                'carrierCode': 'F9',
+                'number': str(1000 + rng.randint(0, 8999)),
+                'aircraft': {'code': rng.choice(['320', '321', '32N', '32Q'])},
+                'numberOfStops': 0
+            })
+            total += leg_minutes
+            if leg_to != arrive_at:
+                layover = 45 + rng.randint(0, 90)
+                current = arrival + timedelta(minutes=layover)
+                total += layover
+        hours, minutes = divmod(total, 60)
+        return {'duration': f"PT{hours}H{minutes}M" if minutes else f"PT{hours}H", 'segments': segments}
+
+    offers = []
+    for index in range(count):
+        stops = 1 if rng.random() < 0.25 else 0
+        itineraries = [itinerary(origin, destination, departure_date, rng.randint(5 * 60, 22 * 60), stops)]
+        if return_date:
+            itineraries.append(itinerary(destination, origin, return_date, rng.randint(5 * 60, 22 * 60), stops))
+
+        booking_class = rng.choice(['V', 'Q', 'X', 'T', 'R', 'L'])
+        price = round(rng.uniform(29, 199) * len(itineraries), 2)
+        offers.append({
+            'type': 'flight-offer',
+            'id': str(index + 1),
+            'source': 'GDS',
+            'numberOfBookableSeats': rng.randint(1, 9),
+            'itineraries': itineraries,
+            'price': {'currency': 'USD', 'total': f"{price:.2f}", 'grandTotal': f"{price:.2f}"},
+            'validatingAirlineCodes': ['F9'],
+            'travelerPricings': [{
+                'travelerId': '1',
+                'travelerType': 'ADULT',
+                'fareDetailsBySegment': [
+                    {'cabin': 'ECONOMY', 'class': booking_class, 'fareBasis': f"{booking_class}00XS"}
+                    for itin in itineraries for _ in itin['segments']
+                ]
+            }]
+        })
+    return offers
+
+
+def create_token_store():
+    """SQLiteTokenStore at AMADEUS_TOKEN_STORE, or None to share tokens in-process only"""
+    path = os.environ.get('AMADEUS_TOKEN_STORE')
+    return SQLiteTokenStore(path) if path else None
+
+
+def build_client(client_id, client_secret, **options):
+    """
+    amadeus.Client on a keep-alive connection pool with a shared OAuth token.
+
+    Pool size comes from AMADEUS_POOL_SIZE; with AMADEUS_TOKEN_STORE set, the
+    token is shared by every worker process on the host.
+    """
+    client = Client(client_id=client_id, client_secret=client_secret, http=KeepAlivePool(), **options)
+    client.access_token = SharedAccessToken(client, create_token_store())
+    return client
+
+
+class SDKTransport:
+    """Flight offers searches through an amadeus.Client"""
+
+    mode = 'sdk'
+
+    def __init__(self, client):
+        self.client = client
+
+    def search_flight_offers(self, params):
+        return self.client.shopping.flight_offers_search.get(**params).data
+
+    def stats(self):
+        """Connection pool and token metrics, when the client was built by build_client"""
+        stats = {}
+        if isinstance(getattr(self.client, 'http', None), KeepAlivePool):
+            stats['pool'] = self.client.http.stats()
+        if isinstance(getattr(self.client, 'access_token', None), SharedAccessToken):
+            stats['token'] = self.client.access_token.stats()
+        return stats
+
+
+class RecordingTransport:
+    """Wraps another transport and saves every response to a recordings directory"""
+
+    mode = 'record'
+
+    def __init__(self, inner, directory=DEFAULT_RECORDINGS_DIR):
+        self.inner = inner
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def search_flight_offers(self, params):
+        started = time.perf_counter()
+        try:
+            data = self.inner.search_flight_offers(params)
+        except ResponseError as error:
+            status = getattr(error.response, 'status_code', None)
+            self._write(params, {'status': status, 'errors': getattr(error.response, 'result', None)}, started)
+            raise
+        self._write(params, {'status': 200, 'data': data}, started)
+        return data
+
+    def stats(self):
+        return self.inner.stats()
+
+    def _write(self, params, body, started):
+        recording = {
+            'request': params,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            **body
+        }
+        path = os.path.join(self.directory, f"{recording_key(params)}.json")
+        with open(path, 'w') as f:
+            json.dump(recording, f)
+
+
+class SyntheticTransport:
+    """Generates offers in-process, with latency and errors from a LatencyProfile"""
+
+    mode = 'synthetic'
+
+    def __init__(self, profile=None, offers_per_pair=20):
+        self.profile = profile or LatencyProfile()
+        self.offers_per_pair = offers_per_pair
+
+    def search_flight_offers(self, params):
+        origin, destination = params['originLocationCode'], params['destinationLocationCode']
+        time.sleep(self.profile.sample_latency(origin, destination))
+
+        status = self.profile.sample_error(origin, destination)
+        if status is not None:
+            raise make_response_error(status)
+        return generate_synthetic_offers(params, self.offers_per_pair)
+
+
+def create_transport(mode=None, api_key=None, api_secret=None):
+    """
+    Build the transport selected by AMADEUS_TRANSPORT (or mode).
+
+    Raises:
+        ValueError: Unknown mode, or API credentials missing for sdk/record
+    """
+    mode = (mode or os.environ.get('AMADEUS_TRANSPORT', 'sdk')).lower()
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown Amadeus transport '{mode}' (expected one of {', '.join(TRANSPORT_MODES)})")
+
+    if mode == 'synthetic':
+        offers_per_pair = int(os.environ.get('AMADEUS_SYNTHETIC_OFFERS', '20'))
+        return SyntheticTransport(LatencyProfile.from_env(), offers_per_pair)
+
+    if mode == 'replay':
+        standin = urlparse(os.environ.get('AMADEUS_STANDIN_URL', DEFAULT_STANDIN_URL))
+        transport = SDKTransport(build_client(
+            api_key or 'standin',
+            api_secret or 'standin',
+            host=standin.hostname,
+            port=standin.port or 80,
+            ssl=standin.scheme == 'https'
+        ))
+        transport.mode = 'replay'
+        return transport
+
+    if not api_key or not api_secret:
+        raise ValueError("Amadeus API credentials not provided")
+
+    transport = SDKTransport(build_client(api_key, api_secret))
+    if mode == 'record':
+        return RecordingTransport(transport, os.environ.get('AMADEUS_RECORD_DIR', DEFAULT_RECORDINGS_DIR))
+    return transport
@@ -1,30 +1,77 @@
-from flask import Flask, request, jsonify, Response, stream_with_context
+from flask import Flask, request, jsonify, Response, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 # from scraper import FrontierScraper  # Commented out - using Amadeus API instead
 from amadeus_api import AmadeusFlightSearch
-from trip_planner import find_optimal_trips
+from planner_engine import PLANNER_MODES, DateMatrixPlanner, LegPairingPlanner
 from gowild_blackout import GoWildBlackoutDates
+from search_cache import SearchCache
+from fare_store import SQLiteFareStore
+from singleflight import SingleFlight
+from cache_warmer import CacheWarmer
+from fare_calendar import FareCalendar
+from flight_record import FlightRecord, LegRecord, flights_from_dicts
+from response_encoding import EventStreamEncoder, encode_json, negotiate_encoding
+from result_pages import CursorError, ResultPager, decode_cursor, parse_query
+from route_network import load_route_network
+import metrics
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import json
 import os
 import random
+import threading
 import time
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+class FlightJSONProvider(DefaultJSONProvider):
+    """Serializes FlightRecords in the app's flight format (records stay internal until here)"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (FlightRecord, LegRecord)):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
 app = Flask(__name__)
+app.json = FlightJSONProvider(app)
 CORS(app)  # Enable CORS for React frontend
 
 # Initialize scraper (commented out - using Amadeus API)
 # scraper = FrontierScraper()
 
+# Optional on-disk cache tier shared by every worker process on the host.
+# Set FARE_CACHE_DB to a file path to enable it; the in-memory caches below
+# stay in front of it as the hot tier.
+FARE_CACHE_DB = os.environ.get('FARE_CACHE_DB')
+fare_store = SQLiteFareStore(FARE_CACHE_DB) if FARE_CACHE_DB else None
+
+# Per-route pair cache shared by all searches, so overlapping multi-airport
+# requests (e.g. DEN+LAX->MCO and DEN->MCO,MIA) reuse each other's legs
+PAIR_CACHE_DURATION = timedelta(hours=1)
+pair_cache = SearchCache(
+    ttl_seconds=PAIR_CACHE_DURATION.total_seconds(),
+    max_entries=int(os.environ.get('PAIR_CACHE_MAX_ENTRIES', '5000')),
+    max_bytes=int(os.environ.get('PAIR_CACHE_MAX_MB', '256')) * 1024 * 1024,
+    backing_store=fare_store,
+    decoder=flights_from_dicts
+)
+pair_cache.start_sweeper()
+
+# Frontier route network index (built offline with `python route_network.py`);
+# prunes "ANY" searches to routes that are actually flown and backs /api/destinations
+route_network = load_route_network()
+
 # Initialize Amadeus API client
 try:
     amadeus_client = AmadeusFlightSearch(
         api_key=os.environ.get('AMADEUS_API_KEY'),
-        api_secret=os.environ.get('AMADEUS_API_SECRET')
+        api_secret=os.environ.get('AMADEUS_API_SECRET'),
+        pair_cache=pair_cache,
+        route_network=route_network
     )
     AMADEUS_ENABLED = True
 except ValueError as e:
@@ -32,24 +79,258 @@ except ValueError as e:
     amadeus_client = None
     AMADEUS_ENABLED = False
 
+# Background warmer for popular route pairs. Searched routes are always tracked;
+# set CACHE_WARMER_ENABLED=true to refresh them (and WARM_ROUTES) ahead of expiry
+cache_warmer = CacheWarmer(amadeus_client, pair_cache) if AMADEUS_ENABLED else None
+if cache_warmer is not None and os.environ.get('CACHE_WARMER_ENABLED', 'false').lower() == 'true':
+    cache_warmer.start()
+
+# Trip planner engines (concurrency from PLANNER_MAX_CONCURRENCY): the round-trip
+# date matrix, or one-way legs paired locally (about 2N instead of 5N searches).
+# TRIP_PLANNER_MODE picks the default; requests can override it with plannerMode.
+trip_planner_engines = {
+    'matrix': DateMatrixPlanner(amadeus_client if AMADEUS_ENABLED else None),
+    'legs': LegPairingPlanner(amadeus_client if AMADEUS_ENABLED else None)
+}
+TRIP_PLANNER_MODE = os.environ.get('TRIP_PLANNER_MODE', 'matrix').lower()
+if TRIP_PLANNER_MODE not in PLANNER_MODES:
+    raise ValueError(f"Unknown TRIP_PLANNER_MODE '{TRIP_PLANNER_MODE}' (expected {' or '.join(PLANNER_MODES)})")
+
+# Flexible-date fare calendar with its per-(route, day) summary index
+fare_calendar = FareCalendar(amadeus_client if AMADEUS_ENABLED else None, pair_cache)
+
 # Development mode - set to True to return mock data instead of scraping
 # If Amadeus is enabled, DEV_MODE defaults to False (use real data)
 DEV_MODE = os.environ.get('DEV_MODE', 'false' if AMADEUS_ENABLED else 'true').lower() == 'true'
 
-# Simple in-memory cache
-cache = {}
+# Bounded in-memory cache (LRU eviction, TTL expiry, entry and byte limits)
 CACHE_DURATION = timedelta(hours=1)  # Cache results for 1 hour
+# Stale-while-revalidate: for this long after expiry, searches are answered from
+# the expired entry (flagged stale) while one background refresh replaces it;
+# after that they search synchronously again. 0 disables.
+CACHE_STALE_GRACE = timedelta(seconds=float(os.environ.get('CACHE_STALE_GRACE_SECONDS', '1800')))
+cache = SearchCache(
+    ttl_seconds=CACHE_DURATION.total_seconds(),
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '500')),
+    max_bytes=int(os.environ.get('CACHE_MAX_MB', '256')) * 1024 * 1024,
+    backing_store=fare_store,
+    decoder=lambda entry: {**entry, 'flights': flights_from_dicts(entry['flights'])},
+    stale_seconds=CACHE_STALE_GRACE.total_seconds()
+)
+cache.start_sweeper()
+
+# In-flight request coalescing: identical concurrent searches share one call
+search_requests = SingleFlight()
+stream_requests = SingleFlight()
+
+# Cache keys with a background revalidation running
+revalidating = set()
+revalidating_lock = threading.Lock()
+
+# Filtered/sorted pages of cached result sets (see result_pages.py)
+result_pager = ResultPager()
+
+# Seconds of silence before the search stream sends an SSE heartbeat comment
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('STREAM_HEARTBEAT_INTERVAL', '10'))
+
+def scheduler_collector():
+    """Scrape-time metrics for the upstream scheduler and in-flight coalescing"""
+    coalescers = {'search': search_requests, 'stream': stream_requests}
+    if AMADEUS_ENABLED:
+        coalescers['pairs'] = amadeus_client.pair_flights
+        classes = amadeus_client.scheduler.stats()['classes']
+        yield ('wildpass_upstream_queue_depth', 'gauge', 'Pair searches waiting for the rate limit scheduler',
+               ('priority',), [((priority,), class_stats['queue_depth']) for priority, class_stats in classes.items()])
+    yield ('wildpass_coalesced_in_flight', 'gauge', 'Distinct searches in flight that identical requests can join',
+           ('kind',), [((kind,), coalescer.stats()['in_flight']) for kind, coalescer in coalescers.items()])
+
+metrics.REGISTRY.register_collector(metrics.cache_collector({'search': cache, 'pair': pair_cache}))
+metrics.REGISTRY.register_collector(scheduler_collector)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+@app.after_request
+def finish_request_metrics(response):
+    """Record when the response is closed, so streams count until their last event"""
+    endpoint, started, status = g.metrics_endpoint, g.metrics_started, str(response.status_code)
+
+    def finish():
+        metrics.REQUESTS_IN_FLIGHT.labels(endpoint).dec()
+        metrics.REQUEST_SECONDS.labels(endpoint, status).observe(time.perf_counter() - started)
+
+    response.call_on_close(finish)
+    return response
+
+def json_response(payload, status=200):
+    """
+    JSON response using the fast serializer, compressed per Accept-Encoding.
+
+    Used for the large search and trip planner payloads; small responses
+    keep using jsonify.
+    """
+    body, headers = encode_json(payload, request.headers.get('Accept-Encoding'))
+    return Response(body, status=status, headers=headers)
+
+def paginate(body, cache_key, query, version):
+    """Replace body['flights'] with the page requested by query (if any)"""
+    if query is not None:
+        body.update(result_pager.page(cache_key, body['flights'], query, version=version))
+        body['count'] = len(body['flights'])
+    return body
+
+def cursor_page(cursor):
+    """
+    Serve the page a nextCursor points at from the cached result set.
+
+    Returns:
+        Tuple of (status, body)
+    """
+    try:
+        cache_key, query, offset, version = decode_cursor(cursor)
+    except CursorError as e:
+        return 400, {'error': str(e)}
+
+    hit = cache.get_with_age(cache_key)
+    if hit is None:
+        return 410, {'error': 'These results have expired; run the search again'}
+
+    cache_entry, _, stale = hit
+    if cache_entry.get('timestamp') != version:
+        # Refreshed since the first page; offsets into the new set would skip or repeat offers
+        return 410, {'error': 'These results have been refreshed; run the search again'}
+    body = {'cached': True, 'devMode': DEV_MODE}
+    if stale:
+        body['stale'] = True
+    body.update(result_pager.page(cache_key, cache_entry['flights'], query, offset, version))
+    body['count'] = len(body['flights'])
+    return 200, body
 
 def get_cache_key(origins, destinations, departure_date, return_date, trip_type):
     """Generate a unique cache key for the search parameters"""
     return f"{','.join(sorted(origins))}_{','.join(sorted(destinations))}_{departure_date}_{return_date}_{trip_type}"
 
-def is_cache_valid(cache_entry):
-    """Check if cached entry is still valid"""
-    if not cache_entry:
+def search_return_date_for(trip_type, departure_date, return_date):
+    """Return date to search for a trip type (None for one-way)"""
+    if trip_type == 'one-way':
+        return None
+    if trip_type == 'day-trip':
+        return departure_date
+    return return_date
+
+def run_cached_search(cache_key, origins, destinations, departure_date, search_return_date, priority='interactive'):
+    """
+    Search Amadeus and cache the result set under cache_key.
+
+    Returns:
+        Tuple of (flights, search stats, result set version)
+    """
+    stats = {}
+    flights = amadeus_client.search_flights(
+        origins=origins,
+        destinations=destinations,
+        departure_date=departure_date,
+        return_date=search_return_date,
+        adults=1,
+        stats=stats,
+        priority=priority
+    )
+    return flights, stats, cache_results(cache_key, flights, stats.get('retry_after'))
+
+def cache_results(cache_key, flights, ttl_seconds=None):
+    """
+    Cache a search's result set.
+
+    Args:
+        cache_key: Search cache key
+        flights: The search's flights
+        ttl_seconds: Optional TTL overriding CACHE_DURATION; searches pass the
+            soonest a failed pair's backoff lapses (stats['retry_after'])
+
+    Returns:
+        The entry's timestamp, which versions the result set for page cursors
+    """
+    timestamp = datetime.now().isoformat()
+    cache.set(cache_key, {
+        'flights': flights,
+        'timestamp': timestamp
+    }, ttl_seconds=ttl_seconds)
+    return timestamp
+
+def revalidate_search(cache_key, origins, destinations, departure_date, return_date, trip_type):
+    """
+    Refresh a stale cache entry on a background thread, once per key at a time.
+
+    The refresh runs under search_requests, so a request that misses the cache
+    meanwhile joins it instead of searching again.
+
+    Returns:
+        True if a refresh was started, False if one is already running
+    """
+    if DEV_MODE:
+        def refresh():
+            cache_results(cache_key, generate_mock_flights(origins, destinations, departure_date, return_date))
+    elif AMADEUS_ENABLED:
+        search_return_date = search_return_date_for(trip_type, departure_date, return_date)
+
+        def refresh():
+            return run_cached_search(cache_key, origins, destinations, departure_date, search_return_date,
+                                     priority='background')
+    else:
         return False
-    cache_time = datetime.fromisoformat(cache_entry['timestamp'])
-    return datetime.now() - cache_time < CACHE_DURATION
+
+    with revalidating_lock:
+        if cache_key in revalidating:
+            return False
+        revalidating.add(cache_key)
+
+    def run():
+        try:
+            search_requests.do(cache_key, refresh)
+        except Exception as e:
+            print(f"Background refresh failed for {cache_key}: {str(e)}")
+        finally:
+            with revalidating_lock:
+                revalidating.discard(cache_key)
+
+    print(f"Revalidating stale results for {cache_key}")
+    threading.Thread(target=run, name='search-revalidate', daemon=True).start()
+    return True
+
+def cached_search(cache_key, origins, destinations, departure_date, return_date, trip_type):
+    """
+    Look up a search in the cache, revalidating it in the background if stale.
+
+    Returns:
+        Tuple of (flights, extra response fields, result set version), or None
+        on a miss or once the entry is past the stale grace window
+    """
+    hit = cache.get_with_age(cache_key)
+    if hit is None:
+        return None
+
+    cache_entry, age, stale = hit
+    if not stale:
+        print(f"Returning cached results for {cache_key}")
+        return cache_entry['flights'], {'cached': True}, cache_entry.get('timestamp')
+
+    print(f"Returning stale results ({age:.0f}s old) for {cache_key}")
+    revalidate_search(cache_key, origins, destinations, departure_date, return_date, trip_type)
+    return cache_entry['flights'], {'cached': True, 'stale': True, 'age': round(age)}, cache_entry.get('timestamp')
+
+def route_groups(flights):
+    """Split a result set (ordered by origin then destination) into (route, flights) groups"""
+    groups = []
+    for flight in flights:
+        route = f"{flight['origin']}->{flight['destination']}"
+        if groups and groups[-1][0] == route:
+            groups[-1][1].append(flight)
+        else:
+            groups.append((route, [flight]))
+    return groups
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -58,6 +339,7 @@ def health_check():
         'status': 'ok',
         'message': 'Flight Search API is running',
         'amadeus_enabled': AMADEUS_ENABLED,
+        'amadeus_transport': amadeus_client.transport.mode if AMADEUS_ENABLED else None,
         'dev_mode': DEV_MODE
     })
 
@@ -117,10 +399,17 @@ def search_flights():
         "departureDate": "2025-06-15",
         "returnDate": "2025-06-20"
     }
+
+    Optional "filters", "sort" and "pageSize" return one page of the results
+    with a nextCursor; {"cursor": ...} fetches the next page (see result_pages.py).
     """
     try:
         data = request.get_json()
 
+        if data.get('cursor'):
+            status, body = cursor_page(data['cursor'])
+            return json_response(body, status)
+
         origins = data.get('origins', [])
         destinations = data.get('destinations', [])
         trip_type = data.get('tripType', 'round-trip')
@@ -133,41 +422,47 @@ def search_flights():
                 'error': 'Missing required fields: origins, destinations, departureDate'
             }), 400
 
-        # Check cache first
+        try:
+            query = parse_query(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Check cache first (stale entries are served while they are refreshed)
         cache_key = get_cache_key(origins, destinations, departure_date, return_date, trip_type)
 
-        if cache_key in cache and is_cache_valid(cache[cache_key]):
-            print(f"Returning cached results for {cache_key}")
-            return jsonify({
-                'flights': cache[cache_key]['flights'],
-                'cached': True,
+        hit = cached_search(cache_key, origins, destinations, departure_date, return_date, trip_type)
+        if hit is not None:
+            flights, cache_fields, version = hit
+            return json_response(paginate({
+                'flights': flights,
+                **cache_fields,
                 'searchParams': data,
                 'devMode': DEV_MODE
-            })
+            }, cache_key, query, version))
 
         # Use mock data in dev mode, Amadeus API if enabled, otherwise scrape
+        search_stats = {}
+        coalesced = False
         if DEV_MODE:
             print(f"[DEV MODE] Generating mock flights for {origins} -> {destinations}")
             flights = generate_mock_flights(origins, destinations, departure_date, return_date)
+
+            # Cache the results
+            version = cache_results(cache_key, flights)
         elif AMADEUS_ENABLED:
             # Use Amadeus API for real flight data
             print(f"[AMADEUS API] Searching flights for {origins} -> {destinations}")
 
-            # Set return_date based on trip type
-            if trip_type == 'one-way':
-                search_return_date = None
-            elif trip_type == 'day-trip':
-                search_return_date = departure_date
-            else:  # round-trip
-                search_return_date = return_date
-
-            flights = amadeus_client.search_flights(
-                origins=origins,
-                destinations=destinations,
-                departure_date=departure_date,
-                return_date=search_return_date,
-                adults=1
+            search_return_date = search_return_date_for(trip_type, departure_date, return_date)
+            cache_warmer.record(origins, destinations, departure_date, search_return_date)
+
+            # Search and cache once; concurrent identical requests wait on this call
+            (flights, search_stats, version), coalesced = search_requests.do(
+                cache_key,
+                lambda: run_cached_search(cache_key, origins, destinations, departure_date, search_return_date)
             )
+            if coalesced:
+                print(f"Coalesced onto in-flight search for {cache_key}")
         else:
             # Scraper not available - return error
             print(f"ERROR: Neither Amadeus API nor scraper is available")
@@ -177,19 +472,17 @@ def search_flights():
                 'amadeusEnabled': AMADEUS_ENABLED
             }), 503
 
-        # Cache the results
-        cache[cache_key] = {
-            'flights': flights,
-            'timestamp': datetime.now().isoformat()
-        }
-
-        return jsonify({
+        return json_response(paginate({
             'flights': flights,
             'cached': False,
+            'coalesced': coalesced,
             'searchParams': data,
             'count': len(flights),
+            'pairsSearched': search_stats.get('pairs_total', 0),
+            'pairsFromCache': search_stats.get('pairs_cached', 0),
+            'pairsFailed': search_stats.get('pairs_failed', 0),
             'devMode': DEV_MODE
-        })
+        }, cache_key, query, version))
 
     except Exception as e:
         print(f"Error in search_flights: {str(e)}")
@@ -202,7 +495,11 @@ def search_flights_stream():
     """
     Search for flights with streaming results (Server-Sent Events)
 
-    Returns results as they become available for each route
+    Returns results as they become available for each route. The search runs
+    on a producer thread and each route is flushed as soon as Amadeus answers;
+    heartbeat comments keep the connection alive during long gaps and the
+    completion event is always sent last. Cached (and stale, see
+    CACHE_STALE_GRACE) result sets are replayed route by route immediately.
     """
     try:
         data = request.get_json()
@@ -219,21 +516,26 @@ def search_flights_stream():
                 'error': 'Missing required fields: origins, destinations, departureDate'
             }), 400
 
+        # One compressor per response, flushed after every event
+        encoder = EventStreamEncoder(negotiate_encoding(request.headers.get('Accept-Encoding')))
+        cache_key = get_cache_key(origins, destinations, departure_date, return_date, trip_type)
+
         def generate():
             """Generator function for streaming results"""
             all_flights = []
-            streamed_results = []
+            search_stats = {}
+            coalesced = False
+            cache_fields = {'cached': False}
 
-            def stream_callback(route, flights):
-                """Callback to store results for streaming"""
-                streamed_results.append({
-                    'route': route,
-                    'flights': flights,
-                    'count': len(flights)
-                })
+            hit = cached_search(cache_key, origins, destinations, departure_date, return_date, trip_type)
+            if hit is not None:
+                # Replay the cached result set one route at a time
+                all_flights, cache_fields, _ = hit
+                for route, route_flights in route_groups(all_flights):
+                    yield encoder.event({'route': route, 'flights': route_flights, 'count': len(route_flights)})
 
             # Use mock data in dev mode, Amadeus API if enabled
-            if DEV_MODE:
+            elif DEV_MODE:
                 # For mock data, simulate streaming
                 dest_list = destinations if destinations != ['ANY'] else ['MCO', 'LAS', 'MIA', 'PHX', 'ATL']
 
@@ -277,46 +579,78 @@ def search_flights_stream():
                             'flights': route_flights,
                             'count': len(route_flights)
                         }
-                        yield f"data: {json.dumps(event_data)}\n\n"
+                        yield encoder.event(event_data)
                         time.sleep(0.1)  # Simulate API delay
 
             elif AMADEUS_ENABLED:
-                # Set return_date based on trip type
-                if trip_type == 'one-way':
-                    search_return_date = None
-                elif trip_type == 'day-trip':
-                    search_return_date = departure_date
-                else:  # round-trip
-                    search_return_date = return_date
-
-                # Search with streaming callback
-                all_flights = amadeus_client.search_flights(
-                    origins=origins,
-                    destinations=destinations,
-                    departure_date=departure_date,
-                    return_date=search_return_date,
-                    adults=1,
-                    callback=stream_callback
-                )
-
-                # Stream the collected results
-                for result in streamed_results:
-                    yield f"data: {json.dumps(result)}\n\n"
+                search_return_date = search_return_date_for(trip_type, departure_date, return_date)
+                cache_warmer.record(origins, destinations, departure_date, search_return_date)
+
+                # A producer thread runs the search and publishes each route as it
+                # completes; identical concurrent streams subscribe to the same
+                # broadcast and replay its events instead of searching again
+                def produce(publish):
+                    def stream_callback(route, flights):
+                        """Callback to publish each route's results to subscribers"""
+                        publish(('route', {
+                            'route': route,
+                            'flights': flights,
+                            'count': len(flights)
+                        }))
+
+                    try:
+                        stats = {}
+                        flights = amadeus_client.search_flights(
+                            origins=origins,
+                            destinations=destinations,
+                            departure_date=departure_date,
+                            return_date=search_return_date,
+                            adults=1,
+                            callback=stream_callback,
+                            stats=stats
+                        )
+                        cache_results(cache_key, flights, stats.get('retry_after'))
+                        publish(('done', (flights, stats)))
+                    except Exception as e:
+                        print(f"Error in stream producer: {str(e)}")
+                        publish(('error', str(e)))
+
+                # Coalesce on the same key the producer caches under, so a stream
+                # joins exactly the searches whose results it would read back
+                broadcast, coalesced = stream_requests.stream(cache_key, produce, thread_name='search-stream-producer')
+
+                # Consumer: flush each route immediately, heartbeat during long gaps
+                for event in broadcast.subscribe(timeout=STREAM_HEARTBEAT_INTERVAL):
+                    if event is None:
+                        yield encoder.comment('heartbeat')
+                        continue
+
+                    kind, payload = event
+                    if kind == 'route':
+                        yield encoder.event(payload)
+                    elif kind == 'done':
+                        all_flights, search_stats = payload
+                        break
+                    else:
+                        yield encoder.event({'error': payload})
+                        break
 
             # Send completion event
             completion_data = {
                 'complete': True,
-                'total_flights': len(all_flights)
+                'total_flights': len(all_flights),
+                'pairs_from_cache': search_stats.get('pairs_cached', 0),
+                'pairs_failed': search_stats.get('pairs_failed', 0),
+                'coalesced': coalesced,
+                **cache_fields
             }
-            yield f"data: {json.dumps(completion_data)}\n\n"
+            yield encoder.event(completion_data)
+            yield encoder.close()
 
         return Response(
             stream_with_context(generate()),
             mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no'
-            }
+            headers=encoder.headers()
         )
 
     except Exception as e:
@@ -325,13 +659,26 @@ def search_flights_stream():
 
 @app.route('/api/destinations', methods=['GET'])
 def get_destinations():
-    """Get list of all Frontier destinations"""
-    # Scraper not available - return empty list or implement Amadeus destination search
-    destinations = []
+    """
+    Get list of all Frontier destinations
+
+    Query params:
+        origin: Optional airport code; only destinations served from it are returned
+    """
+    if route_network is None:
+        return jsonify({
+            'destinations': [],
+            'count': 0,
+            'message': 'Route network index not built (run python route_network.py)'
+        })
+
+    origin = request.args.get('origin', '').strip().upper() or None
+    destinations = [route_network.airport(code) for code in route_network.destinations(origin)]
     return jsonify({
         'destinations': destinations,
         'count': len(destinations),
-        'message': 'Destination search not implemented with Amadeus API'
+        'origin': origin,
+        'generatedAt': route_network.generated_at
     })
 
 @app.route('/api/trip-planner', methods=['POST'])
@@ -352,77 +699,38 @@ def trip_planner():
         nonstop_preferred = data.get('nonstopPreferred', False)
         max_trip_duration = data.get('maxTripDuration')
         max_trip_duration_unit = data.get('maxTripDurationUnit', 'days')
+        planner_mode = data.get('plannerMode', TRIP_PLANNER_MODE)
 
         # Validate required fields
         if not origins or not destinations or not departure_date or not trip_length:
             return jsonify({
                 'error': 'Missing required fields: origins, destinations, departureDate, tripLength'
             }), 400
+        if planner_mode not in PLANNER_MODES:
+            return jsonify({'error': f"plannerMode must be {' or '.join(PLANNER_MODES)}"}), 400
 
-        # Calculate return date window (search several days to find options)
+        # Search the departure x return dates concurrently; the earliest
+        # departure day with matching trips wins and later searches are cancelled
         depart_dt = datetime.strptime(departure_date, '%Y-%m-%d')
-        trip_hours = float(trip_length) * (24 if trip_length_unit == 'days' else 1)
-
-        all_flights = []
-        optimal_trips = []
-        days_searched = 0
-        max_days_to_search = 30
-
-        # Keep searching future dates until we find results or hit 30 days
-        while len(optimal_trips) == 0 and days_searched < max_days_to_search:
-            current_depart_dt = depart_dt + timedelta(days=days_searched)
-            current_departure_date = current_depart_dt.strftime('%Y-%m-%d')
-            target_return = current_depart_dt + timedelta(hours=trip_hours)
-
-            # Search a range of dates around target (±2 days for flexibility)
-            return_dates = [
-                (target_return - timedelta(days=2)).strftime('%Y-%m-%d'),
-                (target_return - timedelta(days=1)).strftime('%Y-%m-%d'),
-                target_return.strftime('%Y-%m-%d'),
-                (target_return + timedelta(days=1)).strftime('%Y-%m-%d'),
-                (target_return + timedelta(days=2)).strftime('%Y-%m-%d'),
-            ]
-
-            print(f"Searching departure date: {current_departure_date} (day {days_searched + 1}/{max_days_to_search})")
-
-            # Search for round trips with each return date
-            batch_flights = []
-            for return_date in return_dates:
-                if AMADEUS_ENABLED:
-                    flights = amadeus_client.search_flights(
-                        origins=origins,
-                        destinations=destinations,
-                        departure_date=current_departure_date,
-                        return_date=return_date,
-                        adults=1
-                    )
-                    batch_flights.extend(flights)
-
-            all_flights.extend(batch_flights)
-
-            # Use trip planner to find optimal combinations
-            optimal_trips = find_optimal_trips(
-                all_flights,
-                trip_length=trip_length,
-                trip_length_unit=trip_length_unit,
-                nonstop_preferred=nonstop_preferred,
-                max_duration=max_trip_duration,
-                max_duration_unit=max_trip_duration_unit
-            )
-
-            if len(optimal_trips) > 0:
-                print(f"Found {len(optimal_trips)} matching trips on day {days_searched + 1}")
-                break
-
-            days_searched += 1
+        optimal_trips, days_searched = trip_planner_engines[planner_mode].plan(
+            origins,
+            destinations,
+            departure_date,
+            trip_length,
+            trip_length_unit=trip_length_unit,
+            nonstop_preferred=nonstop_preferred,
+            max_duration=max_trip_duration,
+            max_duration_unit=max_trip_duration_unit
+        )
 
         # Return top 20 best matches
-        return jsonify({
+        return json_response({
             'flights': optimal_trips[:20],
             'total_options': len(optimal_trips),
             'target_duration': f"{trip_length} {trip_length_unit}",
             'days_searched': days_searched + 1,
-            'earliest_departure': (depart_dt + timedelta(days=days_searched)).strftime('%Y-%m-%d') if optimal_trips else None
+            'earliest_departure': (depart_dt + timedelta(days=days_searched)).strftime('%Y-%m-%d') if optimal_trips else None,
+            'planner_mode': planner_mode
         })
 
     except Exception as e:
@@ -433,22 +741,95 @@ def trip_planner():
             'error': str(e)
         }), 500
 
+@app.route('/api/calendar', methods=['POST'])
+def calendar():
+    """
+    Cheapest fare, GoWild availability and blackout status per day
+
+    Expected JSON body:
+    {
+        "origins": ["DEN"],
+        "destinations": ["MCO", "LAS"],
+        "departureDate": "2025-06-01",
+        "days": 30,
+        "tripLength": 4
+    }
+
+    tripLength is optional; without it the calendar shows one-way fares.
+    """
+    try:
+        data = request.get_json()
+
+        origins = data.get('origins', [])
+        destinations = data.get('destinations', [])
+        departure_date = data.get('departureDate')
+
+        if not origins or not destinations or not departure_date:
+            return jsonify({
+                'error': 'Missing required fields: origins, destinations, departureDate'
+            }), 400
+
+        try:
+            days = int(data.get('days', 30))
+            trip_length = int(data['tripLength']) if data.get('tripLength') is not None else None
+            result = fare_calendar.build(origins, destinations, departure_date, days=days,
+                                         trip_length=trip_length, priority='interactive')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return json_response({
+            'calendar': result['days'],
+            'searchParams': data,
+            'cellsTotal': result['stats']['cells'],
+            'cellsFromIndex': result['stats']['from_index'],
+            'cellsFromCache': result['stats']['from_pair_cache'],
+            'cellsFetched': result['stats']['fetched'],
+            'cellsPending': result['stats']['pending'],
+            'devMode': DEV_MODE
+        })
+
+    except Exception as e:
+        print(f"Error in calendar: {str(e)}")
+        return jsonify({
+            'error': str(e)
+        }), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Hot-path timings and counters in the Prometheus text format"""
+    if not metrics.METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled (METRICS_ENABLED=false)'}), 404
+    return Response(metrics.REGISTRY.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
 @app.route('/api/cache/clear', methods=['POST'])
 def clear_cache():
     """Clear the flight cache"""
-    global cache
-    cache = {}
+    cache.clear()
+    pair_cache.clear()
     return jsonify({'message': 'Cache cleared successfully'})
 
 @app.route('/api/cache/stats', methods=['GET'])
 def cache_stats():
     """Get cache statistics"""
-    valid_entries = sum(1 for entry in cache.values() if is_cache_valid(entry))
-    return jsonify({
-        'total_entries': len(cache),
-        'valid_entries': valid_entries,
-        'expired_entries': len(cache) - valid_entries
-    })
+    stats = cache.stats()
+    stats['pair_cache'] = pair_cache.stats()
+    if fare_store is not None:
+        stats['fare_store'] = fare_store.stats()
+    if AMADEUS_ENABLED:
+        stats['upstream_scheduler'] = amadeus_client.scheduler.stats()
+        if hasattr(amadeus_client.transport, 'stats'):
+            stats['amadeus_session'] = amadeus_client.transport.stats()
+        stats['warmer'] = cache_warmer.stats()
+        stats['negative_cache'] = amadeus_client.negative_cache_stats()
+    stats['coalescing'] = {
+        'search': search_requests.stats(),
+        'stream': stream_requests.stats(),
+        'pairs': amadeus_client.pair_flights.stats() if AMADEUS_ENABLED else None
+    }
+    stats['result_pages'] = result_pager.stats()
+    stats['calendar'] = fare_calendar.stats()
+    stats['route_network'] = route_network.stats() if route_network is not None else None
+    return jsonify(stats)
 
 if __name__ == '__main__':
     # Run on port 5001 (5000 is often used by macOS AirPlay)
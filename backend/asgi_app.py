@@ -0,0 +1,443 @@
+"""
+ASGI App - asyncio serving mode for the search endpoints
+
+Serves /api/search, /api/search/stream and /api/trip-planner (plus
+/api/health) from one event loop, backed by the non-blocking Amadeus client in
+async_amadeus.py. A search or an open SSE stream costs a coroutine instead of
+a worker thread, so one process can multiplex hundreds of them. Request and
+response formats match the Flask endpoints, and the caches, pair cache and
+rate limit scheduler are the ones configured in app.py. Cache reads and
+writes, scoring and response encoding run on async_amadeus's bounded blocking
+pool (run_blocking), so only network I/O is awaited on the loop.
+
+Run:
+    uvicorn asgi_app:app --port 5001
+"""
+from datetime import datetime, timedelta
+import asyncio
+import json
+import time
+import traceback
+
+import app as flask_app
+from response_encoding import EventStreamEncoder, dumps, encode_json, negotiate_encoding
+from async_amadeus import AsyncFlightSearch, create_async_transport, run_blocking
+from planner_engine import PLANNER_MODES, AsyncDateMatrixPlanner, AsyncLegPairingPlanner
+from singleflight import AsyncSingleFlight
+import metrics
+
+if flask_app.AMADEUS_ENABLED:
+    async_flight_search = AsyncFlightSearch(
+        flask_app.amadeus_client,
+        create_async_transport(api_key=flask_app.amadeus_client.api_key, api_secret=flask_app.amadeus_client.api_secret)
+    )
+else:
+    async_flight_search = None
+
+async_trip_planners = {
+    'matrix': AsyncDateMatrixPlanner(async_flight_search),
+    'legs': AsyncLegPairingPlanner(async_flight_search)
+}
+search_requests = AsyncSingleFlight()
+
+# flask-cors defaults: any origin
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS')
+]
+
+MISSING_SEARCH_FIELDS = 'Missing required fields: origins, destinations, departureDate'
+
+
+async def read_json(receive):
+    """Read the request body and parse it as JSON (None if empty or invalid)"""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(b''.join(chunks) or b'null')
+    except ValueError:
+        return None
+
+
+def header_value(scope, name):
+    """First value of a request header (name in lower case), or None"""
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def send_json(send, status, body, accept_encoding=None):
+    """Send a JSON response, compressed if accept_encoding allows it"""
+    if accept_encoding is None:
+        payload, headers = dumps(body), {'content-type': 'application/json'}
+    else:
+        payload, headers = await run_blocking(encode_json, body, accept_encoding)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+                   + [(b'content-length', str(len(payload)).encode())]
+                   + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def health(data):
+    return 200, {
+        'status': 'ok',
+        'message': 'Flight Search API is running (ASGI)',
+        'amadeus_enabled': flask_app.AMADEUS_ENABLED,
+        'amadeus_transport': async_flight_search.transport.mode if async_flight_search else None,
+        'dev_mode': flask_app.DEV_MODE
+    }
+
+
+async def search(data):
+    """Async equivalent of app.search_flights (POST /api/search)"""
+    if data.get('cursor'):
+        return flask_app.cursor_page(data['cursor'])
+
+    origins = data.get('origins', [])
+    destinations = data.get('destinations', [])
+    trip_type = data.get('tripType', 'round-trip')
+    departure_date = data.get('departureDate')
+    return_date = data.get('returnDate')
+
+    if not origins or not destinations or not departure_date:
+        return 400, {'error': MISSING_SEARCH_FIELDS}
+
+    try:
+        query = flask_app.parse_query(data)
+    except ValueError as e:
+        return 400, {'error': str(e)}
+
+    cache_key = flask_app.get_cache_key(origins, destinations, departure_date, return_date, trip_type)
+    # Stale entries are served while a background thread refreshes them
+    hit = await run_blocking(flask_app.cached_search, cache_key, origins, destinations, departure_date,
+                             return_date, trip_type)
+    if hit is not None:
+        flights, cache_fields, version = hit
+        return 200, await run_blocking(flask_app.paginate, {
+            'flights': flights,
+            **cache_fields,
+            'searchParams': data,
+            'devMode': flask_app.DEV_MODE
+        }, cache_key, query, version)
+
+    search_stats = {}
+    coalesced = False
+    if flask_app.DEV_MODE:
+        print(f"[DEV MODE] Generating mock flights for {origins} -> {destinations}")
+        flights = await run_blocking(flask_app.generate_mock_flights, origins, destinations, departure_date,
+                                     return_date)
+        version = await run_blocking(flask_app.cache_results, cache_key, flights)
+    elif async_flight_search is not None:
+        print(f"[AMADEUS API] Searching flights for {origins} -> {destinations}")
+        search_return_date = flask_app.search_return_date_for(trip_type, departure_date, return_date)
+        flask_app.cache_warmer.record(origins, destinations, departure_date, search_return_date)
+
+        async def run_search():
+            stats = {}
+            flights = await async_flight_search.search_flights(
+                origins=origins,
+                destinations=destinations,
+                departure_date=departure_date,
+                return_date=search_return_date,
+                adults=1,
+                stats=stats
+            )
+            return flights, stats, await run_blocking(flask_app.cache_results, cache_key, flights,
+                                                      stats.get('retry_after'))
+
+        (flights, search_stats, version), coalesced = await search_requests.do(cache_key, run_search)
+    else:
+        return 503, {
+            'error': 'Flight search not available. Please configure Amadeus API credentials or enable DEV_MODE.',
+            'devMode': flask_app.DEV_MODE,
+            'amadeusEnabled': flask_app.AMADEUS_ENABLED
+        }
+
+    return 200, await run_blocking(flask_app.paginate, {
+        'flights': flights,
+        'cached': False,
+        'coalesced': coalesced,
+        'searchParams': data,
+        'count': len(flights),
+        'pairsSearched': search_stats.get('pairs_total', 0),
+        'pairsFromCache': search_stats.get('pairs_cached', 0),
+        'pairsFailed': search_stats.get('pairs_failed', 0),
+        'devMode': flask_app.DEV_MODE
+    }, cache_key, query, version)
+
+
+async def trip_planner(data):
+    """Async equivalent of app.trip_planner (POST /api/trip-planner)"""
+    origins = data.get('origins', [])
+    destinations = data.get('destinations', [])
+    departure_date = data.get('departureDate')
+    trip_length = data.get('tripLength')
+    trip_length_unit = data.get('tripLengthUnit', 'days')
+    planner_mode = data.get('plannerMode', flask_app.TRIP_PLANNER_MODE)
+
+    if not origins or not destinations or not departure_date or not trip_length:
+        return 400, {'error': 'Missing required fields: origins, destinations, departureDate, tripLength'}
+    if planner_mode not in PLANNER_MODES:
+        return 400, {'error': f"plannerMode must be {' or '.join(PLANNER_MODES)}"}
+
+    depart_dt = datetime.strptime(departure_date, '%Y-%m-%d')
+    optimal_trips, days_searched = await async_trip_planners[planner_mode].plan(
+        origins,
+        destinations,
+        departure_date,
+        trip_length,
+        trip_length_unit=trip_length_unit,
+        nonstop_preferred=data.get('nonstopPreferred', False),
+        max_duration=data.get('maxTripDuration'),
+        max_duration_unit=data.get('maxTripDurationUnit', 'days')
+    )
+
+    return 200, {
+        'flights': optimal_trips[:20],
+        'total_options': len(optimal_trips),
+        'target_duration': f"{trip_length} {trip_length_unit}",
+        'days_searched': days_searched + 1,
+        'earliest_departure': (depart_dt + timedelta(days=days_searched)).strftime('%Y-%m-%d') if optimal_trips else None,
+        'planner_mode': planner_mode
+    }
+
+
+async def search_stream(data, receive, send, accept_encoding=None):
+    """
+    Async equivalent of app.search_flights_stream (POST /api/search/stream).
+
+    Each route is sent as soon as it completes, heartbeat comments fill long
+    gaps, and the search is cancelled if the client disconnects. Cached (and
+    stale) result sets are replayed route by route.
+    """
+    origins = data.get('origins', [])
+    destinations = data.get('destinations', [])
+    trip_type = data.get('tripType', 'round-trip')
+    departure_date = data.get('departureDate')
+    return_date = data.get('returnDate')
+
+    if not origins or not destinations or not departure_date:
+        await send_json(send, 400, {'error': MISSING_SEARCH_FIELDS})
+        return
+
+    events = asyncio.Queue()
+    cache_key = flask_app.get_cache_key(origins, destinations, departure_date, return_date, trip_type)
+    cache_fields = {'cached': False}
+
+    def publish_route(route, flights):
+        events.put_nowait(('route', {'route': route, 'flights': flights, 'count': len(flights)}))
+
+    async def produce():
+        nonlocal cache_fields
+        try:
+            stats = {}
+            hit = await run_blocking(flask_app.cached_search, cache_key, origins, destinations, departure_date,
+                                     return_date, trip_type)
+            if hit is not None:
+                all_flights, cache_fields, _ = hit
+                for route, route_flights in flask_app.route_groups(all_flights):
+                    publish_route(route, route_flights)
+            elif flask_app.DEV_MODE:
+                all_flights = []
+                dest_list = destinations if destinations != ['ANY'] else ['MCO', 'LAS', 'MIA', 'PHX', 'ATL']
+                for origin in origins:
+                    for destination in dest_list[:5]:
+                        if origin == destination:
+                            continue
+                        route_flights = await run_blocking(flask_app.generate_mock_flights, [origin], [destination],
+                                                           departure_date, return_date)
+                        all_flights.extend(route_flights)
+                        publish_route(f"{origin}->{destination}", route_flights)
+                        await asyncio.sleep(0.1)  # Simulate API delay
+            elif async_flight_search is not None:
+                search_return_date = flask_app.search_return_date_for(trip_type, departure_date, return_date)
+                flask_app.cache_warmer.record(origins, destinations, departure_date, search_return_date)
+                all_flights = await async_flight_search.search_flights(
+                    origins=origins,
+                    destinations=destinations,
+                    departure_date=departure_date,
+                    return_date=search_return_date,
+                    adults=1,
+                    callback=publish_route,
+                    stats=stats
+                )
+                await run_blocking(flask_app.cache_results, cache_key, all_flights, stats.get('retry_after'))
+            else:
+                all_flights = []
+            events.put_nowait(('done', (all_flights, stats)))
+        except Exception as e:
+            print(f"Error in stream producer: {str(e)}")
+            events.put_nowait(('error', str(e)))
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    encoder = EventStreamEncoder(negotiate_encoding(accept_encoding))
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream')]
+                   + [(key.lower().encode(), value.encode()) for key, value in encoder.headers().items()]
+                   + CORS_HEADERS
+    })
+
+    async def emit(chunk):
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    producer = asyncio.ensure_future(produce())
+    disconnect = asyncio.ensure_future(wait_for_disconnect())
+    all_flights, search_stats = [], {}
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait(
+                {next_event, disconnect},
+                timeout=flask_app.STREAM_HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect in done:
+                next_event.cancel()
+                print('Client disconnected, cancelling stream search')
+                return
+            if next_event not in done:
+                next_event.cancel()
+                await emit(encoder.comment('heartbeat'))
+                continue
+
+            kind, payload = next_event.result()
+            if kind == 'route':
+                # Encoded (and compressed) off the loop; events still go out in order
+                await emit(await run_blocking(encoder.event, payload))
+            elif kind == 'done':
+                all_flights, search_stats = payload
+                break
+            else:
+                await emit(encoder.event({'error': payload}))
+                break
+
+        completion_data = {
+            'complete': True,
+            'total_flights': len(all_flights),
+            'pairs_from_cache': search_stats.get('pairs_cached', 0),
+            'pairs_failed': search_stats.get('pairs_failed', 0),
+            **cache_fields
+        }
+        await emit(encoder.event(completion_data))
+        await send({'type': 'http.response.body', 'body': encoder.close()})
+    finally:
+        producer.cancel()
+        disconnect.cancel()
+
+
+# Responses large enough to be worth negotiating compression for
+COMPRESSED_ROUTES = {('POST', '/api/search'), ('POST', '/api/trip-planner')}
+
+ROUTES = {
+    ('GET', '/api/health'): health,
+    ('POST', '/api/search'): search,
+    ('POST', '/api/trip-planner'): trip_planner
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if async_flight_search is not None:
+                await async_flight_search.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def send_metrics(send):
+    if not metrics.METRICS_ENABLED:
+        await send_json(send, 404, {'error': 'Metrics are disabled (METRICS_ENABLED=false)'})
+        return
+    payload = metrics.REGISTRY.render().encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', metrics.CONTENT_TYPE.encode())] + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+    known = (method, path) in ROUTES or path in ('/api/search/stream', '/api/metrics')
+    endpoint = path if known else 'unmatched'
+    status = [500]
+
+    async def send_and_track(message):
+        if message['type'] == 'http.response.start':
+            status[0] = message['status']
+        await send(message)
+
+    metrics.REQUESTS_IN_FLIGHT.labels(endpoint).inc()
+    started = time.perf_counter()
+    try:
+        await handle_http(scope, receive, send_and_track)
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.labels(endpoint).dec()
+        metrics.REQUEST_SECONDS.labels(endpoint, status[0]).observe(time.perf_counter() - started)
+
+
+async def handle_http(scope, receive, send):
+    method, path = scope['method'], scope['path']
+    if method == 'OPTIONS':
+        await send({'type': 'http.response.start', 'status': 200, 'headers': CORS_HEADERS})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if (method, path) == ('GET', '/api/metrics'):
+        await send_metrics(send)
+        return
+
+    is_stream = (method, path) == ('POST', '/api/search/stream')
+    handler = ROUTES.get((method, path))
+    if handler is None and not is_stream:
+        await send_json(send, 404, {'error': f"Not found: {method} {path}"})
+        return
+
+    data = await read_json(receive) if method == 'POST' else {}
+    if not isinstance(data, dict):
+        await send_json(send, 400, {'error': 'Request body must be a JSON object'})
+        return
+
+    if is_stream:
+        try:
+            await search_stream(data, receive, send, header_value(scope, b'accept-encoding'))
+        except Exception as e:
+            # Headers are already sent; all that is left is to log it
+            print(f"Error in {path}: {str(e)}")
+            traceback.print_exc()
+        return
+
+    try:
+        status, body = await handler(data)
+    except Exception as e:
+        print(f"Error in {path}: {str(e)}")
+        traceback.print_exc()
+        status, body = 500, {'error': str(e)}
+    accept_encoding = header_value(scope, b'accept-encoding') if (method, path) in COMPRESSED_ROUTES else None
+    await send_json(send, status, body, accept_encoding)
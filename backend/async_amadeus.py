@@ -0,0 +1,328 @@
+"""
+Async Amadeus Client - Non-blocking flight offers searches for the ASGI app
+
+An httpx.AsyncClient based transport for the flight offers API (or the local
+stand-in server) and an AsyncFlightSearch that mirrors
+AmadeusFlightSearch.search_flights on asyncio. One event loop can keep
+hundreds of searches in flight without a thread each; pair caching, offer
+conversion and the rate limit scheduler are shared with the synchronous
+client. Only awaitable network I/O runs on the event loop; blocking work
+(cache lookups that may fall through to SQLite, offer conversion, JSON
+encoding) goes through run_blocking on a bounded thread pool.
+"""
+from amadeus import ResponseError
+from amadeus_transport import (
+    DEFAULT_STANDIN_URL, TRANSPORT_MODES, LatencyProfile, create_token_store, generate_synthetic_offers,
+    make_response_error
+)
+from amadeus_session import EventRate, token_key
+from metrics import UPSTREAM_QUEUE_SECONDS, UPSTREAM_SECONDS
+from singleflight import AsyncSingleFlight
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import httpx
+from urllib.parse import urlsplit
+import os
+import time
+
+AMADEUS_HOSTS = {
+    'test': 'https://test.api.amadeus.com',
+    'production': 'https://api.amadeus.com'
+}
+
+# Refresh the OAuth token this many seconds before Amadeus says it expires
+TOKEN_EXPIRY_MARGIN = 60
+
+# Threads for blocking work of the async serving mode (override with ASYNC_BLOCKING_WORKERS)
+DEFAULT_BLOCKING_WORKERS = 8
+
+BLOCKING_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASYNC_BLOCKING_WORKERS', DEFAULT_BLOCKING_WORKERS)),
+    thread_name_prefix='async-blocking'
+)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Await fn(*args, **kwargs) run on BLOCKING_EXECUTOR, keeping the event loop free.
+
+    The pool is bounded, so a burst of searches queues its cache and encoding
+    work here instead of stalling every other request on the loop.
+    """
+    return await asyncio.get_running_loop().run_in_executor(BLOCKING_EXECUTOR, partial(fn, *args, **kwargs))
+
+
+class AsyncAmadeusTransport:
+    """Flight offers searches over HTTP with a shared keep-alive connection pool"""
+
+    mode = 'async-http'
+
+    def __init__(self, base_url, api_key, api_secret, timeout=30.0, max_connections=100, token_store=None):
+        """
+        Args:
+            base_url: API root (Amadeus host or stand-in URL)
+            api_key: Amadeus API key
+            api_secret: Amadeus API secret
+            timeout: Request timeout in seconds
+            max_connections: Keep-alive connection pool size
+            token_store: Optional SQLiteTokenStore shared with other processes
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = None
+        self._token_store = token_store
+        self._token_key = token_key(urlsplit(base_url).hostname, api_key)
+        self.token_fetches = EventRate()
+        self.token_store_hits = 0
+
+    async def _access_token(self, refresh=False):
+        # Created lazily so the lock belongs to the serving event loop
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+
+        async with self._token_lock:
+            if not refresh and self._token is not None and time.time() < self._token_expires_at:
+                return self._token
+
+            # Another worker process may already hold a valid token
+            stored = self._token_store.get(self._token_key) if self._token_store and not refresh else None
+            if stored:
+                self._token, expires_at = stored
+                self._token_expires_at = expires_at - TOKEN_EXPIRY_MARGIN
+                self.token_store_hits += 1
+                return self._token
+
+            response = await self._client.post('/v1/security/oauth2/token', data={
+                'grant_type': 'client_credentials',
+                'client_id': self.api_key,
+                'client_secret': self.api_secret
+            })
+            if response.status_code != 200:
+                raise make_response_error(response.status_code, 'Authentication failed')
+            self.token_fetches.add()
+
+            body = response.json()
+            expires_at = time.time() + int(body.get('expires_in', 1799))
+            self._token = body['access_token']
+            self._token_expires_at = expires_at - TOKEN_EXPIRY_MARGIN
+            if self._token_store:
+                self._token_store.put(self._token_key, self._token, expires_at)
+            return self._token
+
+    async def search_flight_offers(self, params):
+        """
+        Search flight offers.
+
+        Raises:
+            ResponseError: The same error class the amadeus SDK raises for the status
+        """
+        token = await self._access_token()
+        for attempt in range(2):
+            try:
+                response = await self._client.get(
+                    '/v2/shopping/flight-offers',
+                    params=params,
+                    headers={'Authorization': f"Bearer {token}"}
+                )
+            except httpx.HTTPError as e:
+                raise make_response_error(None, f"Network error: {e}")
+
+            # Token revoked or expired early: fetch a new one and retry once
+            if response.status_code == 401 and attempt == 0:
+                token = await self._access_token(refresh=True)
+                continue
+            break
+
+        if response.status_code != 200:
+            raise make_response_error(response.status_code, response.text[:200] or 'Request failed')
+        return response.json().get('data', [])
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self):
+        return {
+            'token': {
+                'shared_store': self._token_store.path if self._token_store else None,
+                'token_fetches_total': self.token_fetches.total,
+                'token_fetches_per_minute': self.token_fetches.per_minute(),
+                'token_store_hits': self.token_store_hits
+            }
+        }
+
+
+class AsyncSyntheticTransport:
+    """In-process synthetic offers with LatencyProfile delays, without blocking the loop"""
+
+    mode = 'synthetic'
+
+    def __init__(self, profile=None, offers_per_pair=20):
+        self.profile = profile or LatencyProfile()
+        self.offers_per_pair = offers_per_pair
+
+    async def search_flight_offers(self, params):
+        origin, destination = params['originLocationCode'], params['destinationLocationCode']
+        await asyncio.sleep(self.profile.sample_latency(origin, destination))
+
+        status = self.profile.sample_error(origin, destination)
+        if status is not None:
+            raise make_response_error(status)
+        return generate_synthetic_offers(params, self.offers_per_pair)
+
+    async def aclose(self):
+        pass
+
+
+def create_async_transport(mode=None, api_key=None, api_secret=None):
+    """
+    Async counterpart of amadeus_transport.create_transport.
+
+    The record mode is only available on the synchronous path; here it
+    searches the real API like sdk.
+
+    Raises:
+        ValueError: Unknown mode, or API credentials missing for sdk/record
+    """
+    mode = (mode or os.environ.get('AMADEUS_TRANSPORT', 'sdk')).lower()
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown Amadeus transport '{mode}' (expected one of {', '.join(TRANSPORT_MODES)})")
+
+    if mode == 'synthetic':
+        offers_per_pair = int(os.environ.get('AMADEUS_SYNTHETIC_OFFERS', '20'))
+        return AsyncSyntheticTransport(LatencyProfile.from_env(), offers_per_pair)
+
+    if mode == 'replay':
+        standin_url = os.environ.get('AMADEUS_STANDIN_URL', DEFAULT_STANDIN_URL)
+        transport = AsyncAmadeusTransport(standin_url, api_key or 'standin', api_secret or 'standin',
+                                          token_store=create_token_store())
+        transport.mode = 'replay'
+        return transport
+
+    if not api_key or not api_secret:
+        raise ValueError("Amadeus API credentials not provided")
+
+    hostname = os.environ.get('AMADEUS_HOSTNAME', 'test')
+    return AsyncAmadeusTransport(AMADEUS_HOSTS.get(hostname, AMADEUS_HOSTS['test']), api_key, api_secret,
+                                 token_store=create_token_store())
+
+
+class AsyncFlightSearch:
+    """
+    asyncio version of AmadeusFlightSearch.search_flights.
+
+    Wraps the synchronous client for everything that does not touch the
+    network (pair cache, offer conversion, scheduler), so both serving modes
+    share cached pairs and the same upstream rate limit.
+    """
+
+    def __init__(self, flight_search, transport, max_concurrency=None):
+        """
+        Args:
+            flight_search: AmadeusFlightSearch providing the pair cache, scheduler and conversion
+            transport: Async transport (AsyncAmadeusTransport or AsyncSyntheticTransport)
+            max_concurrency: Pairs of one search in flight at once (defaults to the
+                sync client's max_concurrency)
+        """
+        self.flight_search = flight_search
+        self.transport = transport
+        self.max_concurrency = max_concurrency or flight_search.max_concurrency
+        self.pair_flights = AsyncSingleFlight()
+
+    async def search_flights(self, origins, destinations, departure_date, return_date=None, adults=1,
+                             callback=None, stats=None, priority='interactive'):
+        """
+        Search every origin-destination pair concurrently.
+
+        Same arguments and result order as AmadeusFlightSearch.search_flights;
+        callback(route, flights) runs on the event loop in completion order.
+        """
+        flight_search = self.flight_search
+        pairs = flight_search.expand_pairs(origins, destinations, stats)
+        pair_results = [None] * len(pairs)
+
+        cached_pairs = await run_blocking(
+            lambda: [flight_search.cached_pair(origin, destination, departure_date, return_date, adults)
+                     for origin, destination in pairs]
+        )
+        missing = []
+        for index, ((origin, destination), cached) in enumerate(zip(pairs, cached_pairs)):
+            if cached is None:
+                missing.append(index)
+                continue
+
+            pair_results[index] = cached
+            if callback and cached:
+                callback(f"{origin}->{destination}", cached)
+
+        if stats is not None:
+            stats['pairs_total'] = len(pairs)
+            stats['pairs_cached'] = len(pairs) - len(missing)
+            stats['pairs_fetched'] = len(missing)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(index):
+            async with semaphore:
+                return index, await self._search_pair(*pairs[index], departure_date, return_date, adults, priority)
+
+        tasks = [asyncio.ensure_future(run(index)) for index in missing]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                index, flights = await completed
+                pair_results[index] = flights
+                if callback and flights:
+                    origin, destination = pairs[index]
+                    callback(f"{origin}->{destination}", flights)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if stats is not None:
+            await run_blocking(flight_search.record_pair_failures, stats, pairs, departure_date, return_date, adults)
+
+        all_flights = []
+        for flights in pair_results:
+            all_flights.extend(flights)
+        return all_flights
+
+    async def _search_pair(self, origin, destination, departure_date, return_date=None, adults=1,
+                           priority='interactive'):
+        scheduler = self.flight_search.scheduler
+        key = self.flight_search.pair_cache_key(origin, destination, departure_date, return_date, adults)
+        ticket = scheduler.ticket(priority)
+        flights, _ = await self.pair_flights.do(
+            key,
+            lambda: self._fetch_pair(origin, destination, departure_date, return_date, adults, ticket),
+            context=ticket,
+            on_join=lambda leader_ticket: scheduler.promote(leader_ticket, priority)
+        )
+        return flights
+
+    async def _fetch_pair(self, origin, destination, departure_date, return_date, adults, ticket):
+        flight_search = self.flight_search
+        search_params = flight_search.build_search_params(origin, destination, departure_date, return_date, adults)
+        waited = await flight_search.scheduler.acquire_async(ticket=ticket)
+        UPSTREAM_QUEUE_SECONDS.labels(ticket.priority).observe(waited)
+        started = time.perf_counter()
+        try:
+            offers = await self.transport.search_flight_offers(search_params)
+        except ResponseError as error:
+            UPSTREAM_SECONDS.labels('error').observe(time.perf_counter() - started)
+            return await run_blocking(flight_search.handle_pair_error, error, origin, destination, departure_date,
+                                      return_date, adults)
+        UPSTREAM_SECONDS.labels('ok').observe(time.perf_counter() - started)
+
+        return await run_blocking(flight_search.store_pair_offers, offers, origin, destination, departure_date,
+                                  return_date, adults)
+
+    async def aclose(self):
+        await self.transport.aclose()
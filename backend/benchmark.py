@@ -0,0 +1,347 @@
+"""
+Benchmark suite for the search, streaming and trip-planner endpoints
+
+Drives the Flask app in-process against recorded Amadeus flight-offers
+fixtures with injected upstream latency. Reports throughput, p50/p95/p99
+latency, time-to-first-event for the SSE stream and peak memory as JSON, so
+results from two commits can be compared.
+
+Usage:
+    python benchmark.py --requests 40 --concurrency 8 --latency-ms 150 --output bench.json
+    python benchmark.py --compare bench.json --tolerance 0.15
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# The app reads its configuration at import time: force the Amadeus code path
+# without touching the network and keep the benchmark off any shared on-disk cache.
+os.environ['AMADEUS_TRANSPORT'] = 'synthetic'
+os.environ['DEV_MODE'] = 'false'
+os.environ.pop('FARE_CACHE_DB', None)
+
+import app as flask_app  # noqa: E402
+from call_scheduler import CallScheduler  # noqa: E402
+from result_pages import ResultPager  # noqa: E402
+from singleflight import SingleFlight  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURE = os.path.join(BACKEND_DIR, 'fixtures', 'amadeus_flight_offers.json')
+SCENARIOS = ('search', 'stream', 'trip-planner')
+
+
+class FixtureTransport:
+    """
+    Flight offers transport backed by a recorded response.
+
+    Every call sleeps for the injected latency, then returns the fixture's offers
+    re-dated to the requested dates and re-routed to the requested airports.
+    """
+
+    mode = 'fixture'
+
+    def __init__(self, fixture_path, latency_ms=100.0, jitter_ms=0.0, offers_per_pair=None, seed=0):
+        with open(fixture_path) as f:
+            fixture = json.load(f)
+
+        self.offers = fixture['data']
+        self.request = fixture['request']
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.offers_per_pair = offers_per_pair or len(self.offers)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def search_flight_offers(self, params):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+        return self._build_offers(params)
+
+    def _build_offers(self, params):
+        recorded_origin = self.request['originLocationCode']
+        recorded_destination = self.request['destinationLocationCode']
+        codes = {
+            recorded_origin: params['originLocationCode'],
+            recorded_destination: params['destinationLocationCode']
+        }
+        shifts = [self._day_shift(self.request['departureDate'], params['departureDate'])]
+        if params.get('returnDate'):
+            shifts.append(self._day_shift(self.request['returnDate'], params['returnDate']))
+
+        offers = []
+        for index in range(self.offers_per_pair):
+            offer = copy.deepcopy(self.offers[index % len(self.offers)])
+            offer['itineraries'] = offer['itineraries'][:len(shifts)]
+            for itinerary, shift in zip(offer['itineraries'], shifts):
+                for segment in itinerary['segments']:
+                    for point in (segment['departure'], segment['arrival']):
+                        point['iataCode'] = codes.get(point['iataCode'], point['iataCode'])
+                        point['at'] = (datetime.fromisoformat(point['at']) + shift).isoformat()
+
+            # Repeated offers get a small price spread so sorting has work to do
+            if index >= len(self.offers):
+                total = float(offer['price']['total']) * (1 + (index % 17) / 100)
+                offer['price']['total'] = f"{total:.2f}"
+            offers.append(offer)
+        return offers
+
+    @staticmethod
+    def _day_shift(recorded, requested):
+        return datetime.strptime(requested, '%Y-%m-%d') - datetime.strptime(recorded, '%Y-%m-%d')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return round(ordered[min(rank, len(ordered)) - 1], 2)
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'mean': round(sum(values) / len(values), 2),
+        'max': round(max(values), 2)
+    }
+
+
+def build_payload(scenario, index, args):
+    """Request body for one benchmark request; cold runs use a distinct date each time"""
+    offset = 0 if args.warm else index
+    departure = datetime.strptime(args.departure_date, '%Y-%m-%d') + timedelta(days=offset)
+    payload = {
+        'origins': args.origins,
+        'destinations': args.destinations,
+        'departureDate': departure.strftime('%Y-%m-%d')
+    }
+    if scenario == 'trip-planner':
+        payload.update({'tripLength': args.trip_length, 'tripLengthUnit': 'days'})
+    else:
+        payload.update({
+            'tripType': 'round-trip',
+            'returnDate': (departure + timedelta(days=args.trip_length)).strftime('%Y-%m-%d')
+        })
+    return payload
+
+
+def run_request(scenario, payload):
+    """
+    Issue one request through the Flask test client.
+
+    Returns:
+        Tuple of (latency_ms, time_to_first_event_ms or None, ok)
+    """
+    client = flask_app.app.test_client()
+    start = time.perf_counter()
+
+    if scenario == 'stream':
+        response = client.post('/api/search/stream', json=payload, buffered=False)
+        first_event = None
+        ok = response.status_code == 200
+        for chunk in response.response:
+            if first_event is None and chunk.startswith(b'data:'):
+                first_event = (time.perf_counter() - start) * 1000
+            if b'"error"' in chunk:
+                ok = False
+        response.close()
+        return (time.perf_counter() - start) * 1000, first_event, ok
+
+    path = '/api/search' if scenario == 'search' else '/api/trip-planner'
+    response = client.post(path, json=payload)
+    response.get_data()
+    return (time.perf_counter() - start) * 1000, None, response.status_code == 200
+
+
+def reset_caches():
+    """Start a pass from a cold app: every cache, index and in-flight table is emptied"""
+    client = flask_app.amadeus_client
+    flask_app.cache.clear()
+    flask_app.pair_cache.clear()
+    client.negative_pairs.clear()
+    flask_app.fare_calendar.summaries.clear()
+    flask_app.result_pager = ResultPager()
+    with flask_app.revalidating_lock:
+        flask_app.revalidating.clear()
+    flask_app.search_requests = SingleFlight()
+    flask_app.stream_requests = SingleFlight()
+    client.pair_flights = SingleFlight()
+
+
+def run_scenario(scenario, args, upstream):
+    """Run one scenario: a timed concurrent pass, then a short traced pass for peak memory"""
+    reset_caches()
+    calls_before = upstream.calls
+    latencies, first_events, errors = [], [], 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_request, scenario, build_payload(scenario, index, args))
+            for index in range(args.requests)
+        ]
+        for future in futures:
+            latency, first_event, ok = future.result()
+            latencies.append(latency)
+            if first_event is not None:
+                first_events.append(first_event)
+            if not ok:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    upstream_calls = upstream.calls - calls_before
+
+    # Tracing slows allocation-heavy code, so memory is measured in its own pass
+    reset_caches()
+    tracemalloc.start()
+    for index in range(min(args.memory_requests, args.requests)):
+        run_request(scenario, build_payload(scenario, index, args))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'requests': args.requests,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 2) if elapsed else None,
+        'latency_ms': summarize(latencies),
+        'time_to_first_event_ms': summarize(first_events),
+        'upstream_calls': upstream_calls,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare two result files.
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    for scenario, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario)
+        if not previous:
+            continue
+
+        for metric in ('latency_ms', 'time_to_first_event_ms'):
+            for pct in ('p50', 'p95', 'p99'):
+                old = (previous.get(metric) or {}).get(pct)
+                new = (current.get(metric) or {}).get(pct)
+                if old and new and new > old * (1 + tolerance):
+                    regressions.append(f"{scenario} {metric} {pct}: {old} -> {new}")
+
+        old, new = previous.get('throughput_rps'), current.get('throughput_rps')
+        if old and new and new < old * (1 - tolerance):
+            regressions.append(f"{scenario} throughput_rps: {old} -> {new}")
+
+        old, new = previous.get('peak_memory_mb'), current.get('peak_memory_mb')
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{scenario} peak_memory_mb: {old} -> {new}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the WildPass search API against recorded fixtures')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=20, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client requests')
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='Injected upstream latency per call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform +/- jitter on upstream latency')
+    parser.add_argument('--offers-per-pair', type=int, default=50, help='Offers returned per route pair')
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE, help='Recorded flight-offers response')
+    parser.add_argument('--origins', nargs='+', default=['DEN', 'LAS'])
+    parser.add_argument('--destinations', nargs='+', default=['MCO', 'MIA', 'ATL'])
+    parser.add_argument('--departure-date', default=(datetime.now() + timedelta(days=45)).strftime('%Y-%m-%d'))
+    parser.add_argument('--trip-length', type=int, default=4, help='Trip length in days')
+    parser.add_argument('--warm', action='store_true', help='Repeat identical requests (cache-warm path)')
+    parser.add_argument('--memory-requests', type=int, default=3, help='Requests in the traced memory pass')
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help='Upstream calls per second allowed by the scheduler (0 = unlimited)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', help='Baseline JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression')
+    parser.add_argument('--verbose', action='store_true', help='Show app log output')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    upstream = FixtureTransport(
+        args.fixture,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        offers_per_pair=args.offers_per_pair,
+        seed=args.seed
+    )
+    flask_app.amadeus_client.transport = upstream
+    flask_app.amadeus_client.scheduler = CallScheduler(rate_per_second=args.rate_limit)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+        },
+        'scenarios': {}
+    }
+
+    log_sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with log_sink:
+        for scenario in args.scenarios:
+            results['scenarios'][scenario] = run_scenario(scenario, args, upstream)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Wrote benchmark results to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions vs {args.compare} (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+            for regression in regressions:
+                print(f"  - {regression}", file=sys.stderr)
+            return 1
+        print(f"\nNo regressions vs {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
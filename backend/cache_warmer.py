@@ -0,0 +1,321 @@
+"""
+Cache Warmer - Refreshes popular route pairs before their cache entries expire
+
+The warmer keeps the per-route pair cache hot for a set of routes and upcoming
+departure dates, so interactive searches for popular routes (including the
+pairs an "ANY" search fans out to) are answered from cache. Routes come from
+configuration (WARM_ROUTES) and from the routes users actually search. Upstream
+calls go through the scheduler at 'background' priority, behind interactive
+searches and trip planner sweeps.
+
+Runs in-process (CACHE_WARMER_ENABLED=true) or from the command line, where it
+shares results with the app through the persistent fare cache (FARE_CACHE_DB):
+    python cache_warmer.py --routes DEN-ANY LAS-MCO --days 7 --trip-lengths oneway 4 --once
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+import argparse
+import json
+import os
+import threading
+import time
+
+DEFAULT_WARM_DAYS = 7
+DEFAULT_WARM_INTERVAL = 300
+DEFAULT_WARM_TOP_ROUTES = 10
+
+# Observed routes kept for traffic-derived warming before the tail is trimmed
+MAX_TRACKED_ROUTES = 5000
+
+
+def parse_routes(specs: Iterable[str]) -> List[tuple]:
+    """
+    Parse route specs like 'DEN-MCO' or 'DEN-ANY' (comma separated or a list).
+
+    Raises:
+        ValueError: Malformed route spec
+    """
+    routes = []
+    for spec in specs:
+        for item in spec.split(','):
+            item = item.strip().upper()
+            if not item:
+                continue
+            origin, sep, destination = item.partition('-')
+            if not sep or not origin or not destination:
+                raise ValueError(f"Invalid route '{item}' (expected ORIGIN-DESTINATION)")
+            routes.append((origin, destination))
+    return routes
+
+
+def parse_trip_lengths(specs: Iterable[str]) -> List[Optional[int]]:
+    """Parse trip lengths in days; 'oneway' means no return date"""
+    lengths = []
+    for spec in specs:
+        for item in str(spec).split(','):
+            item = item.strip().lower()
+            if not item:
+                continue
+            lengths.append(None if item in ('oneway', 'one-way') else int(item))
+    return lengths
+
+
+class CacheWarmer:
+    """
+    Keeps pair cache entries for popular routes and dates refreshed.
+
+    Each cycle builds the target set (route x trip length x departure day),
+    skips targets whose cache entry outlives refresh_ahead, and refreshes the
+    rest through AmadeusFlightSearch.refresh_pair at background priority.
+    """
+
+    def __init__(self, flight_search, pair_cache, routes=None, trip_lengths=None, days_ahead=None,
+                 interval=None, refresh_ahead=None, top_routes=None):
+        """
+        Args:
+            flight_search: AmadeusFlightSearch used for refreshes
+            pair_cache: The SearchCache holding per-pair results
+            routes: (origin, destination) tuples to always warm; destination may be
+                'ANY' (defaults to WARM_ROUTES)
+            trip_lengths: Trip lengths in days, None for one-way (defaults to
+                WARM_TRIP_LENGTHS, or one-way only)
+            days_ahead: Upcoming departure days to warm (defaults to WARM_DAYS)
+            interval: Seconds between warming cycles (defaults to WARM_INTERVAL)
+            refresh_ahead: Refresh entries expiring within this many seconds
+                (defaults to twice the interval, so nothing lapses between cycles)
+            top_routes: Most searched routes added to the configured ones
+                (defaults to WARM_TOP_ROUTES; 0 disables traffic-derived warming)
+        """
+        if routes is None:
+            routes = parse_routes([os.environ.get('WARM_ROUTES', '')])
+        if trip_lengths is None:
+            trip_lengths = parse_trip_lengths([os.environ.get('WARM_TRIP_LENGTHS', 'oneway')])
+        if days_ahead is None:
+            days_ahead = int(os.environ.get('WARM_DAYS', DEFAULT_WARM_DAYS))
+        if interval is None:
+            interval = float(os.environ.get('WARM_INTERVAL', DEFAULT_WARM_INTERVAL))
+        if top_routes is None:
+            top_routes = int(os.environ.get('WARM_TOP_ROUTES', DEFAULT_WARM_TOP_ROUTES))
+
+        self.flight_search = flight_search
+        self.pair_cache = pair_cache
+        self.routes = list(routes)
+        self.trip_lengths = list(trip_lengths) or [None]
+        self.days_ahead = max(1, days_ahead)
+        self.interval = interval
+        self.refresh_ahead = 2 * interval if refresh_ahead is None else refresh_ahead
+        self.top_routes = max(0, top_routes)
+
+        self._traffic = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._cycles = 0
+        self._last_report = None
+
+    def record(self, origins, destinations, departure_date, return_date=None):
+        """Count a user search towards the traffic-derived route set"""
+        trip_days = None
+        if return_date:
+            try:
+                trip_days = (datetime.strptime(return_date, '%Y-%m-%d') -
+                             datetime.strptime(departure_date, '%Y-%m-%d')).days
+            except (TypeError, ValueError):
+                return
+
+        with self._lock:
+            for origin in origins:
+                for destination in destinations:
+                    if origin != destination:
+                        self._traffic[(origin, destination, trip_days)] += 1
+
+            if len(self._traffic) > MAX_TRACKED_ROUTES:
+                self._traffic = Counter(dict(self._traffic.most_common(MAX_TRACKED_ROUTES // 2)))
+
+    def targets(self, today=None) -> List[tuple]:
+        """
+        Build the current warming target set.
+
+        Returns:
+            List of (origin, destination, departure_date, return_date) tuples,
+            configured routes first, then the most searched routes
+        """
+        route_lengths = [
+            (origin, destination, trip_days)
+            for origin, destination in self.routes
+            for trip_days in self.trip_lengths
+        ]
+        if self.top_routes:
+            with self._lock:
+                route_lengths.extend(route for route, _ in self._traffic.most_common(self.top_routes))
+
+        today = today or datetime.now().date()
+        targets = []
+        seen = set()
+        for origin, destination, trip_days in route_lengths:
+            for _, expanded in self.flight_search.expand_pairs([origin], [destination]):
+                for day in range(self.days_ahead):
+                    departure = today + timedelta(days=day)
+                    return_date = None
+                    if trip_days is not None:
+                        return_date = (departure + timedelta(days=trip_days)).strftime('%Y-%m-%d')
+                    target = (origin, expanded, departure.strftime('%Y-%m-%d'), return_date)
+                    if target not in seen:
+                        seen.add(target)
+                        targets.append(target)
+        return targets
+
+    def run_once(self) -> dict:
+        """
+        Run one warming cycle.
+
+        Returns:
+            Coverage report: targets, covered (cached after the cycle), coverage
+            ratio, refreshed, failed, already_fresh and backing_off (pairs in error
+            backoff) counts, and duration
+        """
+        started = time.perf_counter()
+        targets = self.targets()
+        refreshed = failed = already_fresh = covered = backing_off = 0
+
+        for origin, destination, departure_date, return_date in targets:
+            if self._stop.is_set():
+                break
+
+            key = self.flight_search.pair_cache_key(origin, destination, departure_date, return_date)
+            remaining = self.pair_cache.ttl_remaining(key)
+            if remaining is not None and remaining > self.refresh_ahead:
+                already_fresh += 1
+                covered += 1
+                continue
+
+            # Negative entries are short-lived by design; let them expire instead
+            # of re-fetching pairs with no offers or an upstream failing every cycle
+            reason = self.flight_search.negative_reason(key)
+            if reason == 'error':
+                backing_off += 1
+                continue
+            if reason == 'empty':
+                already_fresh += 1
+                covered += 1
+                continue
+
+            try:
+                self.flight_search.refresh_pair(origin, destination, departure_date, return_date, priority='background')
+            except Exception as e:
+                print(f"Cache warmer failed to refresh {key}: {e}")
+
+            # refresh_pair returns [] for upstream errors, so success is judged by the
+            # cache: failed pairs are either not cached or cached as a negative 'error' entry
+            if self.pair_cache.ttl_remaining(key) is not None and self.flight_search.negative_reason(key) != 'error':
+                refreshed += 1
+                covered += 1
+            else:
+                failed += 1
+
+        report = {
+            'targets': len(targets),
+            'covered': covered,
+            'coverage': round(covered / len(targets), 3) if targets else 1.0,
+            'refreshed': refreshed,
+            'failed': failed,
+            'already_fresh': already_fresh,
+            'backing_off': backing_off,
+            'duration_s': round(time.perf_counter() - started, 2),
+            'finished_at': datetime.now().isoformat(timespec='seconds')
+        }
+        with self._lock:
+            self._cycles += 1
+            self._last_report = report
+        return report
+
+    def start(self) -> None:
+        """Start warming every interval on a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='cache-warmer', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the warming thread after its current refresh"""
+        self._stop.set()
+        self._thread = None
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            try:
+                report = self.run_once()
+                print(f"Cache warmer: {report['covered']}/{report['targets']} pairs covered, "
+                      f"{report['refreshed']} refreshed, {report['failed']} failed")
+            except Exception as e:
+                print(f"Cache warmer cycle failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'running': self._thread is not None,
+                'interval_seconds': self.interval,
+                'days_ahead': self.days_ahead,
+                'configured_routes': len(self.routes),
+                'observed_routes': len(self._traffic),
+                'cycles': self._cycles,
+                'last_run': self._last_report
+            }
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from amadeus_api import AmadeusFlightSearch
+    from fare_store import SQLiteFareStore
+    from search_cache import SearchCache
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Warm the WildPass pair cache for popular routes')
+    parser.add_argument('--routes', nargs='+', default=[os.environ.get('WARM_ROUTES', '')],
+                        help='Routes like DEN-MCO or DEN-ANY (default: WARM_ROUTES)')
+    parser.add_argument('--trip-lengths', nargs='+', default=[os.environ.get('WARM_TRIP_LENGTHS', 'oneway')],
+                        help="Trip lengths in days, or 'oneway' (default: WARM_TRIP_LENGTHS)")
+    parser.add_argument('--days', type=int, default=int(os.environ.get('WARM_DAYS', DEFAULT_WARM_DAYS)),
+                        help='Upcoming departure days to warm')
+    parser.add_argument('--interval', type=float,
+                        default=float(os.environ.get('WARM_INTERVAL', DEFAULT_WARM_INTERVAL)),
+                        help='Seconds between cycles')
+    parser.add_argument('--ttl', type=float, default=3600, help='Pair cache TTL in seconds (match the app)')
+    parser.add_argument('--db', default=os.environ.get('FARE_CACHE_DB'),
+                        help='Persistent fare cache shared with the app (default: FARE_CACHE_DB)')
+    parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+    args = parser.parse_args(argv)
+
+    routes = parse_routes(args.routes)
+    if not routes:
+        parser.error('no routes to warm (pass --routes or set WARM_ROUTES)')
+    if not args.db:
+        print('Warning: no FARE_CACHE_DB set, warmed results will not be visible to the app')
+
+    pair_cache = SearchCache(
+        ttl_seconds=args.ttl,
+        backing_store=SQLiteFareStore(args.db) if args.db else None
+    )
+    warmer = CacheWarmer(
+        AmadeusFlightSearch(pair_cache=pair_cache),
+        pair_cache,
+        routes=routes,
+        trip_lengths=parse_trip_lengths(args.trip_lengths),
+        days_ahead=args.days,
+        interval=args.interval,
+        top_routes=0
+    )
+
+    while True:
+        print(json.dumps(warmer.run_once()))
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
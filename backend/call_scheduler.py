@@ -0,0 +1,284 @@
+"""
+Call Scheduler - Quota-aware priority scheduling for outbound Amadeus calls
+
+Every flight offers request waits for a token from a shared token bucket sized
+to the Amadeus rate limit. When callers are queued, tokens go to the highest
+priority class first (interactive searches, then trip planner sweeps, then
+background work) and first-come first-served within a class, so a large
+planner sweep can no longer starve a user waiting on a search. A queued caller
+holding a CallTicket can be promoted to a higher class while it waits.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Highest priority first
+PRIORITY_CLASSES = ('interactive', 'planner', 'background')
+
+# Amadeus self-service allows 10 transactions per second (override with AMADEUS_RATE_LIMIT)
+DEFAULT_RATE_LIMIT = 10.0
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at rate tokens per second up to capacity.
+
+    Not thread-safe on its own; CallScheduler serializes access.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity else max(1.0, rate))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """
+        Take one token if available.
+
+        Returns:
+            0.0 if a token was taken, otherwise seconds until the next token
+        """
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def available(self) -> float:
+        self._refill(time.monotonic())
+        return self.tokens
+
+
+class CallTicket:
+    """
+    A caller's place in the scheduler queue, which other callers may promote.
+
+    Created by CallScheduler.ticket() and passed to acquire()/acquire_async().
+    """
+
+    __slots__ = ('priority', 'entry')
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.entry = None  # [class index, sequence] while queued
+
+
+class _ClassMetrics:
+    """Queue depth and wait time counters for one priority class"""
+
+    __slots__ = ('queue_depth', 'max_queue_depth', 'granted', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'granted': self.granted,
+            'avg_wait_ms': round(self.total_wait / self.granted * 1000, 2) if self.granted else 0.0,
+            'max_wait_ms': round(self.max_wait * 1000, 2)
+        }
+
+
+class CallScheduler:
+    """
+    Rate limiter with priority classes for upstream calls.
+
+    Usage:
+        scheduler = CallScheduler(rate_per_second=10)
+        data = scheduler.call(lambda: transport.search_flight_offers(params), 'planner')
+    """
+
+    def __init__(self, rate_per_second: Optional[float] = None, burst: Optional[float] = None):
+        """
+        Args:
+            rate_per_second: Sustained calls per second (defaults to AMADEUS_RATE_LIMIT;
+                0 disables rate limiting but still records metrics)
+            burst: Calls allowed back to back after an idle period
+                (defaults to AMADEUS_RATE_BURST, or the rate)
+        """
+        if rate_per_second is None:
+            rate_per_second = float(os.environ.get('AMADEUS_RATE_LIMIT', DEFAULT_RATE_LIMIT))
+        if burst is None and os.environ.get('AMADEUS_RATE_BURST'):
+            burst = float(os.environ['AMADEUS_RATE_BURST'])
+
+        self.rate_per_second = max(0.0, float(rate_per_second))
+        self._bucket = TokenBucket(self.rate_per_second, burst) if self.rate_per_second > 0 else None
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._metrics = {priority: _ClassMetrics() for priority in PRIORITY_CLASSES}
+
+    def ticket(self, priority: str = 'interactive') -> CallTicket:
+        """
+        A ticket for acquire() that promote() can move to a higher class.
+
+        Raises:
+            ValueError: Unknown priority class
+        """
+        self._check_priority(priority)
+        return CallTicket(priority)
+
+    def promote(self, ticket: CallTicket, priority: str) -> bool:
+        """
+        Raise a ticket to a higher priority class, even while it is queued.
+
+        Returns:
+            True if the ticket was promoted, False if already at or above priority
+
+        Raises:
+            ValueError: Unknown priority class
+        """
+        self._check_priority(priority)
+        with self._cond:
+            if PRIORITY_CLASSES.index(priority) >= PRIORITY_CLASSES.index(ticket.priority):
+                return False
+            if ticket.entry is not None:
+                # Re-rank the queued entry in place; its waiter holds the same list
+                ticket.entry[0] = PRIORITY_CLASSES.index(priority)
+                heapq.heapify(self._waiting)
+                self._metrics[ticket.priority].queue_depth -= 1
+                metrics = self._metrics[priority]
+                metrics.queue_depth += 1
+                metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+                self._cond.notify_all()
+            ticket.priority = priority
+            return True
+
+    def _check_priority(self, priority):
+        if priority not in self._metrics:
+            raise ValueError(f"Unknown priority class '{priority}' (expected one of {', '.join(PRIORITY_CLASSES)})")
+
+    def _enqueue(self, ticket):
+        """Under the lock: queue a ticket at its current priority"""
+        ticket.entry = [PRIORITY_CLASSES.index(ticket.priority), next(self._sequence)]
+        heapq.heappush(self._waiting, ticket.entry)
+        metrics = self._metrics[ticket.priority]
+        metrics.queue_depth += 1
+        metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+        return ticket.entry
+
+    def _record_grant(self, ticket, started):
+        """Under the lock: count a grant in the class the ticket ended up in"""
+        waited = time.monotonic() - started
+        metrics = self._metrics[ticket.priority]
+        metrics.granted += 1
+        metrics.total_wait += waited
+        metrics.max_wait = max(metrics.max_wait, waited)
+        return waited
+
+    def acquire(self, priority: str = 'interactive', ticket: Optional[CallTicket] = None) -> float:
+        """
+        Block until this caller may make one upstream call.
+
+        Args:
+            priority: One of PRIORITY_CLASSES
+            ticket: Optional CallTicket from ticket(), so other callers can
+                promote() this one while it waits; its priority is used instead
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            ValueError: Unknown priority class
+        """
+        if ticket is None:
+            ticket = self.ticket(priority)
+        started = time.monotonic()
+
+        with self._cond:
+            if self._bucket is not None:
+                entry = self._enqueue(ticket)
+                try:
+                    while True:
+                        if self._waiting[0] is entry:
+                            delay = self._bucket.try_acquire()
+                            if delay == 0:
+                                heapq.heappop(self._waiting)
+                                break
+                            self._cond.wait(delay)
+                        else:
+                            self._cond.wait()
+                except BaseException:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    raise
+                finally:
+                    ticket.entry = None
+                    self._metrics[ticket.priority].queue_depth -= 1
+                    # The next caller in line may now be at the head of the queue
+                    self._cond.notify_all()
+
+            return self._record_grant(ticket, started)
+
+    async def acquire_async(self, priority: str = 'interactive', ticket: Optional[CallTicket] = None) -> float:
+        """
+        Coroutine version of acquire() for the asyncio search path.
+
+        Joins the same priority queue as threaded callers, but waits with
+        asyncio.sleep so the event loop keeps serving other requests.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if ticket is None:
+            ticket = self.ticket(priority)
+        started = time.monotonic()
+
+        if self._bucket is not None:
+            with self._cond:
+                entry = self._enqueue(ticket)
+
+            granted = False
+            try:
+                while True:
+                    with self._cond:
+                        if self._waiting[0] is entry:
+                            delay = self._bucket.try_acquire()
+                            if delay == 0:
+                                heapq.heappop(self._waiting)
+                                granted = True
+                                break
+                        else:
+                            # Threaded waiters are woken by notify; coroutines poll
+                            delay = 1 / self.rate_per_second
+                    await asyncio.sleep(delay)
+            finally:
+                with self._cond:
+                    if not granted:
+                        self._waiting.remove(entry)
+                        heapq.heapify(self._waiting)
+                    ticket.entry = None
+                    self._metrics[ticket.priority].queue_depth -= 1
+                    self._cond.notify_all()
+
+        with self._cond:
+            return self._record_grant(ticket, started)
+
+    def call(self, fn: Callable[[], Any], priority: str = 'interactive') -> Any:
+        """Wait for a slot in the given priority class, then run fn()"""
+        self.acquire(priority)
+        return fn()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'rate_per_second': self.rate_per_second,
+                'burst': self._bucket.capacity if self._bucket else None,
+                'tokens_available': round(self._bucket.available(), 2) if self._bucket else None,
+                'classes': {priority: metrics.to_dict() for priority, metrics in self._metrics.items()}
+            }
@@ -0,0 +1,287 @@
+"""
+Fare Calendar - Cheapest fare, GoWild availability and blackouts per day
+
+Builds a flexible-date grid (e.g. the next 30 days) for a set of route pairs in
+one call. Every (route, day) cell is reduced to a small summary that is kept in
+its own index for as long as the underlying pair results stay cached, so
+repeated and overlapping calendars are answered from summaries alone. Cells
+missing from both the index and the pair cache are fetched concurrently
+through the normal pair search (single-flight, rate limit scheduler), and the
+GoWild blackout index is merged in per day.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os
+from typing import List, Optional
+
+from amadeus_api import AmadeusFlightSearch
+from gowild_blackout import GoWildBlackoutDates
+from search_cache import SearchCache
+
+DEFAULT_CALENDAR_CONCURRENCY = 6
+DEFAULT_CALENDAR_DAYS = 30
+MAX_CALENDAR_DAYS = 62
+DEFAULT_CALENDAR_MAX_CELLS = 300
+DEFAULT_CALENDAR_MAX_FETCH = 30
+
+
+def summarize_pair(flights) -> dict:
+    """
+    Reduce one pair's offers for one day to a calendar cell.
+
+    Args:
+        flights: FlightRecords (or flight dicts) for a single route and date
+
+    Returns:
+        Dict with offer counts and the cheapest overall and GoWild eligible offers
+    """
+    summary = {
+        'offers': 0,
+        'gowild_offers': 0,
+        'nonstop_offers': 0,
+        'cheapest': None,
+        'cheapest_gowild': None
+    }
+    cheapest = cheapest_gowild = None
+    for flight in flights:
+        summary['offers'] += 1
+        if flight.get('stops', 0) == 0:
+            summary['nonstop_offers'] += 1
+        if cheapest is None or flight['price'] < cheapest['price']:
+            cheapest = flight
+        if flight.get('gowild_eligible'):
+            summary['gowild_offers'] += 1
+            if cheapest_gowild is None or flight['price'] < cheapest_gowild['price']:
+                cheapest_gowild = flight
+
+    summary['cheapest'] = _fare(cheapest)
+    summary['cheapest_gowild'] = _fare(cheapest_gowild)
+    return summary
+
+
+def _fare(flight):
+    if flight is None:
+        return None
+    return {
+        'price': flight['price'],
+        'currency': flight.get('currency'),
+        'route': f"{flight.get('origin')}->{flight.get('destination')}",
+        'flight_number': flight.get('flight_number'),
+        'departure_time': flight.get('departure_time'),
+        'stops': flight.get('stops', 0)
+    }
+
+
+class FareCalendar:
+    """
+    Per-day fare grid over a date window, backed by a (route, day) summary index.
+
+    Usage:
+        calendar = FareCalendar(amadeus_client, pair_cache)
+        grid = calendar.build(['DEN'], ['MCO', 'LAS'], '2025-06-01', days=30)
+    """
+
+    def __init__(self, flight_search, pair_cache, max_workers: Optional[int] = None,
+                 max_entries: Optional[int] = None, max_cells: Optional[int] = None,
+                 max_fetch: Optional[int] = None):
+        """
+        Args:
+            flight_search: AmadeusFlightSearch used for missing cells (None: cached data only)
+            pair_cache: The pair cache the flight search fills
+            max_workers: Cells fetched upstream at once (defaults to CALENDAR_MAX_CONCURRENCY)
+            max_entries: Summaries kept in the index (defaults to CALENDAR_INDEX_MAX_ENTRIES)
+            max_cells: Largest route-day grid one request may build (defaults to
+                CALENDAR_MAX_CELLS)
+            max_fetch: Uncached cells fetched upstream per request, earliest days first
+                (defaults to CALENDAR_MAX_FETCH); the rest are left incomplete
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get('CALENDAR_MAX_CONCURRENCY', DEFAULT_CALENDAR_CONCURRENCY))
+        if max_entries is None:
+            max_entries = int(os.environ.get('CALENDAR_INDEX_MAX_ENTRIES', '50000'))
+        if max_cells is None:
+            max_cells = int(os.environ.get('CALENDAR_MAX_CELLS', DEFAULT_CALENDAR_MAX_CELLS))
+        if max_fetch is None:
+            max_fetch = int(os.environ.get('CALENDAR_MAX_FETCH', DEFAULT_CALENDAR_MAX_FETCH))
+        self.flight_search = flight_search
+        self.pair_cache = pair_cache
+        self.max_workers = max(1, max_workers)
+        self.max_cells = max(1, max_cells)
+        self.max_fetch = max(0, max_fetch)
+
+        # Summaries are a few hundred bytes; each one expires with its pair cache entry
+        self.summaries = SearchCache(
+            ttl_seconds=pair_cache.ttl_seconds if pair_cache is not None else 3600,
+            max_entries=max_entries,
+            max_bytes=64 * 1024 * 1024
+        )
+
+    def build(self, origins: List[str], destinations: List[str], start_date: str,
+              days: int = DEFAULT_CALENDAR_DAYS, trip_length: Optional[int] = None,
+              priority: str = 'interactive') -> dict:
+        """
+        Build the calendar for every origin-destination pair over a date window.
+
+        Cells come from the summary index or the pair cache; at most max_fetch
+        missing cells are searched upstream, earliest days first. Days with
+        cells still missing are returned with complete=False and fill in on
+        later requests as the pair cache warms.
+
+        Args:
+            origins: Origin airport codes
+            destinations: Destination airport codes (or ['ANY'])
+            start_date: First departure date (YYYY-MM-DD)
+            days: Number of departure days
+            trip_length: Optional round-trip length in days (one-way fares if None)
+            priority: Scheduler priority class for upstream fetches
+
+        Returns:
+            Dict with one entry per day ('days') and index/cache/fetch/pending
+            counts ('stats')
+
+        Raises:
+            ValueError: Invalid start date, day count or trip length, or more
+                route-days than max_cells
+        """
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        if not 1 <= days <= MAX_CALENDAR_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_CALENDAR_DAYS}")
+        if trip_length is not None and trip_length < 0:
+            raise ValueError("tripLength must not be negative")
+
+        if self.flight_search is not None:
+            pairs = self.flight_search.expand_pairs(origins, destinations)
+        else:
+            pairs = [(origin, destination) for origin in origins for destination in destinations
+                     if origin != destination]
+        if len(pairs) * days > self.max_cells:
+            raise ValueError(
+                f"Calendar would cover {len(pairs)} routes x {days} days = {len(pairs) * days} cells "
+                f"(max {self.max_cells}); search fewer routes or days"
+            )
+
+        dates = []
+        for offset in range(days):
+            departure = start + timedelta(days=offset)
+            return_date = (departure + timedelta(days=trip_length)).strftime('%Y-%m-%d') if trip_length is not None else None
+            dates.append((departure.strftime('%Y-%m-%d'), return_date))
+
+        cells = {}
+        missing = []
+        stats = {'cells': len(pairs) * len(dates), 'from_index': 0, 'from_pair_cache': 0, 'fetched': 0, 'pending': 0}
+        for departure_date, return_date in dates:
+            for origin, destination in pairs:
+                cell = (origin, destination, departure_date, return_date)
+                summary = self.summaries.get(self._summary_key(cell))
+                if summary is not None:
+                    stats['from_index'] += 1
+                    cells[cell] = summary
+                    continue
+
+                flights = self._cached_flights(cell)
+                if flights is not None:
+                    stats['from_pair_cache'] += 1
+                    cells[cell] = self._index(cell, flights)
+                else:
+                    missing.append(cell)
+
+        # Missing cells are in day order, so the budget goes to the earliest days
+        fetch = missing[:self.max_fetch] if self.flight_search is not None else []
+        if fetch:
+            stats['fetched'] = len(fetch)
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fare-calendar') as executor:
+                results = executor.map(lambda cell: self._fetch(cell, priority), fetch)
+                for cell, summary in zip(fetch, results):
+                    cells[cell] = summary
+        stats['pending'] = len(missing) - len(fetch)
+
+        blackouts = GoWildBlackoutDates.classify_dates([departure_date for departure_date, _ in dates])
+        if trip_length is not None:
+            return_blackouts = GoWildBlackoutDates.classify_dates([return_date for _, return_date in dates])
+        else:
+            return_blackouts = [(False, None)] * len(dates)
+
+        calendar_days = [
+            self._day(departure_date, return_date, pairs, cells, blackout, return_blackout)
+            for (departure_date, return_date), blackout, return_blackout in zip(dates, blackouts, return_blackouts)
+        ]
+        return {'days': calendar_days, 'stats': stats}
+
+    def _day(self, departure_date, return_date, pairs, cells, blackout, return_blackout):
+        """Merge the day's route cells and blackout status into one calendar entry"""
+        cheapest = cheapest_gowild = None
+        offers = gowild_offers = routes_with_fares = 0
+        resolved = 0
+        for origin, destination in pairs:
+            summary = cells.get((origin, destination, departure_date, return_date))
+            if summary is None:
+                continue
+            resolved += 1
+            offers += summary['offers']
+            gowild_offers += summary['gowild_offers']
+            if summary['offers']:
+                routes_with_fares += 1
+            if summary['cheapest'] and (cheapest is None or summary['cheapest']['price'] < cheapest['price']):
+                cheapest = summary['cheapest']
+            if summary['cheapest_gowild'] and (
+                    cheapest_gowild is None or summary['cheapest_gowild']['price'] < cheapest_gowild['price']):
+                cheapest_gowild = summary['cheapest_gowild']
+
+        is_blackout = blackout[0] or return_blackout[0]
+        return {
+            'date': departure_date,
+            'return_date': return_date,
+            'cheapest': cheapest,
+            'cheapest_gowild': cheapest_gowild,
+            'offers': offers,
+            'gowild_offers': gowild_offers,
+            'routes_with_fares': routes_with_fares,
+            # GoWild passes cannot be used on blackout days, whatever the fare class
+            'gowild_available': gowild_offers > 0 and not is_blackout,
+            'blackout': is_blackout,
+            'blackout_reason': blackout[1] or return_blackout[1],
+            'complete': resolved == len(pairs)
+        }
+
+    def _cached_flights(self, cell):
+        if self.flight_search is not None:
+            # Counts negative entries (no offers, upstream backoff) as avoided calls
+            return self.flight_search.cached_pair(*cell)
+        if self.pair_cache is None:
+            return None
+        return self.pair_cache.get(self._pair_key(cell))
+
+    def _fetch(self, cell, priority):
+        origin, destination, departure_date, return_date = cell
+        try:
+            flights = self.flight_search.refresh_pair(origin, destination, departure_date, return_date,
+                                                      priority=priority)
+        except Exception as e:
+            print(f"Error fetching calendar cell {origin}->{destination} {departure_date}: {str(e)}")
+            return None
+        return self._index(cell, flights)
+
+    def _index(self, cell, flights):
+        """
+        Summarize a cell and keep the summary while the pair's results are cached.
+
+        Failed searches return no flights and are not cached; their summaries
+        are used for this calendar only.
+        """
+        summary = summarize_pair(flights)
+        remaining = self.pair_cache.ttl_remaining(self._pair_key(cell)) if self.pair_cache is not None else None
+        if remaining:
+            self.summaries.set(self._summary_key(cell), summary, ttl_seconds=remaining)
+        return summary
+
+    @staticmethod
+    def _pair_key(cell):
+        return AmadeusFlightSearch.pair_cache_key(*cell)
+
+    @staticmethod
+    def _summary_key(cell):
+        origin, destination, departure_date, return_date = cell
+        return f"calendar:{origin}_{destination}_{departure_date}_{return_date}"
+
+    def stats(self) -> dict:
+        return {'index': self.summaries.stats()}
@@ -0,0 +1,161 @@
+"""
+Fare Store - Persistent SQLite cache backend shared across worker processes
+
+Stores JSON-encoded search results with an absolute expiry time. The database
+runs in WAL mode so readers in every gunicorn worker proceed concurrently with
+a single writer, and entries survive restarts and deploys.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+
+class SQLiteFareStore:
+    """
+    On-disk key/value store with TTL metadata, used as the cold tier behind SearchCache.
+
+    Each thread gets its own connection. Database errors are logged and treated
+    as cache misses so a broken or locked file never fails a search.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 2000):
+        """
+        Args:
+            path: Path to the SQLite database file (created if missing)
+            busy_timeout_ms: How long to wait on a locked database before giving up
+        """
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS fares ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_fares_expires_at ON fares (expires_at)')
+        conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        Look up an unexpired entry.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (json_text, expires_at_epoch), or None if missing or expired
+        """
+        try:
+            row = self._connect().execute(
+                'SELECT value, expires_at FROM fares WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Fare store read failed for {key}: {e}")
+            return None
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, json_text: str, expires_at: float) -> None:
+        """
+        Insert or replace an entry.
+
+        Args:
+            key: Cache key
+            json_text: JSON-encoded value
+            expires_at: Absolute expiry as a Unix timestamp
+        """
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO fares (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                (key, json_text, time.time(), expires_at)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Fare store write failed for {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present"""
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM fares WHERE key = ?', (key,))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Fare store delete failed for {key}: {e}")
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        try:
+            conn = self._connect()
+            conn.execute('DELETE FROM fares')
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Fare store clear failed: {e}")
+
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        """
+        Iterate over unexpired entries whose key starts with prefix.
+
+        Yields:
+            Tuples of (key, json_text)
+        """
+        try:
+            rows = self._connect().execute(
+                "SELECT key, value FROM fares WHERE key LIKE ? ESCAPE '\\' AND expires_at > ?",
+                (prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%', time.time())
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Fare store scan failed: {e}")
+            return
+        yield from rows
+
+    def purge_expired(self) -> int:
+        """
+        Delete every expired entry (uses the expires_at index).
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            conn = self._connect()
+            cursor = conn.execute('DELETE FROM fares WHERE expires_at <= ?', (time.time(),))
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Fare store purge failed: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        """Get entry counts and database size"""
+        try:
+            total, valid = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(expires_at > ?), 0) FROM fares', (time.time(),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Fare store stats failed: {e}")
+            total, valid = 0, 0
+        return {
+            'path': self.path,
+            'total_entries': total,
+            'valid_entries': valid,
+            'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000)
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
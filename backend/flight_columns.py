@@ -0,0 +1,305 @@
+"""
+Flight Columns - Columnar (struct of arrays) container for large result sets
+
+Instead of one dict per offer, numeric fields live in typed stdlib arrays and
+string fields are stored as indexes into a shared table of interned strings.
+Blackout info dicts are shared between rows with identical content. Filtering,
+sorting and trip scoring work on row indexes; dicts in the app's flight format
+are only materialized by to_dicts() when a response is serialized.
+"""
+from array import array
+from datetime import date
+from functools import lru_cache
+import math
+import sys
+from typing import Iterable, List, Optional
+
+# Bit flags stored per row
+FLAG_GOWILD = 1
+FLAG_ROUND_TRIP = 2
+FLAG_BLACKOUT = 4
+
+# Epoch-minute value for rows whose date/time could not be parsed
+INVALID_TIME = -(2 ** 62)
+
+# String fields of a single itinerary, in the order _parse_itinerary emits them
+LEG_STRING_FIELDS = (
+    'origin', 'destination', 'departure_time', 'arrival_time', 'departure_date',
+    'arrival_date', 'duration', 'airline', 'flight_number'
+)
+LEG_TRAILING_FIELDS = ('aircraft', 'booking_class')
+
+SORT_KEYS = ('price', 'nonstop', 'earliest', 'longest-trip')
+
+
+@lru_cache(maxsize=4096)
+def _minute_of_day(time_str):
+    """Parse '02:30 PM' or '14:30' into minutes after midnight (None if invalid)"""
+    try:
+        clock, _, meridiem = time_str.partition(' ')
+        hours, minutes = clock.split(':')
+        hours, minutes = int(hours), int(minutes)
+        if meridiem:
+            if not 1 <= hours <= 12 or meridiem.upper() not in ('AM', 'PM'):
+                return None
+            hours = hours % 12 + (12 if meridiem.upper() == 'PM' else 0)
+        if not (0 <= hours < 24 and 0 <= minutes < 60):
+            return None
+        return hours * 60 + minutes
+    except (AttributeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _day_ordinal(date_str):
+    try:
+        return date.fromisoformat(date_str).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def epoch_minutes(date_str, time_str):
+    """Minutes since 0001-01-01 for a local date and time, or INVALID_TIME"""
+    ordinal = _day_ordinal(date_str)
+    minute = _minute_of_day(time_str)
+    if ordinal is None or minute is None:
+        return INVALID_TIME
+    return ordinal * 1440 + minute
+
+
+class _LegColumns:
+    """Columns for one direction of travel"""
+
+    __slots__ = ('strings', 'stops', 'trailing')
+
+    def __init__(self):
+        self.strings = {field: array('I') for field in LEG_STRING_FIELDS}
+        self.trailing = {field: array('I') for field in LEG_TRAILING_FIELDS}
+        self.stops = array('h')
+
+    def append(self, leg, intern):
+        for field, column in self.strings.items():
+            column.append(intern(leg.get(field)))
+        for field, column in self.trailing.items():
+            column.append(intern(leg.get(field)))
+        self.stops.append(leg.get('stops', 0))
+
+    def append_empty(self):
+        for column in self.strings.values():
+            column.append(0)
+        for column in self.trailing.values():
+            column.append(0)
+        self.stops.append(-1)
+
+    def to_dict(self, row, strings):
+        leg = {field: strings[column[row]] for field, column in self.strings.items()}
+        leg['stops'] = self.stops[row]
+        for field, column in self.trailing.items():
+            leg[field] = strings[column[row]]
+        return leg
+
+
+class FlightColumns:
+    """
+    Struct-of-arrays container for flight offers in the app's format.
+
+    Rows are addressed by integer index. Query methods take and return lists
+    of row indexes so filters and sorts compose without copying columns.
+    """
+
+    def __init__(self):
+        self._strings = [None]
+        self._string_ids = {None: 0}
+        self._blackouts = []
+        self._blackout_ids = {}
+
+        self.price = array('d')
+        self.total_price = array('d')
+        self.currency = array('I')
+        self.seats = array('i')
+        self.flags = array('B')
+        self.blackout = array('I')
+        self.depart_at = array('q')
+        self.return_arrive_at = array('q')
+
+        self.outbound = _LegColumns()
+        self.inbound = _LegColumns()
+
+    @classmethod
+    def from_flights(cls, flights: Iterable[dict]) -> 'FlightColumns':
+        """Build a container from flight dicts in the app's format"""
+        columns = cls()
+        columns.extend(flights)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def extend(self, flights: Iterable[dict]) -> None:
+        """Append flight dicts in the app's format"""
+        for flight in flights:
+            self.append(flight)
+
+    def append(self, flight: dict) -> None:
+        """Append a single flight dict in the app's format"""
+        intern = self._intern
+        return_flight = flight.get('return_flight') if flight.get('is_round_trip') else None
+        blackout_info = flight.get('blackout_dates')
+
+        flags = 0
+        if flight.get('gowild_eligible'):
+            flags |= FLAG_GOWILD
+        if return_flight is not None:
+            flags |= FLAG_ROUND_TRIP
+        if blackout_info and blackout_info.get('has_blackout'):
+            flags |= FLAG_BLACKOUT
+
+        seats = flight.get('seats_remaining')
+
+        self.price.append(flight['price'])
+        self.total_price.append(flight.get('total_price', math.nan) if return_flight is not None else math.nan)
+        self.currency.append(intern(flight.get('currency')))
+        self.seats.append(-1 if seats is None else seats)
+        self.flags.append(flags)
+        self.blackout.append(self._share_blackout(blackout_info))
+        self.depart_at.append(epoch_minutes(flight.get('departure_date'), flight.get('departure_time')))
+
+        self.outbound.append(flight, intern)
+        if return_flight is not None:
+            self.inbound.append(return_flight, intern)
+            self.return_arrive_at.append(
+                epoch_minutes(return_flight.get('arrival_date'), return_flight.get('arrival_time'))
+            )
+        else:
+            self.inbound.append_empty()
+            self.return_arrive_at.append(INVALID_TIME)
+
+    def rows(self) -> List[int]:
+        """All row indexes in insertion order"""
+        return list(range(len(self)))
+
+    def filter(self, rows: Optional[List[int]] = None, nonstop: bool = False, gowild_eligible: bool = False,
+               blackout_free: bool = False, max_price: Optional[float] = None,
+               depart_after: Optional[int] = None, depart_before: Optional[int] = None) -> List[int]:
+        """
+        Select rows matching every given predicate.
+
+        Args:
+            rows: Row indexes to filter (all rows if None)
+            nonstop: Only offers whose outbound flight is nonstop (as the results page does)
+            gowild_eligible: Only GoWild eligible offers
+            blackout_free: Only offers not affected by GoWild blackout dates
+            max_price: Only offers priced at or below this
+            depart_after: Minutes after midnight the outbound must depart at or after
+            depart_before: Minutes after midnight the outbound must depart at or before
+
+        Returns:
+            Matching row indexes, in the order given
+        """
+        if rows is None:
+            rows = self.rows()
+
+        flags = self.flags
+        if gowild_eligible:
+            rows = [row for row in rows if flags[row] & FLAG_GOWILD]
+        if blackout_free:
+            rows = [row for row in rows if not flags[row] & FLAG_BLACKOUT]
+        if nonstop:
+            stops = self.outbound.stops
+            rows = [row for row in rows if stops[row] == 0]
+        if max_price is not None:
+            price = self.price
+            rows = [row for row in rows if price[row] <= max_price]
+        if depart_after is not None or depart_before is not None:
+            low = 0 if depart_after is None else depart_after
+            high = 1439 if depart_before is None else depart_before
+            depart_at = self.depart_at
+            rows = [
+                row for row in rows
+                if depart_at[row] != INVALID_TIME and low <= depart_at[row] % 1440 <= high
+            ]
+        return rows
+
+    def sort(self, rows: Optional[List[int]] = None, key: str = 'price') -> List[int]:
+        """
+        Order rows using the same sort options as the results page.
+
+        Args:
+            rows: Row indexes to sort (all rows if None)
+            key: 'price', 'nonstop' (nonstop first, then price), 'earliest'
+                (departure time) or 'longest-trip' (longest round trip first,
+                one-way offers by price after them)
+
+        Returns:
+            Sorted row indexes (stable for equal keys)
+        """
+        if rows is None:
+            rows = self.rows()
+        price = self.price
+
+        if key == 'price':
+            return sorted(rows, key=price.__getitem__)
+        if key == 'nonstop':
+            stops = self.outbound.stops
+            return sorted(rows, key=lambda row: (stops[row] != 0, price[row]))
+        if key == 'earliest':
+            depart_at = self.depart_at
+            return sorted(rows, key=depart_at.__getitem__)
+        if key == 'longest-trip':
+            trip_minutes = self.trip_minutes
+            return sorted(rows, key=lambda row: (0, -trip_minutes(row)) if trip_minutes(row) is not None
+                          else (1, price[row]))
+        raise ValueError(f"Unknown sort key: {key}")
+
+    def trip_minutes(self, row: int) -> Optional[int]:
+        """Minutes from outbound departure to return arrival (None for one-way or unparsable rows)"""
+        depart, arrive = self.depart_at[row], self.return_arrive_at[row]
+        if depart == INVALID_TIME or arrive == INVALID_TIME:
+            return None
+        return arrive - depart
+
+    def to_dict(self, row: int) -> dict:
+        """Materialize one row as a flight dict in the app's format"""
+        strings = self._strings
+        flight = self.outbound.to_dict(row, strings)
+        flight['price'] = self.price[row]
+        flight['currency'] = strings[self.currency[row]]
+
+        is_round_trip = bool(self.flags[row] & FLAG_ROUND_TRIP)
+        flight['is_round_trip'] = is_round_trip
+        if is_round_trip:
+            flight['return_flight'] = self.inbound.to_dict(row, strings)
+            total_price = self.total_price[row]
+            flight['total_price'] = None if math.isnan(total_price) else total_price
+
+        seats = self.seats[row]
+        flight['seats_remaining'] = None if seats < 0 else seats
+        flight['gowild_eligible'] = bool(self.flags[row] & FLAG_GOWILD)
+        flight['blackout_dates'] = self._blackouts[self.blackout[row]]
+        return flight
+
+    def to_dicts(self, rows: Optional[Iterable[int]] = None) -> List[dict]:
+        """Materialize rows (all rows if None) as flight dicts"""
+        if rows is None:
+            rows = range(len(self))
+        return [self.to_dict(row) for row in rows]
+
+    def _intern(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            if isinstance(value, str):
+                value = sys.intern(value)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _share_blackout(self, blackout_info):
+        """Store one copy of each distinct blackout info dict"""
+        key = None if blackout_info is None else tuple(sorted(blackout_info.items()))
+        blackout_id = self._blackout_ids.get(key)
+        if blackout_id is None:
+            blackout_id = len(self._blackouts)
+            self._blackouts.append(blackout_info)
+            self._blackout_ids[key] = blackout_id
+        return blackout_id
@@ -0,0 +1,182 @@
+"""
+Flight Records - Compact internal representation of converted flight offers
+
+AmadeusFlightSearch produces FlightRecord objects instead of one dict per
+offer. Records use __slots__, hold interned strings and share one blackout
+info dict per departure/return date pair, so cached searches take a fraction
+of the memory. Caches and the trip planner work on records directly; they are
+turned into the app's JSON format only when a response is serialized
+(json_default) or persisted (to_dict).
+
+Records also support read-only dict-style access (record['price'],
+record.get('stops')) so code written against the dict format keeps working.
+"""
+import sys
+from typing import Any, Iterable, List
+
+# Fields of one direction of travel, in the order of the app's JSON format
+LEG_FIELDS = (
+    'origin', 'destination', 'departure_time', 'arrival_time', 'departure_date',
+    'arrival_date', 'duration', 'airline', 'flight_number', 'stops', 'aircraft', 'booking_class'
+)
+_LEG_FIELD_SET = frozenset(LEG_FIELDS)
+_LEG_STRING_FIELDS = tuple(field for field in LEG_FIELDS if field != 'stops')
+
+
+def intern_string(value):
+    """sys.intern for strings, anything else unchanged"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class LegRecord:
+    """One direction of travel"""
+
+    __slots__ = LEG_FIELDS
+
+    def __init__(self, origin, destination, departure_time, arrival_time, departure_date,
+                 arrival_date, duration, airline, flight_number, stops, aircraft, booking_class):
+        self.origin = origin
+        self.destination = destination
+        self.departure_time = departure_time
+        self.arrival_time = arrival_time
+        self.departure_date = departure_date
+        self.arrival_date = arrival_date
+        self.duration = duration
+        self.airline = airline
+        self.flight_number = flight_number
+        self.stops = stops
+        self.aircraft = aircraft
+        self.booking_class = booking_class
+
+    @classmethod
+    def from_dict(cls, leg: dict) -> 'LegRecord':
+        record = cls.__new__(cls)
+        for field in _LEG_STRING_FIELDS:
+            setattr(record, field, intern_string(leg.get(field)))
+        record.stops = leg.get('stops', 0)
+        return record
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in LEG_FIELDS}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _LEG_FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _LEG_FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+
+class FlightRecord:
+    """
+    A converted flight offer: the outbound leg, an optional return leg and pricing.
+
+    The blackout_dates dict is shared between records and must not be mutated.
+    """
+
+    __slots__ = (
+        'leg', 'price', 'currency', 'is_round_trip', 'return_flight', 'total_price',
+        'seats_remaining', 'gowild_eligible', 'blackout_dates'
+    )
+
+    def __init__(self, leg, price, currency, is_round_trip=False, return_flight=None, total_price=None,
+                 seats_remaining=None, gowild_eligible=False, blackout_dates=None):
+        self.leg = leg
+        self.price = price
+        self.currency = currency
+        self.is_round_trip = is_round_trip
+        self.return_flight = return_flight
+        self.total_price = total_price
+        self.seats_remaining = seats_remaining
+        self.gowild_eligible = gowild_eligible
+        self.blackout_dates = blackout_dates
+
+    @classmethod
+    def from_dict(cls, flight: dict, shared_blackouts: dict = None) -> 'FlightRecord':
+        """
+        Rebuild a record from the app's JSON format (e.g. a persisted cache entry).
+
+        Args:
+            flight: Flight dict
+            shared_blackouts: Optional dict used to share identical blackout info
+                dicts between the records built from one result set
+        """
+        blackout_dates = flight.get('blackout_dates')
+        if shared_blackouts is not None and blackout_dates is not None:
+            key = tuple(sorted(blackout_dates.items()))
+            blackout_dates = shared_blackouts.setdefault(key, blackout_dates)
+
+        is_round_trip = bool(flight.get('is_round_trip'))
+        return cls(
+            LegRecord.from_dict(flight),
+            flight['price'],
+            intern_string(flight.get('currency')),
+            is_round_trip=is_round_trip,
+            return_flight=LegRecord.from_dict(flight['return_flight']) if is_round_trip else None,
+            total_price=flight.get('total_price'),
+            seats_remaining=flight.get('seats_remaining'),
+            gowild_eligible=flight.get('gowild_eligible', False),
+            blackout_dates=blackout_dates
+        )
+
+    def to_dict(self) -> dict:
+        """The offer in the app's JSON format"""
+        flight = self.leg.to_dict()
+        flight['price'] = self.price
+        flight['currency'] = self.currency
+        flight['is_round_trip'] = self.is_round_trip
+        if self.is_round_trip:
+            flight['return_flight'] = self.return_flight.to_dict()
+            flight['total_price'] = self.total_price
+        flight['seats_remaining'] = self.seats_remaining
+        flight['gowild_eligible'] = self.gowild_eligible
+        flight['blackout_dates'] = self.blackout_dates
+        return flight
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _LEG_FIELD_SET:
+            return getattr(self.leg, key)
+        if key in ('return_flight', 'total_price') and not self.is_round_trip:
+            raise KeyError(key)
+        if key in self.__slots__ and key != 'leg':
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __repr__(self):
+        leg = self.leg
+        return f"<FlightRecord {leg.origin}->{leg.destination} {leg.departure_date} {leg.flight_number} {self.price}>"
+
+
+def flights_to_dicts(flights: Iterable) -> List[dict]:
+    """Materialize records as flight dicts (dicts, e.g. mock data, pass through)"""
+    return [flight.to_dict() if isinstance(flight, FlightRecord) else flight for flight in flights]
+
+
+def flights_from_dicts(flights: Iterable[dict]) -> List:
+    """
+    Rebuild records from flight dicts, sharing blackout info between them.
+
+    Dicts in another shape (DEV_MODE mock data) are kept as they are.
+    """
+    shared_blackouts = {}
+    return [
+        FlightRecord.from_dict(flight, shared_blackouts)
+        if isinstance(flight, dict) and 'departure_date' in flight else flight
+        for flight in flights
+    ]
+
+
+def json_default(value):
+    """json.dumps default hook that serializes records in the app's format"""
+    if isinstance(value, (FlightRecord, LegRecord)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
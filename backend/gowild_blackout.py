@@ -4,8 +4,57 @@ GoWild Pass Blackout Dates Configuration
 This module defines blackout dates when GoWild passes cannot be used.
 Based on Frontier Airlines GoWild pass terms and conditions.
 """
-from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple, Optional
+
+
+class _BlackoutIndex:
+    """
+    Precomputed lookup structures for a set of blackout periods.
+
+    - by_day / by_ordinal: every blackout day mapped to its description,
+      keyed by 'YYYY-MM-DD' string and by date ordinal (constant-time lookup)
+    - starts / max_ends / periods: periods sorted by start ordinal, with a
+      running maximum of end ordinals, for bisect-based range queries
+    """
+
+    __slots__ = ('by_day', 'by_ordinal', 'starts', 'max_ends', 'periods')
+
+    def __init__(self, periods: Iterable[Tuple[str, str, str]]):
+        self.by_day: Dict[str, str] = {}
+        self.by_ordinal: Dict[int, str] = {}
+
+        parsed = []
+        for start_str, end_str, description in periods:
+            start_ord = datetime.strptime(start_str, '%Y-%m-%d').toordinal()
+            end_ord = datetime.strptime(end_str, '%Y-%m-%d').toordinal()
+            parsed.append((start_ord, end_ord, description))
+
+            # First matching period wins, as with a linear scan in list order
+            for ordinal in range(start_ord, end_ord + 1):
+                if ordinal not in self.by_ordinal:
+                    self.by_ordinal[ordinal] = description
+                    self.by_day[date.fromordinal(ordinal).isoformat()] = description
+
+        # Stable sort keeps definition order for periods starting the same day
+        parsed.sort(key=lambda period: period[0])
+        self.periods = [
+            (start_ord, end_ord, date.fromordinal(start_ord).isoformat(),
+             date.fromordinal(end_ord).isoformat(), description)
+            for start_ord, end_ord, description in parsed
+        ]
+        self.starts = [period[0] for period in self.periods]
+        self.max_ends = []
+        running_max = 0
+        for period in self.periods:
+            running_max = max(running_max, period[1])
+            self.max_ends.append(running_max)
+
+
+def _is_canonical_date(value: str) -> bool:
+    """True if value looks like a zero-padded 'YYYY-MM-DD' string"""
+    return len(value) == 10 and value[4] == '-' and value[7] == '-'
 
 class GoWildBlackoutDates:
     """
@@ -140,6 +189,40 @@ class GoWildBlackoutDates:
         # Note: May 2027+ dates to be announced
     ]
 
+    @classmethod
+    def reload_index(cls) -> None:
+        """
+        Rebuild the blackout index from the BLACKOUT_PERIODS_* lists.
+
+        Called automatically on first use; call again after changing the
+        configured periods.
+        """
+        cls._index = _BlackoutIndex(cls.BLACKOUT_PERIODS_2025 +
+                                    cls.BLACKOUT_PERIODS_2026 +
+                                    cls.BLACKOUT_PERIODS_2027)
+
+    @classmethod
+    def _get_index(cls) -> _BlackoutIndex:
+        index = cls.__dict__.get('_index')
+        if index is None:
+            cls.reload_index()
+            index = cls._index
+        return index
+
+    @classmethod
+    def _lookup(cls, index: _BlackoutIndex, date_to_check: str) -> Optional[str]:
+        """Description of the blackout covering a date string, or None"""
+        description = index.by_day.get(date_to_check)
+        if description is not None or _is_canonical_date(date_to_check):
+            return description
+
+        # Non-padded input such as '2025-7-4' still parses with strptime
+        try:
+            check_date = datetime.strptime(date_to_check, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            return None
+        return index.by_ordinal.get(check_date.toordinal())
+
     @classmethod
     def get_all_blackout_periods(cls) -> List[Tuple[datetime, datetime, str]]:
         """
@@ -172,16 +255,28 @@ class GoWildBlackoutDates:
             - is_blackout: True if date is in blackout period
             - reason: Description of blackout period (if applicable)
         """
-        try:
-            check_date = datetime.strptime(date_to_check, '%Y-%m-%d')
-        except ValueError:
-            return (False, None)
+        description = cls._lookup(cls._get_index(), date_to_check)
+        if description is not None:
+            return (True, description)
+        return (False, None)
 
-        for start_date, end_date, description in cls.get_all_blackout_periods():
-            if start_date <= check_date <= end_date:
-                return (True, description)
+    @classmethod
+    def classify_dates(cls, dates: Iterable[str]) -> List[Tuple[bool, Optional[str]]]:
+        """
+        Check many dates against the blackout index in one call.
 
-        return (False, None)
+        Args:
+            dates: Date strings in 'YYYY-MM-DD' format
+
+        Returns:
+            List of (is_blackout, reason) tuples, in the same order as dates
+        """
+        index = cls._get_index()
+        results = []
+        for date_to_check in dates:
+            description = cls._lookup(index, date_to_check)
+            results.append((True, description) if description is not None else (False, None))
+        return results
 
     @classmethod
     def is_flight_affected_by_blackout(cls, departure_date: str, return_date: Optional[str] = None) -> dict:
@@ -251,17 +346,15 @@ class GoWildBlackoutDates:
             Next available date as string, or None if not found within 90 days
         """
         try:
-            current = datetime.strptime(start_date, '%Y-%m-%d')
+            current = datetime.strptime(start_date, '%Y-%m-%d').toordinal()
         except ValueError:
             return None
 
         # Search up to 90 days ahead
-        for _ in range(90):
-            current += timedelta(days=1)
-            date_str = current.strftime('%Y-%m-%d')
-            is_blackout, _ = cls.is_blackout_date(date_str)
-            if not is_blackout:
-                return date_str
+        by_ordinal = cls._get_index().by_ordinal
+        for ordinal in range(current + 1, current + 91):
+            if ordinal not in by_ordinal:
+                return date.fromordinal(ordinal).isoformat()
 
         return None
 
@@ -278,20 +371,30 @@ class GoWildBlackoutDates:
             List of blackout period dictionaries with start, end, and description
         """
         try:
-            range_start = datetime.strptime(start_date, '%Y-%m-%d')
-            range_end = datetime.strptime(end_date, '%Y-%m-%d')
+            range_start = datetime.strptime(start_date, '%Y-%m-%d').toordinal()
+            range_end = datetime.strptime(end_date, '%Y-%m-%d').toordinal()
         except ValueError:
             return []
 
+        index = cls._get_index()
+
+        # Periods before lo all end before the range; periods from hi on start after it
+        lo = bisect_left(index.max_ends, range_start)
+        hi = bisect_right(index.starts, range_end)
+
         affected_periods = []
 
-        for blackout_start, blackout_end, description in cls.get_all_blackout_periods():
+        for start_ord, end_ord, start_str, end_str, description in index.periods[lo:hi]:
             # Check if blackout period overlaps with range
-            if blackout_start <= range_end and blackout_end >= range_start:
+            if end_ord >= range_start:
                 affected_periods.append({
-                    'start': blackout_start.strftime('%Y-%m-%d'),
-                    'end': blackout_end.strftime('%Y-%m-%d'),
+                    'start': start_str,
+                    'end': end_str,
                     'description': description
                 })
 
         return affected_periods
+
+
+# Build the index once at import so the first search doesn't pay for it
+GoWildBlackoutDates.reload_index()
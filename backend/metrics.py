@@ -0,0 +1,341 @@
+"""
+Metrics - Lightweight Prometheus instrumentation for the search hot path
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format by GET /api/metrics. Recording a value takes one dict lookup
+and a short lock, so instrumentation stays on in production. Values that
+components already count (cache hits, scheduler queues, ...) are read at
+scrape time by registered collectors instead of being recorded twice.
+
+Usage:
+    with STAGE_SECONDS.labels('convert').time():
+        flights = convert(offers)
+
+    UPSTREAM_ERRORS.labels('429').inc()
+
+Set METRICS_ENABLED=false to turn recording off (GET /api/metrics returns 404).
+"""
+from bisect import bisect_left
+import math
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Tuple
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Seconds; covers sub-millisecond conversion up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Timer:
+    """Context manager observing the elapsed seconds into a histogram child"""
+
+    __slots__ = ('_child', '_started')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager that observes the duration of its block"""
+        return _Timer(self) if METRICS_ENABLED else _NULL_TIMER
+
+
+class _Metric:
+    metric_type = None
+    child_class = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values):
+        """The child metric for one combination of label values"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+    child_class = _CounterChild
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+    child_class = _GaugeChild
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, values, ('le', _format_value(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that report externally maintained values at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]) -> None:
+        """
+        Add a scrape-time collector.
+
+        Args:
+            collector: Callable returning (name, type, help, labelnames, samples)
+                tuples, where samples is a list of (label values, value)
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {str(e)}")
+                continue
+            for name, metric_type, documentation, labelnames, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for values, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_format_labels(labelnames, values)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def upstream_status(error) -> str:
+    """Status label for a failed upstream call ('network' when there was no response)"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return str(status) if status else 'network'
+
+
+# Pipeline stages: convert, blackout, trip_scoring, serialize, compress
+STAGE_SECONDS = Histogram(
+    'wildpass_stage_duration_seconds',
+    'Time spent in each search pipeline stage',
+    ('stage',)
+)
+UPSTREAM_SECONDS = Histogram(
+    'wildpass_upstream_request_duration_seconds',
+    'Latency of single flight offers requests to Amadeus (one origin-destination pair)',
+    ('outcome',)
+)
+UPSTREAM_QUEUE_SECONDS = Histogram(
+    'wildpass_upstream_queue_wait_seconds',
+    'Time pair searches waited for the rate limit scheduler',
+    ('priority',)
+)
+UPSTREAM_ERRORS = Counter(
+    'wildpass_upstream_errors_total',
+    'Failed flight offers requests by HTTP status',
+    ('status',)
+)
+UPSTREAM_CALLS_AVOIDED = Counter(
+    'wildpass_upstream_calls_avoided_total',
+    'Pair searches answered from a negative cache entry instead of calling Amadeus',
+    ('reason',)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'wildpass_requests_in_flight',
+    'HTTP requests being served (streams count until they finish)',
+    ('endpoint',)
+)
+REQUEST_SECONDS = Histogram(
+    'wildpass_request_duration_seconds',
+    'HTTP request duration by endpoint and status',
+    ('endpoint', 'status')
+)
+
+
+CACHE_FAMILIES = (
+    ('wildpass_cache_hits_total', 'counter', 'Cache hits', 'hits'),
+    ('wildpass_cache_misses_total', 'counter', 'Cache misses', 'misses'),
+    ('wildpass_cache_evictions_total', 'counter', 'Entries evicted to stay within limits', 'evictions'),
+    ('wildpass_cache_entries', 'gauge', 'Entries held in memory', 'total_entries'),
+    ('wildpass_cache_bytes', 'gauge', 'Approximate bytes held in memory', 'total_bytes')
+)
+
+
+def cache_collector(caches: dict) -> Callable[[], Iterable[tuple]]:
+    """
+    Scrape-time collector for SearchCache counters.
+
+    Args:
+        caches: Dict of cache label -> SearchCache
+    """
+
+    def collect():
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        for name, metric_type, documentation, field in CACHE_FAMILIES:
+            yield name, metric_type, documentation, ('cache',), [
+                ((label,), cache_stats[field]) for label, cache_stats in stats.items()
+            ]
+
+    return collect
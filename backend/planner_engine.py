@@ -0,0 +1,428 @@
+"""
+Planner Engine - Concurrent departure x return date search for the trip planner
+
+Two modes share the same results format and "earliest departure day wins"
+semantics:
+    matrix: DateMatrixPlanner, a round-trip search per departure day x return date
+    legs: LegPairingPlanner, one-way searches per day, paired locally
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+import asyncio
+import os
+from async_amadeus import run_blocking
+from trip_planner import IncrementalTripScorer, pair_one_way_legs
+
+# Default number of (departure, return) date searches in flight at once
+DEFAULT_PLANNER_CONCURRENCY = 4
+
+# Default number of return legs paired with each outbound leg in legs mode
+DEFAULT_LEG_PAIRS_PER_OUTBOUND = 5
+
+PLANNER_MODES = ('matrix', 'legs')
+
+
+def get_return_dates(current_depart_dt, trip_hours, window_days=2):
+    """Return dates to search around the target return (±window_days for flexibility)"""
+    target_return = current_depart_dt + timedelta(hours=trip_hours)
+    return [
+        (target_return + timedelta(days=offset)).strftime('%Y-%m-%d')
+        for offset in range(-window_days, window_days + 1)
+    ]
+
+
+class DateMatrixPlanner:
+    """
+    Searches the departure-day x return-date matrix concurrently.
+
+    Keeps the trip planner's "earliest departure day with results wins"
+    semantics: days are resolved strictly in order, and as soon as a winning
+    day is known every outstanding search for a later day is cancelled.
+    """
+
+    def __init__(self, flight_search, max_workers=None, max_days=30, return_window_days=2):
+        """
+        Args:
+            flight_search: AmadeusFlightSearch (or None when searching is unavailable)
+            max_workers: Concurrent date searches (defaults to PLANNER_MAX_CONCURRENCY)
+            max_days: Number of departure days to try before giving up
+            return_window_days: Days either side of the target return date to search
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get('PLANNER_MAX_CONCURRENCY', DEFAULT_PLANNER_CONCURRENCY))
+        self.flight_search = flight_search
+        self.max_workers = max(1, int(max_workers))
+        self.max_days = max_days
+        self.return_window_days = return_window_days
+
+    def plan(self, origins, destinations, departure_date, trip_length, trip_length_unit='days',
+             nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
+        """
+        Find the earliest departure day that has trips matching the requested length
+
+        Returns:
+            Tuple of (optimal_trips, days_searched) where days_searched is the
+            zero-based index of the winning day, or max_days if none matched
+        """
+        depart_dt = datetime.strptime(departure_date, '%Y-%m-%d')
+        trip_hours = float(trip_length) * (24 if trip_length_unit == 'days' else 1)
+
+        if self.flight_search is None:
+            return [], self.max_days
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='trip-planner')
+        futures = {}
+        day_remaining = []
+        day_batches = []
+
+        try:
+            # Queue the whole matrix in day order; the pool works through it earliest first
+            for day in range(self.max_days):
+                current_depart_dt = depart_dt + timedelta(days=day)
+                current_departure_date = current_depart_dt.strftime('%Y-%m-%d')
+                return_dates = get_return_dates(current_depart_dt, trip_hours, self.return_window_days)
+
+                day_remaining.append(len(return_dates))
+                day_batches.append({return_date: [] for return_date in return_dates})
+                for return_date in return_dates:
+                    future = executor.submit(
+                        self.flight_search.search_flights,
+                        origins=origins,
+                        destinations=destinations,
+                        departure_date=current_departure_date,
+                        return_date=return_date,
+                        adults=1,
+                        priority='planner'
+                    )
+                    futures[future] = (day, return_date)
+
+            scorer = IncrementalTripScorer(
+                trip_length,
+                trip_length_unit=trip_length_unit,
+                nonstop_preferred=nonstop_preferred,
+                max_duration=max_duration,
+                max_duration_unit=max_duration_unit
+            )
+            next_day = 0
+            pending = set(futures)
+
+            while pending and next_day < self.max_days:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    day, return_date = futures[future]
+                    day_batches[day][return_date] = future.result()
+                    day_remaining[day] -= 1
+
+                # Resolve every finished day in order; an unfinished day blocks later ones
+                while next_day < self.max_days and day_remaining[next_day] == 0:
+                    current_departure_date = (depart_dt + timedelta(days=next_day)).strftime('%Y-%m-%d')
+                    print(f"Searching departure date: {current_departure_date} (day {next_day + 1}/{self.max_days})")
+
+                    # Score only this day's offers, in return-date order so the
+                    # ranking matches the sequential planner
+                    for flights in day_batches[next_day].values():
+                        scorer.add(flights)
+                    day_batches[next_day] = None
+
+                    if len(scorer):
+                        optimal_trips = scorer.results()
+                        print(f"Found {len(optimal_trips)} matching trips on day {next_day + 1}")
+                        return optimal_trips, next_day
+
+                    next_day += 1
+
+            return [], self.max_days
+
+        finally:
+            # Drop searches for later days that have not started yet
+            cancelled = sum(1 for future in futures if future.cancel())
+            if cancelled:
+                print(f"Cancelled {cancelled} outstanding date searches")
+            executor.shutdown(wait=False)
+
+
+class AsyncDateMatrixPlanner(DateMatrixPlanner):
+    """
+    asyncio version of DateMatrixPlanner for the ASGI app.
+
+    Same matrix, ordering and early-exit semantics; searches run as tasks
+    limited by a semaphore instead of on a thread pool.
+    """
+
+    async def plan(self, origins, destinations, departure_date, trip_length, trip_length_unit='days',
+                   nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
+        """
+        Find the earliest departure day that has trips matching the requested length
+
+        Args:
+            See DateMatrixPlanner.plan; flight_search must be an AsyncFlightSearch
+
+        Returns:
+            Tuple of (optimal_trips, days_searched)
+        """
+        depart_dt = datetime.strptime(departure_date, '%Y-%m-%d')
+        trip_hours = float(trip_length) * (24 if trip_length_unit == 'days' else 1)
+
+        if self.flight_search is None:
+            return [], self.max_days
+
+        # Semaphore waiters are served in order, so earlier days are searched first
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def search(current_departure_date, return_date):
+            async with semaphore:
+                return await self.flight_search.search_flights(
+                    origins=origins,
+                    destinations=destinations,
+                    departure_date=current_departure_date,
+                    return_date=return_date,
+                    adults=1,
+                    priority='planner'
+                )
+
+        day_tasks = []
+        for day in range(self.max_days):
+            current_depart_dt = depart_dt + timedelta(days=day)
+            current_departure_date = current_depart_dt.strftime('%Y-%m-%d')
+            day_tasks.append([
+                asyncio.ensure_future(search(current_departure_date, return_date))
+                for return_date in get_return_dates(current_depart_dt, trip_hours, self.return_window_days)
+            ])
+
+        scorer = IncrementalTripScorer(
+            trip_length,
+            trip_length_unit=trip_length_unit,
+            nonstop_preferred=nonstop_preferred,
+            max_duration=max_duration,
+            max_duration_unit=max_duration_unit
+        )
+        try:
+            for day, tasks in enumerate(day_tasks):
+                # Score in return-date order so the ranking matches the sequential planner
+                for flights in await asyncio.gather(*tasks):
+                    await run_blocking(scorer.add, flights)
+
+                if len(scorer):
+                    optimal_trips = await run_blocking(scorer.results)
+                    print(f"Found {len(optimal_trips)} matching trips on day {day + 1}")
+                    return optimal_trips, day
+
+            return [], self.max_days
+
+        finally:
+            cancelled = sum(1 for tasks in day_tasks for task in tasks if task.cancel())
+            if cancelled:
+                print(f"Cancelled {cancelled} outstanding date searches")
+
+
+class LegPairingPlanner(DateMatrixPlanner):
+    """
+    Trip planner that searches one-way legs and pairs them locally.
+
+    The date matrix runs a round-trip search for every departure day x return
+    date, so the same outbound and inbound flights come back inside many
+    bundles. This planner searches outbound legs once per departure day and
+    inbound legs once per return day (shared by every departure day whose
+    return window includes it), then pairs them with pair_one_way_legs: about
+    N + N searches per route for an N-day window instead of 5N.
+
+    Fares are the sum of the two one-way fares. Each outbound leg is paired
+    only with the return legs of its day that best match the trip length, so
+    the planner ranks about as many options as the date matrix does.
+    """
+
+    def __init__(self, flight_search, max_workers=None, max_days=30, return_window_days=2,
+                 max_pairs_per_outbound=None):
+        """
+        Args:
+            (as for DateMatrixPlanner)
+            max_pairs_per_outbound: Return legs paired with each outbound leg per
+                departure day (defaults to PLANNER_LEG_PAIRS_PER_OUTBOUND; 0 pairs every one)
+        """
+        super().__init__(flight_search, max_workers, max_days, return_window_days)
+        if max_pairs_per_outbound is None:
+            max_pairs_per_outbound = int(os.environ.get('PLANNER_LEG_PAIRS_PER_OUTBOUND',
+                                                        DEFAULT_LEG_PAIRS_PER_OUTBOUND))
+        self.max_pairs_per_outbound = max(0, int(max_pairs_per_outbound))
+
+    def _pair(self, outbound_legs, inbound_legs, trip_hours, max_hours, nonstop_preferred):
+        """Round trips for one departure day (inbound legs of every return date, in date order)"""
+        return pair_one_way_legs(
+            outbound_legs,
+            inbound_legs,
+            max_hours,
+            target_hours=trip_hours,
+            nonstop_preferred=nonstop_preferred,
+            max_per_outbound=self.max_pairs_per_outbound
+        )
+
+    def _return_origins(self, origins, destinations):
+        """Airports the inbound legs leave from (destinations with "ANY" expanded)"""
+        return sorted({destination for _, destination in self.flight_search.expand_pairs(origins, destinations)})
+
+    def _days(self, depart_dt, trip_hours):
+        """(departure date, return dates) for every day in the window"""
+        days = []
+        for day in range(self.max_days):
+            current_depart_dt = depart_dt + timedelta(days=day)
+            days.append((
+                current_depart_dt.strftime('%Y-%m-%d'),
+                get_return_dates(current_depart_dt, trip_hours, self.return_window_days)
+            ))
+        return days
+
+    def plan(self, origins, destinations, departure_date, trip_length, trip_length_unit='days',
+             nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
+        """
+        Find the earliest departure day that has trips matching the requested length
+
+        Returns:
+            Tuple of (optimal_trips, days_searched), as DateMatrixPlanner.plan
+        """
+        depart_dt = datetime.strptime(departure_date, '%Y-%m-%d')
+        trip_hours = float(trip_length) * (24 if trip_length_unit == 'days' else 1)
+        max_hours = float(max_duration) * (24 if max_duration_unit == 'days' else 1) if max_duration else None
+
+        if self.flight_search is None:
+            return [], self.max_days
+
+        return_origins = self._return_origins(origins, destinations)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='trip-planner')
+        searches = {}
+
+        def search(leg_origins, leg_destinations, date):
+            """One one-way search per direction and date, queued in day order"""
+            key = (tuple(leg_origins), tuple(leg_destinations), date)
+            if key not in searches:
+                searches[key] = executor.submit(
+                    self.flight_search.search_flights,
+                    origins=leg_origins,
+                    destinations=leg_destinations,
+                    departure_date=date,
+                    return_date=None,
+                    adults=1,
+                    priority='planner'
+                )
+            return searches[key]
+
+        try:
+            days = [
+                (
+                    current_departure_date,
+                    search(origins, destinations, current_departure_date),
+                    [(return_date, search(return_origins, origins, return_date)) for return_date in return_dates]
+                )
+                for current_departure_date, return_dates in self._days(depart_dt, trip_hours)
+            ]
+
+            scorer = IncrementalTripScorer(
+                trip_length,
+                trip_length_unit=trip_length_unit,
+                nonstop_preferred=nonstop_preferred,
+                max_duration=max_duration,
+                max_duration_unit=max_duration_unit
+            )
+            for day, (current_departure_date, outbound, inbound) in enumerate(days):
+                print(f"Pairing legs for departure date: {current_departure_date} (day {day + 1}/{self.max_days})")
+                outbound_legs = outbound.result()
+
+                # Pair against every return date at once so the cap applies per day
+                inbound_legs = [flight for _, future in inbound for flight in future.result()]
+                scorer.add(self._pair(outbound_legs, inbound_legs, trip_hours, max_hours, nonstop_preferred))
+
+                if len(scorer):
+                    optimal_trips = scorer.results()
+                    print(f"Found {len(optimal_trips)} matching trips on day {day + 1} "
+                          f"({len(searches)} one-way searches queued)")
+                    return optimal_trips, day
+
+            return [], self.max_days
+
+        finally:
+            cancelled = sum(1 for future in searches.values() if future.cancel())
+            if cancelled:
+                print(f"Cancelled {cancelled} outstanding leg searches")
+            executor.shutdown(wait=False)
+
+
+class AsyncLegPairingPlanner(LegPairingPlanner):
+    """
+    asyncio version of LegPairingPlanner for the ASGI app.
+
+    flight_search must be an AsyncFlightSearch (its expand_pairs comes from
+    the wrapped AmadeusFlightSearch).
+    """
+
+    def _return_origins(self, origins, destinations):
+        pairs = self.flight_search.flight_search.expand_pairs(origins, destinations)
+        return sorted({destination for _, destination in pairs})
+
+    async def plan(self, origins, destinations, departure_date, trip_length, trip_length_unit='days',
+                   nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
+        """
+        Find the earliest departure day that has trips matching the requested length
+
+        Returns:
+            Tuple of (optimal_trips, days_searched)
+        """
+        depart_dt = datetime.strptime(departure_date, '%Y-%m-%d')
+        trip_hours = float(trip_length) * (24 if trip_length_unit == 'days' else 1)
+        max_hours = float(max_duration) * (24 if max_duration_unit == 'days' else 1) if max_duration else None
+
+        if self.flight_search is None:
+            return [], self.max_days
+
+        return_origins = self._return_origins(origins, destinations)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        searches = {}
+
+        async def run(leg_origins, leg_destinations, date):
+            async with semaphore:
+                return await self.flight_search.search_flights(
+                    origins=leg_origins,
+                    destinations=leg_destinations,
+                    departure_date=date,
+                    return_date=None,
+                    adults=1,
+                    priority='planner'
+                )
+
+        def search(leg_origins, leg_destinations, date):
+            key = (tuple(leg_origins), tuple(leg_destinations), date)
+            if key not in searches:
+                searches[key] = asyncio.ensure_future(run(leg_origins, leg_destinations, date))
+            return searches[key]
+
+        days = [
+            (
+                search(origins, destinations, current_departure_date),
+                [search(return_origins, origins, return_date) for return_date in return_dates]
+            )
+            for current_departure_date, return_dates in self._days(depart_dt, trip_hours)
+        ]
+
+        scorer = IncrementalTripScorer(
+            trip_length,
+            trip_length_unit=trip_length_unit,
+            nonstop_preferred=nonstop_preferred,
+            max_duration=max_duration,
+            max_duration_unit=max_duration_unit
+        )
+        try:
+            for day, (outbound, inbound) in enumerate(days):
+                outbound_legs = await outbound
+                inbound_legs = [flight for legs in await asyncio.gather(*inbound) for flight in legs]
+                await run_blocking(lambda: scorer.add(
+                    self._pair(outbound_legs, inbound_legs, trip_hours, max_hours, nonstop_preferred)))
+
+                if len(scorer):
+                    optimal_trips = await run_blocking(scorer.results)
+                    print(f"Found {len(optimal_trips)} matching trips on day {day + 1}")
+                    return optimal_trips, day
+
+            return [], self.max_days
+
+        finally:
+            cancelled = sum(1 for task in searches.values() if task.cancel())
+            if cancelled:
+                print(f"Cancelled {cancelled} outstanding leg searches")
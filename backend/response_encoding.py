@@ -0,0 +1,188 @@
+"""
+Response Encoding - Fast JSON serialization and negotiated compression
+
+Search and trip planner responses can carry thousands of offers. This module
+serializes them with orjson when it is installed (stdlib json otherwise) and
+compresses them with brotli or gzip according to the client's
+Accept-Encoding header. Both the Flask app and the ASGI app use it.
+
+SSE streams are compressed with one compressor per stream that is flushed
+after every event: events are still delivered immediately, and the compact,
+fixed-order JSON of later events compresses against the earlier ones.
+
+Environment:
+    JSON_SERIALIZER: auto (default), orjson or stdlib
+    RESPONSE_COMPRESSION: true (default) or false
+    RESPONSE_COMPRESS_MIN_BYTES: Smaller bodies are sent uncompressed (default 1024)
+    STREAM_COMPRESSION: Compress /api/search/stream events (default true)
+"""
+import gzip
+import json
+import os
+import zlib
+from typing import Any, Optional, Tuple
+
+from flight_record import json_default
+from metrics import STAGE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'auto').lower()
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+STREAM_COMPRESSION = os.environ.get('STREAM_COMPRESSION', 'true').lower() == 'true'
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+if JSON_SERIALIZER not in ('auto', 'orjson', 'stdlib'):
+    raise ValueError(f"Unknown JSON_SERIALIZER '{JSON_SERIALIZER}' (expected auto, orjson or stdlib)")
+if JSON_SERIALIZER == 'orjson' and orjson is None:
+    raise ValueError("JSON_SERIALIZER=orjson but orjson is not installed")
+
+USE_ORJSON = orjson is not None and JSON_SERIALIZER != 'stdlib'
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value (FlightRecords included) to compact UTF-8 JSON"""
+    with STAGE_SECONDS.labels('serialize').time():
+        if USE_ORJSON:
+            return orjson.dumps(value, default=json_default)
+        return json.dumps(value, default=json_default, separators=(',', ':')).encode()
+
+
+def serializer_name() -> str:
+    return 'orjson' if USE_ORJSON else 'stdlib'
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Content encodings this process can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a content encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. 'gzip, deflate, br;q=0.9'
+
+    Returns:
+        'br', 'gzip', or None to send the body uncompressed
+    """
+    if not accept_encoding or not RESPONSE_COMPRESSION:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in supported_encodings():
+        weight = weights.get(coding, weights.get('*', 0.0))
+        # Ties keep the server's preference (br before gzip)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Compress a complete body with a negotiated encoding (None returns it unchanged)"""
+    if encoding is None:
+        return body
+    with STAGE_SECONDS.labels('compress').time():
+        if encoding == 'br':
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def encode_json(value: Any, accept_encoding: Optional[str]) -> Tuple[bytes, dict]:
+    """
+    Serialize and, if worthwhile, compress a JSON response body.
+
+    Args:
+        value: Response payload
+        accept_encoding: The request's Accept-Encoding header
+
+    Returns:
+        Tuple of (body, headers) where headers holds Content-Type, Vary and,
+        when compressed, Content-Encoding
+    """
+    body = dumps(value)
+    headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding and len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return body, headers
+
+
+class EventStreamEncoder:
+    """
+    Frames Server-Sent Events and compresses the stream incrementally.
+
+    Every event is flushed through the compressor as it is produced, so the
+    client receives it without waiting for more data.
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        """
+        Args:
+            encoding: 'br', 'gzip' or None (see negotiate_encoding)
+        """
+        self.encoding = encoding if STREAM_COMPRESSION else None
+        if self.encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif self.encoding == 'gzip':
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        else:
+            self._compressor = None
+
+    def headers(self) -> dict:
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        if self.encoding:
+            headers['Content-Encoding'] = self.encoding
+            headers['Vary'] = 'Accept-Encoding'
+        return headers
+
+    def event(self, payload: Any) -> bytes:
+        """A `data:` event carrying payload as JSON"""
+        return self._write(b'data: ' + dumps(payload) + b'\n\n')
+
+    def comment(self, text: str) -> bytes:
+        """An SSE comment line (used for heartbeats)"""
+        return self._write(f": {text}\n\n".encode())
+
+    def close(self) -> bytes:
+        """Remaining compressed bytes that end the stream"""
+        if self._compressor is None:
+            return b''
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+    def _write(self, data):
+        if self._compressor is None:
+            return data
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
@@ -0,0 +1,241 @@
+"""
+Result Pages - Server-side filtering, sorting and cursor pagination
+
+A search request can ask for a filtered, sorted page of its results instead of
+every offer:
+
+    {
+        "origins": ["DEN"], "destinations": ["ANY"], "departureDate": "2025-06-15",
+        "filters": {"nonstop": true, "gowildEligible": true, "blackoutFree": true,
+                    "maxPrice": 150, "departAfter": "06:00", "departBefore": "12:00"},
+        "sort": "price",
+        "pageSize": 50
+    }
+
+The response carries an opaque nextCursor; posting {"cursor": ...} returns the
+following page. Pages are cut from the cached result set, so follow-up pages
+and re-sorts never call Amadeus. Filtering and sorting run on a FlightColumns
+view of the cached offers, which is built once per result set and reused.
+"""
+from collections import OrderedDict
+import base64
+import json
+import os
+import threading
+from typing import Optional, Tuple
+
+from flight_columns import SORT_KEYS, FlightColumns
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', '500'))
+
+# Request filter names -> FlightColumns.filter arguments
+FILTER_ARGUMENTS = {
+    'nonstop': 'nonstop',
+    'gowildEligible': 'gowild_eligible',
+    'blackoutFree': 'blackout_free',
+    'maxPrice': 'max_price',
+    'departAfter': 'depart_after',
+    'departBefore': 'depart_before'
+}
+
+
+class CursorError(ValueError):
+    """The cursor is malformed or carries a query parse_query would reject"""
+
+
+def _parse_clock(value, name):
+    """'HH:MM' (24-hour) to minutes after midnight"""
+    try:
+        hours, minutes = str(value).split(':')
+        hours, minutes = int(hours), int(minutes)
+    except ValueError:
+        raise ValueError(f"{name} must be HH:MM")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"{name} must be HH:MM")
+    return hours * 60 + minutes
+
+
+def parse_query(data: dict) -> Optional[dict]:
+    """
+    Read filter, sort and page size options from a search request body.
+
+    Args:
+        data: Request JSON
+
+    Returns:
+        Normalized query dict ({'filters', 'sort', 'page_size'}), or None if the
+        request did not ask for paging (the full result set is returned as before)
+
+    Raises:
+        ValueError: Invalid filter, sort key or page size
+    """
+    if not any(key in data for key in ('filters', 'sort', 'pageSize')):
+        return None
+
+    raw_filters = data.get('filters') or {}
+    if not isinstance(raw_filters, dict):
+        raise ValueError("filters must be an object")
+
+    filters = {}
+    for name, value in raw_filters.items():
+        if name not in FILTER_ARGUMENTS:
+            raise ValueError(f"Unknown filter '{name}' (expected one of {', '.join(FILTER_ARGUMENTS)})")
+        if value is None or value is False:
+            continue
+        if name == 'maxPrice':
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError("maxPrice must be a number")
+        elif name in ('departAfter', 'departBefore'):
+            value = _parse_clock(value, name)
+        else:
+            value = bool(value)
+        filters[FILTER_ARGUMENTS[name]] = value
+
+    sort = data.get('sort') or 'price'
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort '{sort}' (expected one of {', '.join(SORT_KEYS)})")
+
+    try:
+        page_size = int(data.get('pageSize') or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("pageSize must be an integer")
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"pageSize must be between 1 and {MAX_PAGE_SIZE}")
+
+    return {'filters': filters, 'sort': sort, 'page_size': page_size}
+
+
+def encode_cursor(cache_key: str, query: dict, offset: int, version: Optional[str] = None) -> str:
+    payload = json.dumps({'k': cache_key, 'q': query, 'o': offset, 'v': version},
+                         separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _request_options(query):
+    """A normalized query back in request form, so parse_query can re-check it"""
+    filter_names = {argument: name for name, argument in FILTER_ARGUMENTS.items()}
+    filters = {}
+    for argument, value in query['filters'].items():
+        name = filter_names[argument]
+        if name in ('departAfter', 'departBefore') and isinstance(value, int) and not isinstance(value, bool):
+            value = f"{value // 60:02d}:{value % 60:02d}"
+        filters[name] = value
+    return {'filters': filters, 'sort': query['sort'], 'pageSize': query['page_size']}
+
+
+def decode_cursor(cursor: str) -> Tuple[str, dict, int, Optional[str]]:
+    """
+    Returns:
+        Tuple of (cache_key, query, offset, version), where version identifies
+        the result set the cursor was cut from
+
+    Raises:
+        CursorError: Malformed cursor, or a query parse_query would reject
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cache_key, query, offset, version = payload['k'], payload['q'], payload['o'], payload.get('v')
+        options = _request_options(query)
+        valid = (isinstance(cache_key, str) and isinstance(offset, int) and offset >= 0
+                 and set(query) == {'filters', 'sort', 'page_size'})
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise CursorError("Invalid cursor")
+
+    try:
+        normalized = parse_query(options)
+    except ValueError as e:
+        raise CursorError(f"Invalid cursor: {e}")
+    # The query must be exactly what parse_query would have produced for its options
+    if not valid or json.dumps(normalized, sort_keys=True) != json.dumps(query, sort_keys=True):
+        raise CursorError("Invalid cursor")
+    return cache_key, query, offset, version
+
+
+class ResultPager:
+    """
+    Cuts filtered, sorted pages out of cached result sets.
+
+    Keeps the FlightColumns view of recently paged result sets and the row
+    order of recent queries, keyed by cache key and checked against the
+    identity of the cached flights list, so a refreshed cache entry is never
+    paged with a stale view.
+    """
+
+    def __init__(self, max_result_sets: int = 32, max_queries: int = 128):
+        self.max_result_sets = max_result_sets
+        self.max_queries = max_queries
+        self._columns = OrderedDict()  # cache key -> (flights, FlightColumns)
+        self._queries = OrderedDict()  # (cache key, query key) -> (flights, row indexes)
+        self._lock = threading.Lock()
+
+    def page(self, cache_key: str, flights: list, query: dict, offset: int = 0,
+             version: Optional[str] = None) -> dict:
+        """
+        One page of a cached result set.
+
+        Args:
+            cache_key: Search cache key the flights are stored under
+            flights: The cached flights (FlightRecords or dicts)
+            query: Normalized query from parse_query or decode_cursor
+            offset: Index of the first matching offer to return
+            version: Identifies this result set (its cache timestamp); carried
+                in nextCursor so a later page is never cut from a refreshed set
+
+        Returns:
+            Dict with the page's flights and total, totalUnfiltered, sort,
+            pageSize, offset and nextCursor (None on the last page)
+        """
+        rows = self._rows(cache_key, flights, query)
+        page_size = query['page_size']
+        end = offset + page_size
+        return {
+            'flights': [flights[row] for row in rows[offset:end]],
+            'total': len(rows),
+            'totalUnfiltered': len(flights),
+            'sort': query['sort'],
+            'pageSize': page_size,
+            'offset': offset,
+            'nextCursor': encode_cursor(cache_key, query, end, version) if end < len(rows) else None
+        }
+
+    def _rows(self, cache_key, flights, query):
+        query_key = (cache_key, json.dumps(query, sort_keys=True))
+        with self._lock:
+            cached = self._queries.get(query_key)
+            if cached is not None and cached[0] is flights:
+                self._queries.move_to_end(query_key)
+                return cached[1]
+
+        columns = self._get_columns(cache_key, flights)
+        rows = columns.sort(columns.filter(**query['filters']), key=query['sort'])
+
+        with self._lock:
+            self._queries[query_key] = (flights, rows)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return rows
+
+    def _get_columns(self, cache_key, flights):
+        with self._lock:
+            cached = self._columns.get(cache_key)
+            if cached is not None and cached[0] is flights:
+                self._columns.move_to_end(cache_key)
+                return cached[1]
+
+        columns = FlightColumns.from_flights(flights)
+        with self._lock:
+            self._columns[cache_key] = (flights, columns)
+            while len(self._columns) > self.max_result_sets:
+                self._columns.popitem(last=False)
+        return columns
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'result_sets': len(self._columns),
+                'queries': len(self._queries)
+            }
@@ -0,0 +1,241 @@
+"""
+Route Network - Persisted index of the airports Frontier (F9) flies between
+
+"ANY" searches used to fan out to a fixed list of popular airports from every
+origin, including pairs Frontier does not fly; each of those still cost an
+Amadeus call and its share of the rate limit. The route network index records
+which destinations are served from each origin so those pairs are skipped, and
+it backs GET /api/destinations.
+
+The index is a JSON file (ROUTE_NETWORK_FILE, default route_network.json next
+to this module) loaded at startup. Build or refresh it offline:
+
+    python route_network.py --from-api                # Amadeus airline + airport routes APIs
+    python route_network.py --from-store fares.db     # routes seen in cached search results
+
+Both sources can be combined; --merge keeps the routes already in the file.
+"""
+from datetime import datetime
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROUTE_NETWORK_FILE = os.path.join(BACKEND_DIR, 'route_network.json')
+
+AIRLINE_CODE = 'F9'
+
+
+class RouteNetwork:
+    """
+    Destinations served from each origin, plus airport details for the network.
+
+    File format:
+        {
+            "airline": "F9",
+            "generated_at": "2025-06-01T12:00:00",
+            "sources": ["api"],
+            "airports": {"DEN": {"name": "DENVER INTERNATIONAL", "city": "DENVER", "country": "US"}},
+            "routes": {"DEN": ["ATL", "LAS", "MCO"]}
+        }
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Iterable[str]]] = None, airports: Optional[Dict[str, dict]] = None,
+                 generated_at: Optional[str] = None, sources: Optional[List[str]] = None):
+        self.routes = {origin: frozenset(destinations) for origin, destinations in (routes or {}).items()}
+        self.airports = dict(airports or {})
+        self.generated_at = generated_at
+        self.sources = list(sources or [])
+
+    @classmethod
+    def load(cls, path: str) -> 'RouteNetwork':
+        """
+        Raises:
+            OSError: File missing or unreadable
+            ValueError: Not a route network file
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not isinstance(data.get('routes'), dict):
+            raise ValueError(f"{path} is not a route network file")
+        return cls(data['routes'], data.get('airports'), data.get('generated_at'), data.get('sources'))
+
+    def save(self, path: str) -> None:
+        data = {
+            'airline': AIRLINE_CODE,
+            'generated_at': self.generated_at,
+            'sources': self.sources,
+            'airports': dict(sorted(self.airports.items())),
+            'routes': {origin: sorted(destinations) for origin, destinations in sorted(self.routes.items())}
+        }
+        # Write then rename so a running app never reads a half-written file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, path)
+
+    def serves(self, origin: str, destination: str) -> bool:
+        """
+        True if the route is flown, or if the origin is not in the index.
+
+        Unknown origins are never pruned, so a stale or partial index only
+        costs the calls it would have saved.
+        """
+        destinations = self.routes.get(origin)
+        return destinations is None or destination in destinations
+
+    def destinations(self, origin: Optional[str] = None) -> List[str]:
+        """Destinations served from an origin, or every airport in the network"""
+        if origin is not None:
+            return sorted(self.routes.get(origin, ()))
+        served = set(self.routes)
+        for destinations in self.routes.values():
+            served.update(destinations)
+        return sorted(served)
+
+    def airport(self, code: str) -> dict:
+        details = self.airports.get(code, {})
+        return {
+            'code': code,
+            'name': details.get('name'),
+            'city': details.get('city'),
+            'country': details.get('country')
+        }
+
+    def merge(self, other: 'RouteNetwork') -> 'RouteNetwork':
+        routes = {origin: set(destinations) for origin, destinations in self.routes.items()}
+        for origin, destinations in other.routes.items():
+            routes.setdefault(origin, set()).update(destinations)
+        return RouteNetwork(
+            routes,
+            {**self.airports, **other.airports},
+            other.generated_at or self.generated_at,
+            sorted(set(self.sources) | set(other.sources))
+        )
+
+    def stats(self) -> dict:
+        return {
+            'generated_at': self.generated_at,
+            'sources': self.sources,
+            'origins': len(self.routes),
+            'routes': sum(len(destinations) for destinations in self.routes.values())
+        }
+
+
+def load_route_network(path: Optional[str] = None) -> Optional[RouteNetwork]:
+    """
+    Load the index from path (defaults to ROUTE_NETWORK_FILE).
+
+    Runs at app import, so its messages go to stderr and stay out of the
+    stdout of tools that import the app (e.g. benchmark.py's JSON report).
+
+    Returns:
+        The RouteNetwork, or None if no index has been built yet or it cannot be read
+    """
+    path = path or os.environ.get('ROUTE_NETWORK_FILE', DEFAULT_ROUTE_NETWORK_FILE)
+    try:
+        network = RouteNetwork.load(path)
+    except FileNotFoundError:
+        print(f"No route network at {path}; ANY searches use the popular destinations list unpruned", file=sys.stderr)
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not load route network from {path}: {e}", file=sys.stderr)
+        return None
+    print(f"Loaded route network from {path}: {network.stats()['routes']} routes", file=sys.stderr)
+    return network
+
+
+def build_from_api(client, origins: Optional[List[str]] = None, scheduler=None) -> RouteNetwork:
+    """
+    Build the index from the Amadeus airline destinations and airport routes APIs.
+
+    The airline destinations API lists every airport F9 serves; each origin's
+    direct destinations (all airlines) are intersected with that set.
+
+    Args:
+        client: amadeus.Client
+        origins: Origins to index (defaults to every F9 airport)
+        scheduler: Optional CallScheduler to stay within the rate limit
+    """
+    def call(fn):
+        return scheduler.call(fn, 'background') if scheduler is not None else fn()
+
+    response = call(lambda: client.airline.destinations.get(airlineCode=AIRLINE_CODE, max=500))
+    airports = {}
+    for location in response.data or []:
+        code = location.get('iataCode')
+        if code:
+            airports[code] = {
+                'name': location.get('name'),
+                'city': (location.get('address') or {}).get('cityName'),
+                'country': (location.get('address') or {}).get('countryCode')
+            }
+    served = set(airports)
+
+    routes = {}
+    for origin in origins or sorted(served):
+        response = call(lambda: client.airport.direct_destinations.get(departureAirportCode=origin, max=500))
+        direct = {location.get('iataCode') for location in response.data or []}
+        routes[origin] = (direct & served) - {origin}
+        print(f"{origin}: {len(routes[origin])} F9 destinations")
+
+    return RouteNetwork(routes, airports, datetime.now().isoformat(timespec='seconds'), ['api'])
+
+
+def build_from_store(store) -> RouteNetwork:
+    """
+    Build the index from pair results cached in a SQLiteFareStore.
+
+    Any pair that returned at least one Frontier offer (nonstop or connecting)
+    counts as served.
+    """
+    routes = {}
+    for key, json_text in store.iter_prefix('pair:'):
+        origin, destination = key[len('pair:'):].split('_')[:2]
+        try:
+            has_offers = bool(json.loads(json_text))
+        except ValueError:
+            continue
+        if has_offers:
+            routes.setdefault(origin, set()).add(destination)
+    return RouteNetwork(routes, generated_at=datetime.now().isoformat(timespec='seconds'), sources=['store'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the Frontier route network index')
+    parser.add_argument('--output', default=os.environ.get('ROUTE_NETWORK_FILE', DEFAULT_ROUTE_NETWORK_FILE))
+    parser.add_argument('--from-api', action='store_true', help='Query the Amadeus airline and airport routes APIs')
+    parser.add_argument('--origins', help='Comma-separated origins to index with --from-api (default: every F9 airport)')
+    parser.add_argument('--from-store', metavar='DB', help='Add routes seen in a FARE_CACHE_DB fare store')
+    parser.add_argument('--merge', action='store_true', help='Keep the routes already in the output file')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    if not args.from_api and not args.from_store:
+        parser.error('choose at least one source: --from-api and/or --from-store')
+
+    network = RouteNetwork()
+    if args.merge and os.path.exists(args.output):
+        network = RouteNetwork.load(args.output)
+
+    if args.from_api:
+        from amadeus_transport import build_client
+        from call_scheduler import CallScheduler
+        client = build_client(os.environ.get('AMADEUS_API_KEY'), os.environ.get('AMADEUS_API_SECRET'))
+        origins = [code.strip().upper() for code in args.origins.split(',')] if args.origins else None
+        network = network.merge(build_from_api(client, origins, CallScheduler()))
+
+    if args.from_store:
+        from fare_store import SQLiteFareStore
+        network = network.merge(build_from_store(SQLiteFareStore(args.from_store)))
+
+    network.save(args.output)
+    print(json.dumps(network.stats()))
+
+
+if __name__ == '__main__':
+    main()
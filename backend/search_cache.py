@@ -0,0 +1,343 @@
+"""
+Search Cache - Bounded in-memory cache for flight search results
+
+Entries expire after a TTL and the cache is capped both by entry count and by
+an approximate byte size. Least recently used entries are evicted first. An
+optional persistent store (see fare_store.py) can sit behind the in-memory
+tier so entries are shared across processes and survive restarts.
+
+With a stale grace window (stale_seconds), expired entries are kept that much
+longer so callers can serve them while a fresh value is fetched
+(stale-while-revalidate, see get_with_age).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+from flight_record import json_default
+
+
+def _encode_default(value):
+    """FlightRecords in their JSON format, anything else unknown as a string"""
+    try:
+        return json_default(value)
+    except TypeError:
+        return str(value)
+
+
+class _CacheEntry:
+    """A single cached value with its expiry and approximate size"""
+
+    __slots__ = ('value', 'expires_at', 'size', 'created_at')
+
+    def __init__(self, value, expires_at, size, created_at):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.created_at = created_at
+
+
+class SearchCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and entry/byte limits.
+
+    Expired entries are removed on access and by a periodic sweep, so memory
+    does not grow with keys that are never requested again. Hit, miss,
+    eviction and expiration counters are maintained as operations happen,
+    which keeps stats() constant time.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1000,
+                 max_bytes: int = 256 * 1024 * 1024, sweep_interval: float = 60.0,
+                 backing_store=None, decoder: Optional[Callable[[Any], Any]] = None,
+                 stale_seconds: float = 0):
+        """
+        Args:
+            ttl_seconds: Default time-to-live for entries
+            max_entries: Maximum number of entries kept
+            max_bytes: Approximate maximum total size of cached values
+            sweep_interval: Seconds between proactive sweeps of expired entries
+            backing_store: Optional persistent store (e.g. SQLiteFareStore); memory
+                misses fall through to it and every set() is written through
+            decoder: Optional function applied to values loaded from the backing
+                store (e.g. to rebuild FlightRecords from their JSON form)
+            stale_seconds: Grace window after expiry during which get_with_age
+                still returns an entry (flagged stale); get() never does
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.backing_store = backing_store
+        self.decoder = decoder
+        self.stale_seconds = max(0.0, stale_seconds)
+
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._store_hits = 0
+        self._stale_hits = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        found = self._lookup(key, allow_stale=False)
+        return found[0] if found is not None else None
+
+    def get_with_age(self, key: str) -> Optional[Tuple[Any, float, bool]]:
+        """
+        Look up a cached value, including one expired less than stale_seconds ago.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (value, age_seconds, stale), or None if missing or past the
+            grace window. stale is True once the entry's TTL has passed.
+        """
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key, allow_stale):
+        now = time.monotonic()
+        stale_entry = None
+        self._maybe_sweep(now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry.value, self._age(entry), False
+
+                if entry.expires_at + self.stale_seconds > now:
+                    # Within the grace window: kept for stale-tolerant callers
+                    stale_entry = entry
+                else:
+                    self._remove(key)
+                    self._expirations += 1
+
+            if self.backing_store is None:
+                return self._stale_or_miss(stale_entry, allow_stale)
+
+        # Fall through to the persistent tier outside the lock (disk I/O); another
+        # process may have refreshed an entry that is stale here
+        record = self.backing_store.get(key)
+        if record is not None:
+            json_text, expires_at = record
+            # The store keeps entries through the grace window (see set())
+            remaining = expires_at - self.stale_seconds - time.time()
+            if remaining > 0 or (allow_stale and stale_entry is None):
+                value = json.loads(json_text)
+                if self.decoder is not None:
+                    value = self.decoder(value)
+                # Assumes the default TTL; the store does not record per-entry TTLs
+                created_at = datetime.now() - timedelta(seconds=max(0.0, self.ttl_seconds - remaining))
+                with self._lock:
+                    # Promote into the hot tier with whatever TTL the stored entry has left
+                    self._insert(key, value, len(json_text), remaining, created_at)
+                    self._store_hits += 1
+                    if remaining > 0:
+                        self._hits += 1
+                    else:
+                        self._stale_hits += 1
+                return value, (datetime.now() - created_at).total_seconds(), remaining <= 0
+
+        with self._lock:
+            return self._stale_or_miss(stale_entry, allow_stale)
+
+    def _stale_or_miss(self, stale_entry, allow_stale):
+        """Under the lock: the stale entry for stale-tolerant callers, else a miss"""
+        if stale_entry is not None and allow_stale:
+            self._stale_hits += 1
+            return stale_entry.value, self._age(stale_entry), True
+        self._misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least recently used entries if over a limit.
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value to cache
+            ttl_seconds: Optional TTL overriding the cache default
+        """
+        json_text = self._encode(value)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+
+        self._maybe_sweep(time.monotonic())
+        with self._lock:
+            self._insert(key, value, len(json_text), ttl)
+
+        if self.backing_store is not None:
+            self.backing_store.set(key, json_text, time.time() + ttl + self.stale_seconds)
+
+    def ttl_remaining(self, key: str) -> Optional[float]:
+        """
+        Seconds until a key expires, without counting as a hit or miss.
+
+        Returns:
+            Remaining TTL in seconds, or None if the key is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                remaining = entry.expires_at - time.monotonic()
+                if remaining > 0:
+                    return remaining
+
+        if self.backing_store is not None:
+            record = self.backing_store.get(key)
+            if record is not None:
+                remaining = record[1] - self.stale_seconds - time.time()
+                if remaining > 0:
+                    return remaining
+        return None
+
+    def delete(self, key: str) -> bool:
+        """Remove a key; returns True if it was present in memory"""
+        if self.backing_store is not None:
+            self.backing_store.delete(key)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self) -> None:
+        """Remove every entry, including the backing store (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+        if self.backing_store is not None:
+            self.backing_store.clear()
+
+    def sweep_expired(self) -> int:
+        """
+        Remove every expired entry.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry.expires_at + self.stale_seconds <= now]
+            for key in expired:
+                self._remove(key)
+            self._expirations += len(expired)
+            self._last_sweep = now
+        # Outside the lock: purging is a disk write lookups shouldn't wait on
+        if self.backing_store is not None:
+            self.backing_store.purge_expired()
+        return len(expired)
+
+    def start_sweeper(self) -> None:
+        """Start a daemon thread that sweeps expired entries every sweep_interval"""
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._stop_sweeper.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='search-cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Stop the background sweeper thread if running"""
+        self._stop_sweeper.set()
+        with self._lock:
+            self._sweeper = None
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary of entry/byte totals and hit, miss, eviction and expiration counters
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'total_entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'store_hits': self._store_hits,
+                'stale_hits': self._stale_hits,
+                'stale_seconds': self.stale_seconds,
+                'persistent': self.backing_store is not None
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.monotonic()
+
+    def _insert(self, key, value, size, ttl, created_at=None):
+        """Insert under the lock, then evict LRU entries until within limits"""
+        if key in self._entries:
+            self._remove(key)
+
+        # A value larger than the whole budget would just flush everything else
+        if size > self.max_bytes or ttl + self.stale_seconds <= 0:
+            return
+
+        self._entries[key] = _CacheEntry(value, time.monotonic() + ttl, size, created_at or datetime.now())
+        self._total_bytes += size
+
+        while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    @staticmethod
+    def _age(entry):
+        return (datetime.now() - entry.created_at).total_seconds()
+
+    def _maybe_sweep(self, now):
+        """Sweep if one is due; called without the lock held, since the store purge does disk I/O"""
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            # Claim this sweep so concurrent callers don't all run it
+            self._last_sweep = now
+        self.sweep_expired()
+
+    def _sweep_loop(self):
+        while not self._stop_sweeper.wait(self.sweep_interval):
+            removed = self.sweep_expired()
+            if removed:
+                print(f"Search cache sweep removed {removed} expired entries")
+
+    @staticmethod
+    def _encode(value):
+        """JSON-encode a value; its length doubles as the approximate memory cost"""
+        return json.dumps(value, default=_encode_default)
@@ -0,0 +1,238 @@
+"""
+Single Flight - Coalesce identical concurrent work onto one in-flight call
+
+The first caller for a key does the work; callers arriving while it is still
+running wait for (or, for streams, subscribe to) the same result instead of
+repeating it.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Iterator, Optional, Tuple
+
+
+class _Call:
+    """An in-flight call and the outcome its waiters share"""
+
+    __slots__ = ('done', 'result', 'error', 'context')
+
+    def __init__(self, context=None):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.context = context
+
+
+class Broadcast:
+    """
+    An append-only event log that any number of subscribers can replay and follow.
+
+    Subscribers that join late first receive every event already published, so
+    all of them see the same sequence.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def publish(self, event: Any) -> None:
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def subscribe(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Yield every event from the start, then new ones until the broadcast closes.
+
+        Args:
+            timeout: If set, yield None after this many idle seconds (for heartbeats)
+        """
+        index = 0
+        while True:
+            with self._cond:
+                if index >= len(self._events) and not self._closed:
+                    self._cond.wait(timeout)
+                batch = self._events[index:]
+                index += len(batch)
+                finished = self._closed and index >= len(self._events)
+
+            if batch:
+                yield from batch
+            elif finished:
+                return
+            else:
+                yield None
+
+            if finished:
+                return
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    Counters track how many calls actually ran (leaders) and how many callers
+    were served by someone else's in-flight call (coalesced waiters).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any], context: Any = None,
+           on_join: Optional[Callable[[Any], None]] = None) -> Tuple[Any, bool]:
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the work
+            fn: Zero-argument callable doing the work
+            context: Kept with the call if this caller leads it
+            on_join: Called with the leader's context if this caller joins an
+                in-flight call, before waiting (e.g. to raise its priority)
+
+        Returns:
+            Tuple of (result, shared) where shared is True if this caller waited
+            on another caller's in-flight call. Exceptions from fn are re-raised
+            in every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call(context)
+                self._calls[key] = call
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            if on_join is not None:
+                on_join(call.context)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stream(self, key: str, producer: Callable[[Callable[[Any], None]], None],
+               thread_name: str = 'singleflight-producer') -> Tuple[Broadcast, bool]:
+        """
+        Join (or start) a streaming call for a key.
+
+        The first caller starts producer(publish) on a background thread; every
+        caller, including the first, consumes the returned Broadcast.
+
+        Args:
+            key: Identity of the work
+            producer: Callable receiving a publish(event) function
+            thread_name: Name for the producer thread
+
+        Returns:
+            Tuple of (broadcast, shared) where shared is True for followers
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is not None:
+                self._coalesced += 1
+                return broadcast, True
+
+            broadcast = Broadcast()
+            self._streams[key] = broadcast
+            self._leaders += 1
+
+        def run():
+            try:
+                producer(broadcast.publish)
+            finally:
+                # New requests after this point start a fresh call (or hit the cache)
+                with self._lock:
+                    del self._streams[key]
+                broadcast.close()
+
+        threading.Thread(target=run, name=thread_name, daemon=True).start()
+        return broadcast, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls) + len(self._streams),
+                'leaders': self._leaders,
+                'coalesced_waiters': self._coalesced
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight.do for the ASGI search path.
+
+    The work runs as its own task, so a caller that goes away (e.g. a client
+    disconnect cancelling its request) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._contexts = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], context: Any = None,
+                 on_join: Optional[Callable[[Any], None]] = None) -> Tuple[Any, bool]:
+        """
+        Await fn() once for all concurrent callers with the same key.
+
+        context and on_join work as in SingleFlight.do.
+
+        Returns:
+            Tuple of (result, shared) where shared is True if this caller joined
+            a call already in flight
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self._coalesced += 1
+            if on_join is not None:
+                on_join(self._contexts.get(key))
+        else:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            self._contexts[key] = context
+            self._leaders += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            self._contexts.pop(key, None)
+        # Mark the exception retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': len(self._tasks),
+            'leaders': self._leaders,
+            'coalesced_waiters': self._coalesced
+        }
@@ -52,6 +52,23 @@ def test_blackout_dates():
     next_date = GoWildBlackoutDates.get_next_available_date('2025-12-25')
     print(f"   Next available: {next_date}")
 
+    # Test 8: Bulk classification
+    print("\n8. Classify a Week Around July 4th, 2025:")
+    week = ['2025-07-01', '2025-07-02', '2025-07-03', '2025-07-04', '2025-07-07', '2025-07-08']
+    classified = GoWildBlackoutDates.classify_dates(week)
+    for date_str, (is_blackout, reason) in zip(week, classified):
+        print(f"   {date_str}: {'BLACKOUT - ' + reason if is_blackout else 'available'}")
+    expected = [
+        (False, None),
+        (False, None),
+        (True, 'Independence Day Weekend'),
+        (True, 'Independence Day Weekend'),
+        (True, 'Independence Day Weekend'),
+        (False, None),
+    ]
+    assert classified == expected, classified
+    assert classified == [GoWildBlackoutDates.is_blackout_date(d) for d in week]
+
     print("\n" + "=" * 60)
     print("Testing Complete!")
     print("=" * 60)
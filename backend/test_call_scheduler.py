@@ -0,0 +1,97 @@
+"""
+Test script for the priority call scheduler in front of Amadeus
+"""
+import threading
+import time
+from call_scheduler import CallScheduler
+
+def test_call_scheduler():
+    """Test that queued callers are granted tokens by priority class, then arrival"""
+
+    print("=" * 60)
+    print("Call Scheduler Testing")
+    print("=" * 60)
+
+    # Test 1: Queued callers are served interactive, then planner, then background
+    print("\n1. Testing priority ordering under the rate limit:")
+    scheduler = CallScheduler(rate_per_second=10, burst=1)
+    scheduler.acquire('interactive')  # Drain the bucket so everyone below queues
+
+    granted = []
+    granted_lock = threading.Lock()
+
+    def call(name, priority):
+        scheduler.acquire(priority)
+        with granted_lock:
+            granted.append(name)
+
+    arrivals = [
+        ('background-1', 'background'),
+        ('planner-1', 'planner'),
+        ('background-2', 'background'),
+        ('interactive-1', 'interactive'),
+        ('planner-2', 'planner'),
+        ('interactive-2', 'interactive')
+    ]
+    threads = []
+    for name, priority in arrivals:
+        thread = threading.Thread(target=call, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)  # Queue in this order, well before the next token
+    for thread in threads:
+        thread.join()
+
+    print(f"   Grant order: {granted}")
+    assert granted == ['interactive-1', 'interactive-2', 'planner-1', 'planner-2', 'background-1', 'background-2']
+
+    # Test 2: Waits and queue depths are recorded per class
+    print("\n2. Testing per-class metrics:")
+    stats = scheduler.stats()
+    print(f"   Granted: { {priority: stats['classes'][priority]['granted'] for priority in stats['classes']} }")
+    assert stats['classes']['interactive']['granted'] == 3
+    assert stats['classes']['background']['max_queue_depth'] == 2
+    assert stats['classes']['background']['max_wait_ms'] > stats['classes']['interactive']['max_wait_ms']
+
+    # Test 3: Unknown classes are rejected; a rate of 0 never waits
+    print("\n3. Testing unknown priority and disabled rate limiting:")
+    try:
+        scheduler.acquire('urgent')
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"   Rejected: {e}")
+    unlimited = CallScheduler(rate_per_second=0)
+    waited = sum(unlimited.acquire('background') for _ in range(100))
+    print(f"   100 unlimited calls waited {waited * 1000:.1f}ms")
+    assert waited < 0.05
+
+    # Test 4: A queued ticket promoted to interactive jumps the planner queue
+    print("\n4. Testing ticket promotion while queued:")
+    scheduler = CallScheduler(rate_per_second=10, burst=1)
+    scheduler.acquire('interactive')
+    granted = []
+    ticket = scheduler.ticket('background')
+
+    def ticketed():
+        scheduler.acquire(ticket=ticket)
+        with granted_lock:
+            granted.append('background-promoted')
+
+    threads = [threading.Thread(target=ticketed)]
+    threads += [threading.Thread(target=call, args=(f"planner-{index}", 'planner')) for index in (1, 2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)
+    assert scheduler.promote(ticket, 'interactive') and not scheduler.promote(ticket, 'planner')
+    for thread in threads:
+        thread.join()
+    print(f"   Grant order: {granted}")
+    assert granted == ['background-promoted', 'planner-1', 'planner-2']
+    assert scheduler.stats()['classes']['interactive']['granted'] == 2
+
+    print("\n" + "=" * 60)
+    print("Testing Complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    test_call_scheduler()
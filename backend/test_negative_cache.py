@@ -0,0 +1,105 @@
+"""
+Test script for negative caching of empty and failed route pairs
+"""
+import amadeus_api
+from amadeus_api import AmadeusFlightSearch
+from amadeus_transport import make_response_error
+from search_cache import SearchCache
+
+class ScriptedTransport:
+    """Flight offers transport that raises the queued errors, then returns no offers"""
+
+    mode = 'scripted'
+
+    def __init__(self):
+        self.errors = []
+        self.calls = 0
+
+    def search_flight_offers(self, params):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return []
+
+def test_negative_cache():
+    """Test backoff doubling and its cap, Retry-After, and what is never cached"""
+
+    print("=" * 60)
+    print("Negative Cache Testing")
+    print("=" * 60)
+
+    error_ttl = amadeus_api.NEGATIVE_CACHE_ERROR_TTL
+    max_ttl = amadeus_api.NEGATIVE_CACHE_ERROR_MAX_TTL
+    transport = ScriptedTransport()
+    client = AmadeusFlightSearch('key', 'secret', max_concurrency=1, transport=transport,
+                                 pair_cache=SearchCache(ttl_seconds=3600))
+    key = client.pair_cache_key('DEN', 'MCO', '2025-10-15')
+
+    def search():
+        return client.search_flights(['DEN'], ['MCO'], '2025-10-15')
+
+    # Test 1: Consecutive transient failures double the backoff up to the cap
+    print("\n1. Testing backoff doubling and cap:")
+    ttls = []
+    while len(ttls) < 8:
+        transport.errors.append(make_response_error(503))
+        assert search() == []
+        assert client.negative_reason(key) == 'error'
+        ttls.append(round(client.pair_cache.ttl_remaining(key)))
+        client.pair_cache.delete(key)  # Let the backoff lapse so the next search retries
+    expected = [min(error_ttl * 2 ** failures, max_ttl) for failures in range(8)]
+    print(f"   Backoff TTLs: {ttls}")
+    assert ttls == [round(ttl) for ttl in expected] and ttls[-1] == round(max_ttl)
+
+    # Test 2: While backing off, searches are answered from the cache
+    print("\n2. Testing upstream calls avoided during backoff:")
+    transport.errors.append(make_response_error(500))
+    search()
+    calls = transport.calls
+    assert search() == [] and search() == []
+    stats = client.negative_cache_stats()
+    print(f"   Upstream calls: {transport.calls - calls}, avoided: {stats['upstream_calls_avoided']}")
+    assert transport.calls == calls and stats['upstream_calls_avoided'] >= 2
+
+    # Test 3: A success resets the failure count; Retry-After raises the first TTL
+    print("\n3. Testing reset after success and Retry-After:")
+    client.pair_cache.delete(key)
+    search()  # No offers: cached as empty, which ends the error streak
+    assert client.negative_reason(key) == 'empty'
+    assert round(client.pair_cache.ttl_remaining(key)) == round(amadeus_api.NEGATIVE_CACHE_EMPTY_TTL)
+    client.pair_cache.delete(key)
+    throttled = make_response_error(429)
+    throttled.response.headers = {'Retry-After': str(error_ttl * 3)}
+    transport.errors.append(throttled)
+    search()
+    ttl = client.pair_cache.ttl_remaining(key)
+    print(f"   First failure after an empty result: {ttl:.0f}s (Retry-After {error_ttl * 3:.0f}s)")
+    assert round(ttl) == round(min(error_ttl * 3, max_ttl))
+
+    # Test 4: Invalid requests are not cached
+    print("\n4. Testing 4xx errors are not cached:")
+    other = client.pair_cache_key('DEN', 'LAS', '2025-10-15')
+    transport.errors.append(make_response_error(400))
+    client.search_flights(['DEN'], ['LAS'], '2025-10-15')
+    print(f"   Cached after 400: {client.pair_cache.get(other) is not None}")
+    assert client.pair_cache.get(other) is None and client.negative_cache_stats()['errors_not_cached'] == 1
+
+    # Test 5: Searches record failed pairs and the soonest their backoff lapses
+    print("\n5. Testing failed pairs in search stats:")
+    client.pair_cache.clear()
+    client.negative_pairs.clear()
+    transport.errors.append(make_response_error(503))
+    stats = {}
+    client.search_flights(['DEN'], ['MCO', 'LAS'], '2025-10-16', stats=stats)
+    print(f"   Failed: {stats['pairs_failed']}, retry after: {stats['retry_after']:.0f}s")
+    assert stats['pairs_failed'] == 1 and round(stats['retry_after']) == round(error_ttl)
+    stats = {}
+    client.search_flights(['DEN'], ['LAS'], '2025-10-16', stats=stats)
+    assert stats['pairs_failed'] == 0 and stats['retry_after'] is None
+
+    print("\n" + "=" * 60)
+    print("Testing Complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    test_negative_cache()
@@ -0,0 +1,83 @@
+"""
+Test script for the bounded search cache
+"""
+import os
+import tempfile
+import time
+from search_cache import SearchCache
+from fare_store import SQLiteFareStore
+
+def test_search_cache():
+    """Test LRU eviction, byte limits, TTL expiry and counters"""
+
+    print("=" * 60)
+    print("Search Cache Testing")
+    print("=" * 60)
+
+    # Test 1: LRU eviction by entry count
+    print("\n1. Testing LRU eviction (max 2 entries):")
+    cache = SearchCache(ttl_seconds=60, max_entries=2)
+    cache.set('a', {'flights': [1]})
+    cache.set('b', {'flights': [2]})
+    cache.get('a')  # 'a' is now most recently used
+    cache.set('c', {'flights': [3]})
+    print(f"   Keys kept: a={'a' in cache}, b={'b' in cache}, c={'c' in cache}")
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.stats()['evictions'] == 1
+
+    # Test 2: Byte limit
+    print("\n2. Testing byte limit (max 100 bytes):")
+    cache = SearchCache(ttl_seconds=60, max_bytes=100)
+    cache.set('small', 'x' * 40)
+    cache.set('other', 'y' * 40)
+    cache.set('third', 'z' * 40)
+    cache.set('huge', 'x' * 500)
+    stats = cache.stats()
+    print(f"   Entries: {stats['total_entries']}, bytes: {stats['total_bytes']}")
+    assert stats['total_bytes'] <= 100
+    assert 'huge' not in cache and 'small' not in cache
+
+    # Test 3: TTL expiry and sweep
+    print("\n3. Testing TTL expiry:")
+    cache = SearchCache(ttl_seconds=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl_seconds=60)
+    time.sleep(0.1)
+    removed = cache.sweep_expired()
+    print(f"   Swept {removed} expired entries, {len(cache)} left")
+    assert removed == 1 and cache.get('b') == 2
+
+    # Test 4: Hit/miss counters
+    print("\n4. Testing hit/miss counters:")
+    cache.get('b')
+    cache.get('missing')
+    stats = cache.stats()
+    print(f"   Hits: {stats['hits']}, misses: {stats['misses']}, expirations: {stats['expirations']}")
+    assert stats['hits'] == 2 and stats['misses'] == 1 and stats['expirations'] == 1
+
+    # Test 5: Persistent tier survives a fresh in-memory cache
+    print("\n5. Testing SQLite fare store tier:")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteFareStore(os.path.join(tmp, 'fares.db'))
+        SearchCache(ttl_seconds=60, backing_store=store).set('DEN_MCO', {'flights': [1, 2]})
+        restarted = SearchCache(ttl_seconds=60, backing_store=store)
+        value = restarted.get('DEN_MCO')
+        print(f"   Value after restart: {value}, store hits: {restarted.stats()['store_hits']}")
+        assert value == {'flights': [1, 2]} and 'DEN_MCO' in restarted
+
+        # Test 6: An inline sweep purges the store without holding the cache lock
+        print("\n6. Testing store purge runs outside the cache lock:")
+        purges = []
+        swept = SearchCache(ttl_seconds=60, sweep_interval=0, backing_store=store)
+        store.purge_expired = lambda: purges.append(swept._lock._is_owned())
+        swept.get('DEN_MCO')
+        swept.set('DEN_LAS', {'flights': []})
+        print(f"   Purges: {len(purges)}, lock held during purge: {any(purges)}")
+        assert purges and not any(purges)
+
+    print("\n" + "=" * 60)
+    print("Testing Complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    test_search_cache()
@@ -0,0 +1,127 @@
+"""
+Test script for single-flight request coalescing and stream broadcasts
+"""
+import threading
+import time
+from singleflight import Broadcast, SingleFlight
+
+def test_singleflight():
+    """Test that identical concurrent calls run once and late subscribers replay every event"""
+
+    print("=" * 60)
+    print("Single Flight Testing")
+    print("=" * 60)
+
+    # Test 1: Concurrent callers with the same key share one call
+    print("\n1. Testing do() coalescing:")
+    flight = SingleFlight()
+    runs = []
+    results = []
+    started = threading.Event()
+
+    def search():
+        runs.append(1)
+        started.set()
+        time.sleep(0.1)
+        return ['DEN->MCO']
+
+    def caller():
+        results.append(flight.do('DEN_MCO', search))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    shared = sorted(was_shared for _, was_shared in results)
+    print(f"   Calls run: {len(runs)}, shared results: {shared.count(True)}")
+    assert len(runs) == 1 and shared == [False, True, True, True, True]
+    assert all(result == ['DEN->MCO'] for result, _ in results)
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced_waiters': 4}
+
+    # Test 2: The leader's exception is raised in every waiter; the next call runs fresh
+    print("\n2. Testing error propagation:")
+    errors = []
+    started.clear()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('upstream down')
+
+    def failing_caller():
+        try:
+            flight.do('DEN_LAS', failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=failing_caller) for _ in range(3)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"   Errors: {errors}")
+    assert errors == ['upstream down'] * 3
+    assert flight.do('DEN_LAS', lambda: 'recovered') == ('recovered', False)
+
+    # Test 3: A late subscriber replays past events, then follows new ones
+    print("\n3. Testing Broadcast replay:")
+    broadcast = Broadcast()
+    broadcast.publish('DEN->MCO')
+    broadcast.publish('DEN->LAS')
+    late = broadcast.subscribe()
+    assert [next(late), next(late)] == ['DEN->MCO', 'DEN->LAS']
+    broadcast.publish('DEN->MIA')
+    broadcast.close()
+    rest = list(late)
+    replayed = list(broadcast.subscribe())
+    print(f"   Late subscriber: {rest}, after close: {replayed}")
+    assert rest == ['DEN->MIA'] and replayed == ['DEN->MCO', 'DEN->LAS', 'DEN->MIA']
+
+    # Test 4: Idle subscribers get None heartbeats while the broadcast is open
+    print("\n4. Testing heartbeat timeouts:")
+    idle = Broadcast()
+    events = idle.subscribe(timeout=0.01)
+    heartbeat = next(events)
+    print(f"   Idle event: {heartbeat}")
+    assert heartbeat is None
+    idle.publish('done')
+    idle.close()
+    assert list(events) == ['done']
+
+    # Test 5: Streams with the same key share one producer; followers see every event
+    print("\n5. Testing stream() coalescing:")
+    producers = []
+    release = threading.Event()
+
+    def produce(publish):
+        producers.append(1)
+        publish(('route', 'DEN->MCO'))
+        release.wait()
+        publish(('done', 1))
+
+    leader, leader_shared = flight.stream('stream:DEN', produce)
+    time.sleep(0.05)  # The first route is already published when the follower joins
+    follower, follower_shared = flight.stream('stream:DEN', produce)
+    release.set()
+    leader_events, follower_events = list(leader.subscribe()), list(follower.subscribe())
+    print(f"   Producers: {len(producers)}, follower events: {follower_events}")
+    assert follower is leader and not leader_shared and follower_shared
+    assert len(producers) == 1 and leader_events == follower_events == [('route', 'DEN->MCO'), ('done', 1)]
+
+    # Once the stream finishes, the same key starts a new producer
+    time.sleep(0.05)
+    _, shared_again = flight.stream('stream:DEN', lambda publish: publish(('done', 0)))
+    assert not shared_again
+
+    print("\n" + "=" * 60)
+    print("Testing Complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    test_singleflight()
@@ -0,0 +1,96 @@
+"""
+Test script for serving expired searches stale while one background refresh runs
+"""
+import threading
+import time
+import app
+from search_cache import SearchCache
+
+def test_stale_while_revalidate():
+    """Test that concurrent stale hits start exactly one refresh and then see its results"""
+
+    print("=" * 60)
+    print("Stale-While-Revalidate Testing")
+    print("=" * 60)
+
+    search = (['DEN'], ['MCO'], '2025-10-15', None, 'one-way')
+    cache_key = app.get_cache_key(*search)
+
+    refreshes = []
+    release = threading.Event()
+
+    def slow_mock_flights(origins, destinations, departure_date, return_date=None):
+        refreshes.append(departure_date)
+        release.wait(5)
+        return [{'origin': 'DEN', 'destination': 'MCO', 'price': 42.0}]
+
+    # Refreshes generate mock flights instead of calling Amadeus; the shared app
+    # module is restored afterwards so later tests see its real cache and mocks
+    originals = (app.DEV_MODE, app.cache, app.generate_mock_flights)
+    app.DEV_MODE = True
+    app.cache = SearchCache(ttl_seconds=0.2, stale_seconds=60)
+    app.generate_mock_flights = slow_mock_flights
+    try:
+        # Test 1: A fresh hit is served without revalidating
+        print("\n1. Testing fresh hit:")
+        version = app.cache_results(cache_key, [{'origin': 'DEN', 'destination': 'MCO', 'price': 99.0}])
+        flights, fields, hit_version = app.cached_search(cache_key, *search)
+        print(f"   Fields: {fields}")
+        assert fields == {'cached': True} and hit_version == version and not refreshes
+
+        # Test 2: Concurrent stale hits are all served immediately; one refresh starts
+        print("\n2. Testing concurrent stale hits:")
+        time.sleep(0.3)
+        hits = []
+        threads = [threading.Thread(target=lambda: hits.append(app.cached_search(cache_key, *search))) for _ in range(8)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        time.sleep(0.05)  # Let the background thread reach the refresh
+        print(f"   {len(hits)} stale hits in {elapsed * 1000:.0f}ms, refreshes started: {len(refreshes)}")
+        assert len(hits) == 8 and all(fields['stale'] and flights[0]['price'] == 99.0 for flights, fields, _ in hits)
+        assert len(refreshes) == 1 and cache_key in app.revalidating
+
+        # Test 3: Another stale hit while the refresh runs does not start a second one
+        print("\n3. Testing stale hit during the refresh:")
+        assert app.cached_search(cache_key, *search)[1]['stale']
+        assert not app.revalidate_search(cache_key, *search)
+        assert len(refreshes) == 1
+
+        # Test 4: Once the refresh lands, hits are fresh and carry the new version
+        print("\n4. Testing results after the refresh:")
+        release.set()
+        for _ in range(100):
+            if cache_key not in app.revalidating:
+                break
+            time.sleep(0.01)
+        flights, fields, new_version = app.cached_search(cache_key, *search)
+        print(f"   Price: {flights[0]['price']}, fields: {fields}, refreshes: {len(refreshes)}")
+        assert flights[0]['price'] == 42.0 and fields == {'cached': True}
+        assert new_version != version and len(refreshes) == 1
+
+        # Test 5: Past the grace window the entry is a miss (the caller searches synchronously)
+        print("\n5. Testing past the stale grace window:")
+        app.cache = SearchCache(ttl_seconds=0.05, stale_seconds=0.05)
+        app.cache_results(cache_key, [{'origin': 'DEN', 'destination': 'MCO', 'price': 99.0}])
+        time.sleep(0.15)
+        print(f"   Hit: {app.cached_search(cache_key, *search)}")
+        assert app.cached_search(cache_key, *search) is None and len(refreshes) == 1
+    finally:
+        # Let any refresh finish writing to the test cache before swapping it back
+        release.set()
+        for _ in range(500):
+            if cache_key not in app.revalidating:
+                break
+            time.sleep(0.01)
+        app.DEV_MODE, app.cache, app.generate_mock_flights = originals
+
+    print("\n" + "=" * 60)
+    print("Testing Complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    test_stale_while_revalidate()
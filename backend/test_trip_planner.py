@@ -0,0 +1,149 @@
+"""
+Test script for pairing one-way legs into round trips (trip planner legs mode)
+"""
+from datetime import datetime
+from gowild_blackout import GoWildBlackoutDates
+from trip_planner import find_optimal_trips, pair_one_way_legs
+
+def one_way(origin, destination, date, departs, arrives, arrival_date=None, price=50.0,
+            currency='USD', gowild=False, stops=0, seats=9):
+    """A one-way offer in the app's flight format (times as 'HH:MM AM')"""
+    return {
+        'origin': origin,
+        'destination': destination,
+        'departure_date': date,
+        'departure_time': departs,
+        'arrival_date': arrival_date or date,
+        'arrival_time': arrives,
+        'duration': '3h 0m',
+        'airline': 'F9',
+        'flight_number': f"F9 {origin}{departs}",
+        'stops': stops,
+        'aircraft': '320',
+        'booking_class': 'V',
+        'price': price,
+        'currency': currency,
+        'is_round_trip': False,
+        'seats_remaining': seats,
+        'gowild_eligible': gowild
+    }
+
+def round_trip(outbound, inbound):
+    """The round trip pair_one_way_legs should build, for find_optimal_trips"""
+    return {
+        **outbound,
+        'is_round_trip': True,
+        'return_flight': {key: inbound[key] for key in (
+            'origin', 'destination', 'departure_date', 'departure_time', 'arrival_date',
+            'arrival_time', 'duration', 'airline', 'flight_number', 'stops', 'aircraft', 'booking_class')},
+        'price': round(outbound['price'] + inbound['price'], 2),
+        'total_price': round(outbound['price'] + inbound['price'], 2)
+    }
+
+def local_time(date, time):
+    return datetime.strptime(f"{date} {time}", '%Y-%m-%d %I:%M %p')
+
+def trip_key(trip):
+    return (trip['departure_date'], trip['departure_time'], trip['return_flight']['departure_date'],
+            trip['return_flight']['departure_time'], trip['price'], trip['duration_match_score'])
+
+def test_trip_planner():
+    """Test window edges, currency and GoWild handling, and ranking against find_optimal_trips"""
+
+    print("=" * 60)
+    print("Trip Planner Leg Pairing Testing")
+    print("=" * 60)
+
+    outbound = one_way('DEN', 'MCO', '2025-10-15', '08:00 AM', '01:00 PM')
+
+    # Test 1: A return leg leaving the minute the outbound lands is paired
+    print("\n1. Testing return departing at the outbound arrival:")
+    same_minute = one_way('MCO', 'DEN', '2025-10-15', '01:00 PM', '03:00 PM')
+    too_early = one_way('MCO', 'DEN', '2025-10-15', '12:59 PM', '02:59 PM')
+    trips = pair_one_way_legs([outbound], [too_early, same_minute])
+    print(f"   Paired return departures: {[trip.return_flight.departure_time for trip in trips]}")
+    assert [trip.return_flight.departure_time for trip in trips] == ['01:00 PM']
+
+    # Test 2: max_hours keeps a trip of exactly max_hours and drops one a minute longer
+    print("\n2. Testing the max trip duration boundary:")
+    exact = one_way('MCO', 'DEN', '2025-10-16', '05:00 AM', '08:00 AM')
+    over = one_way('MCO', 'DEN', '2025-10-16', '05:01 AM', '08:01 AM')
+    trips = pair_one_way_legs([outbound], [exact, over], max_hours=24)
+    print(f"   Paired return arrivals: {[trip.return_flight.arrival_time for trip in trips]}")
+    assert [trip.return_flight.arrival_time for trip in trips] == ['08:00 AM']
+    ranked = find_optimal_trips([round_trip(outbound, exact), round_trip(outbound, over)], 1, max_duration=24, max_duration_unit='hours')
+    assert [trip['return_flight']['arrival_time'] for trip in ranked] == ['08:00 AM']
+
+    # Test 3: The departure window ends max_hours plus the time zone slack after
+    # the outbound leaves (arrival times are made up so only the window decides)
+    print("\n3. Testing the departure window's max_hours + slack edge:")
+    at_edge = one_way('MCO', 'DEN', '2025-10-16', '08:00 PM', '08:00 AM', arrival_date='2025-10-16')
+    past_edge = one_way('MCO', 'DEN', '2025-10-16', '08:01 PM', '08:00 AM', arrival_date='2025-10-16')
+    trips = pair_one_way_legs([outbound], [at_edge, past_edge], max_hours=24)
+    print(f"   Paired return departures: {[trip.return_flight.departure_time for trip in trips]}")
+    assert [trip.return_flight.departure_time for trip in trips] == ['08:00 PM']
+
+    # Test 4: Legs priced in different currencies are never summed
+    print("\n4. Testing currency mismatch:")
+    euro = one_way('MCO', 'DEN', '2025-10-18', '10:00 AM', '12:00 PM', currency='EUR')
+    dollar = one_way('MCO', 'DEN', '2025-10-18', '11:00 AM', '01:00 PM')
+    trips = pair_one_way_legs([outbound], [euro, dollar])
+    print(f"   Paired currencies: {[trip.currency for trip in trips]}")
+    assert [trip.currency for trip in trips] == ['USD']
+
+    # Test 5: GoWild needs both legs eligible; blackout covers both travel dates
+    print("\n5. Testing GoWild eligibility and blackout dates on paired trips:")
+    july_out = one_way('DEN', 'MCO', '2025-07-01', '08:00 AM', '01:00 PM', price=39.0, gowild=True, seats=4)
+    july_back = one_way('MCO', 'DEN', '2025-07-04', '09:00 AM', '11:00 AM', price=61.5, gowild=True, seats=2)
+    july_back_paid = one_way('MCO', 'DEN', '2025-07-04', '10:00 AM', '12:00 PM', price=80.0)
+    both, one = pair_one_way_legs([july_out], [july_back, july_back_paid])
+    expected_blackout = GoWildBlackoutDates.is_flight_affected_by_blackout('2025-07-01', '2025-07-04')
+    print(f"   GoWild: {both.gowild_eligible}/{one.gowild_eligible}, blackout: {both.blackout_dates['has_blackout']}")
+    assert both.gowild_eligible and not one.gowild_eligible
+    assert both.blackout_dates == expected_blackout and expected_blackout['has_blackout']
+    assert both.price == both.total_price == 100.5 and both.seats_remaining == 2
+
+    # Test 6: Ranking paired legs matches find_optimal_trips on every valid pairing
+    print("\n6. Testing ranking against find_optimal_trips:")
+    hours = ['06:00 AM', '09:00 AM', '01:00 PM', '05:00 PM', '08:00 PM']
+    arrivals = ['09:00 AM', '12:00 PM', '04:00 PM', '08:00 PM', '11:00 PM']
+    outbound_legs = [
+        one_way('DEN', 'MCO', f"2025-10-{day}", departs, arrives, price=30 + 7 * index, stops=index % 2)
+        for day in (15, 16)
+        for index, (departs, arrives) in enumerate(zip(hours, arrivals))
+    ]
+    inbound_legs = [
+        one_way('MCO', 'DEN', f"2025-10-{day}", departs, arrives, price=25 + 5 * index, stops=(index + 1) % 2)
+        for day in (17, 18, 19, 15)
+        for index, (departs, arrives) in enumerate(zip(hours, arrivals))
+    ]
+    for options in ({}, {'nonstop_preferred': True}, {'max_duration': 80, 'max_duration_unit': 'hours'}):
+        # Every return leaving after the outbound lands, in the same order pair_one_way_legs visits them
+        ordered_inbound = sorted(inbound_legs, key=lambda leg: local_time(leg['departure_date'], leg['departure_time']))
+        every_pair = [
+            round_trip(out, back) for out in outbound_legs for back in ordered_inbound
+            if local_time(back['departure_date'], back['departure_time'])
+            >= local_time(out['arrival_date'], out['arrival_time'])
+        ]
+        expected = [trip_key(trip) for trip in find_optimal_trips(every_pair, 3, **options)]
+
+        max_hours = options.get('max_duration')
+        paired = pair_one_way_legs(outbound_legs, inbound_legs, max_hours)
+        ranked = [trip_key(trip) for trip in find_optimal_trips(paired, 3, **options)]
+        print(f"   {options or 'defaults'}: {len(ranked)} trips, same ranking: {ranked == expected}")
+        assert ranked == expected
+
+        # Capped: a subset, and the best scores are unchanged
+        capped = pair_one_way_legs(outbound_legs, inbound_legs, max_hours, target_hours=72,
+                                   nonstop_preferred=options.get('nonstop_preferred', False), max_per_outbound=3)
+        capped_ranked = [trip_key(trip) for trip in find_optimal_trips(capped, 3, **options)]
+        print(f"   capped at 3 per outbound: {len(capped_ranked)} trips")
+        assert len(capped) <= 3 * len(outbound_legs) and set(capped_ranked) <= set(expected)
+        assert [key[-1] for key in capped_ranked[:3]] == [key[-1] for key in expected[:3]]
+
+    print("\n" + "=" * 60)
+    print("Testing Complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    test_trip_planner()
@@ -1,13 +1,158 @@
 """
 Trip Planner - Find optimal flight combinations based on desired trip length
 """
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
+import heapq
+from flight_columns import INVALID_TIME, epoch_minutes
+from flight_record import FlightRecord
+from gowild_blackout import GoWildBlackoutDates
+from metrics import STAGE_SECONDS
 
 def calculate_trip_duration_hours(outbound_depart, return_arrive):
     """Calculate trip duration in hours between two datetime objects"""
     duration = return_arrive - outbound_depart
     return duration.total_seconds() / 3600
 
+def _to_hours(value, unit):
+    """Convert a number of hours or days to hours"""
+    return float(value) * (24 if unit == 'days' else 1)
+
+def _with_metadata(flight, metadata):
+    """Materialize an offer (dict or FlightRecord) with its scoring metadata added"""
+    if isinstance(flight, FlightRecord):
+        return {**flight.to_dict(), **metadata}
+    return {**flight, **metadata}
+
+def _score_flight(flight, target_hours, max_hours, nonstop_preferred):
+    """
+    Score a single round-trip offer against the target duration
+
+    Returns:
+        Dict of scoring metadata, or None if the offer does not qualify
+    """
+    try:
+        # Parse departure and return times
+        depart_str = f"{flight['departure_date']} {flight['departure_time']}"
+        return_str = f"{flight['return_flight']['arrival_date']} {flight['return_flight']['arrival_time']}"
+
+        # Handle both 12-hour and 24-hour formats
+        for fmt in ['%Y-%m-%d %I:%M %p', '%Y-%m-%d %H:%M']:
+            try:
+                depart_dt = datetime.strptime(depart_str, fmt)
+                return_dt = datetime.strptime(return_str, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            # If no format worked, skip this flight
+            return None
+
+        # Calculate actual trip duration
+        actual_hours = calculate_trip_duration_hours(depart_dt, return_dt)
+
+        # Filter out trips exceeding max duration
+        if max_hours and actual_hours > max_hours:
+            return None  # Skip this flight
+
+        # Calculate how far off from target (lower is better)
+        duration_diff = abs(actual_hours - target_hours)
+
+        # Apply nonstop preference bonus
+        nonstop_bonus = 0
+        if nonstop_preferred:
+            outbound_nonstop = flight.get('stops', 0) == 0
+            return_nonstop = flight['return_flight'].get('stops', 0) == 0
+
+            if outbound_nonstop and return_nonstop:
+                nonstop_bonus = -10  # Both nonstop = highest priority
+            elif outbound_nonstop or return_nonstop:
+                nonstop_bonus = -5   # One nonstop = medium priority
+            else:
+                nonstop_bonus = 5    # No nonstop = lower priority
+
+        # Calculate final score (lower is better)
+        score = duration_diff + nonstop_bonus
+
+        return {
+            'trip_duration_hours': round(actual_hours, 2),
+            'trip_duration_display': format_duration_display(actual_hours),
+            'duration_match_score': score,
+            'duration_diff_hours': round(duration_diff, 2)
+        }
+
+    except (KeyError, ValueError) as e:
+        # Skip flights with parsing errors
+        print(f"Error processing flight: {e}")
+        return None
+
+class IncrementalTripScorer:
+    """
+    Maintains a ranking of round-trip offers as new batches arrive
+
+    Only offers passed to add() are parsed and scored; they are merged into the
+    existing ranking, so scoring a multi-day search costs O(n log n) overall
+    instead of re-scoring the cumulative list after every day.
+    """
+
+    def __init__(self, trip_length, trip_length_unit='days', nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
+        """
+        Args:
+            trip_length: Desired length of trip (number)
+            trip_length_unit: 'hours' or 'days'
+            nonstop_preferred: Boolean - prefer nonstop flights when available
+            max_duration: Optional maximum trip duration (number)
+            max_duration_unit: Unit for max_duration ('hours' or 'days')
+        """
+        self.target_hours = _to_hours(trip_length, trip_length_unit)
+        self.max_hours = _to_hours(max_duration, max_duration_unit) if max_duration else None
+        self.nonstop_preferred = nonstop_preferred
+
+        self._ranked = []  # (score, arrival order, flight, scoring metadata)
+        self._added = 0
+        self._results = []
+
+    def add(self, flights):
+        """
+        Score a new batch of offers and merge it into the ranking
+
+        Args:
+            flights: List of flight offers (one-way offers are ignored)
+
+        Returns:
+            Number of offers from this batch that qualified
+        """
+        with STAGE_SECONDS.labels('trip_scoring').time():
+            return self._add(flights)
+
+    def _add(self, flights):
+        batch = []
+        for flight in flights:
+            if not flight.get('is_round_trip'):
+                continue
+
+            metadata = _score_flight(flight, self.target_hours, self.max_hours, self.nonstop_preferred)
+            if metadata is not None:
+                batch.append((metadata['duration_match_score'], self._added, flight, metadata))
+                self._added += 1
+
+        if batch:
+            # Ties keep arrival order, matching a stable sort over the cumulative list
+            self._ranked.extend(batch)
+            self._ranked.sort(key=lambda entry: (entry[0], entry[1]))
+            self._results = None
+
+        return len(batch)
+
+    def results(self):
+        """Get the ranked offers as dicts with scoring metadata, best matches first"""
+        if self._results is None:
+            self._results = [_with_metadata(entry[2], entry[3]) for entry in self._ranked]
+        return self._results
+
+    def __len__(self):
+        return len(self._ranked)
+
 def find_optimal_trips(flights, trip_length, trip_length_unit='days', nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
     """
     Find flight combinations that best match the desired trip length
@@ -23,86 +168,194 @@ def find_optimal_trips(flights, trip_length, trip_length_unit='days', nonstop_pr
     Returns:
         List of flight combinations sorted by how close they match desired duration
     """
-    # Convert trip length to hours
-    target_hours = float(trip_length) * (24 if trip_length_unit == 'days' else 1)
-
-    # Convert max duration to hours if provided
-    max_hours = None
-    if max_duration:
-        max_hours = float(max_duration) * (24 if max_duration_unit == 'days' else 1)
-
-    # Filter for round trips only
-    round_trip_flights = [f for f in flights if f.get('is_round_trip')]
-
-    if not round_trip_flights:
-        return []
-
-    # Calculate how close each flight is to target duration
-    scored_flights = []
-    for flight in round_trip_flights:
-        try:
-            # Parse departure and return times
-            depart_str = f"{flight['departure_date']} {flight['departure_time']}"
-            return_str = f"{flight['return_flight']['arrival_date']} {flight['return_flight']['arrival_time']}"
-
-            # Handle both 12-hour and 24-hour formats
-            for fmt in ['%Y-%m-%d %I:%M %p', '%Y-%m-%d %H:%M']:
-                try:
-                    depart_dt = datetime.strptime(depart_str, fmt)
-                    return_dt = datetime.strptime(return_str, fmt)
-                    break
-                except ValueError:
-                    continue
-            else:
-                # If no format worked, skip this flight
-                continue
+    scorer = IncrementalTripScorer(
+        trip_length,
+        trip_length_unit=trip_length_unit,
+        nonstop_preferred=nonstop_preferred,
+        max_duration=max_duration,
+        max_duration_unit=max_duration_unit
+    )
+    scorer.add(flights)
+    return list(scorer.results())
+
+# The max_hours window compares the outbound departure (origin time) with the
+# return departure (destination time); the slack covers the time zone gap and
+# the scorer applies the exact limit
+PAIRING_SLACK_MINUTES = 12 * 60
 
-            # Calculate actual trip duration
-            actual_hours = calculate_trip_duration_hours(depart_dt, return_dt)
-
-            # Filter out trips exceeding max duration
-            if max_hours and actual_hours > max_hours:
-                continue  # Skip this flight
-
-            # Calculate how far off from target (lower is better)
-            duration_diff = abs(actual_hours - target_hours)
-
-            # Apply nonstop preference bonus
-            nonstop_bonus = 0
-            if nonstop_preferred:
-                outbound_nonstop = flight.get('stops', 0) == 0
-                return_nonstop = flight['return_flight'].get('stops', 0) == 0
-
-                if outbound_nonstop and return_nonstop:
-                    nonstop_bonus = -10  # Both nonstop = highest priority
-                elif outbound_nonstop or return_nonstop:
-                    nonstop_bonus = -5   # One nonstop = medium priority
-                else:
-                    nonstop_bonus = 5    # No nonstop = lower priority
-
-            # Calculate final score (lower is better)
-            score = duration_diff + nonstop_bonus
-
-            # Add metadata
-            flight_with_score = {
-                **flight,
-                'trip_duration_hours': round(actual_hours, 2),
-                'trip_duration_display': format_duration_display(actual_hours),
-                'duration_match_score': score,
-                'duration_diff_hours': round(duration_diff, 2)
-            }
-
-            scored_flights.append(flight_with_score)
-
-        except (KeyError, ValueError) as e:
-            # Skip flights with parsing errors
-            print(f"Error processing flight: {e}")
+def _as_record(flight):
+    return flight if isinstance(flight, FlightRecord) else FlightRecord.from_dict(flight)
+
+def _combine_legs(outbound, inbound, blackouts):
+    """A round-trip record made of two one-way offers"""
+    dates = (outbound.leg.departure_date, inbound.leg.departure_date)
+    blackout_info = blackouts.get(dates)
+    if blackout_info is None:
+        blackout_info = GoWildBlackoutDates.is_flight_affected_by_blackout(*dates)
+        blackouts[dates] = blackout_info
+
+    price = round(outbound.price + inbound.price, 2)
+    seats = [seats for seats in (outbound.seats_remaining, inbound.seats_remaining) if seats is not None]
+    return FlightRecord(
+        outbound.leg,
+        price,
+        outbound.currency,
+        is_round_trip=True,
+        return_flight=inbound.leg,
+        total_price=price,
+        seats_remaining=min(seats) if seats else None,
+        gowild_eligible=bool(outbound.gowild_eligible and inbound.gowild_eligible),
+        blackout_dates=blackout_info
+    )
+
+def pair_one_way_legs(outbound, inbound, max_hours=None, target_hours=None, nonstop_preferred=False,
+                      max_per_outbound=None):
+    """
+    Combine one-way outbound and inbound offers into round-trip offers
+
+    Inbound legs are sorted by departure time once per route. For each
+    outbound leg a bisect finds the first inbound leg leaving after it lands,
+    and the window ends at the last one that can still return within
+    max_hours. Candidates over max_hours are dropped before any record is
+    built, and with target_hours and max_per_outbound only the inbound legs
+    that score best against the target (as find_optimal_trips scores them)
+    are paired with each outbound leg.
+
+    Args:
+        outbound: One-way offers (FlightRecords or flight dicts) from the origins
+        inbound: One-way offers back to the origins
+        max_hours: Optional maximum trip duration in hours
+        target_hours: Optional desired trip duration in hours, used to pick the
+            best candidates when max_per_outbound is set
+        nonstop_preferred: Apply the scorer's nonstop bonus when picking candidates
+        max_per_outbound: Optional cap on round trips built per outbound leg
+
+    Returns:
+        Round-trip FlightRecords for find_optimal_trips / IncrementalTripScorer,
+        with prices summed and GoWild eligibility only if both legs are eligible
+    """
+    routes = {}
+    for flight in inbound:
+        if flight.get('is_round_trip'):
+            continue
+        flight = _as_record(flight)
+        departs = epoch_minutes(flight.leg.departure_date, flight.leg.departure_time)
+        arrives = epoch_minutes(flight.leg.arrival_date, flight.leg.arrival_time)
+        if departs != INVALID_TIME and arrives != INVALID_TIME:
+            routes.setdefault((flight.leg.origin, flight.leg.destination), []).append((departs, arrives, flight))
+
+    # Stable sort keeps the search order among legs leaving at the same minute
+    windows = {}
+    for route, legs in routes.items():
+        legs.sort(key=lambda entry: entry[0])
+        windows[route] = [departs for departs, _, _ in legs], legs
+
+    max_minutes = max_hours * 60 if max_hours else None
+    capped = bool(max_per_outbound) and target_hours is not None
+    blackouts = {}
+    trips = []
+    for flight in outbound:
+        if flight.get('is_round_trip'):
+            continue
+        flight = _as_record(flight)
+        leg = flight.leg
+        window = windows.get((leg.destination, leg.origin))
+        if window is None:
+            continue
+
+        departs = epoch_minutes(leg.departure_date, leg.departure_time)
+        arrives = epoch_minutes(leg.arrival_date, leg.arrival_time)
+        if departs == INVALID_TIME or arrives == INVALID_TIME:
+            continue
+
+        # Both times are local to the destination, so they compare directly
+        times, legs = window
+        start = bisect_left(times, arrives)
+        if max_minutes is not None:
+            end = bisect_right(times, departs + max_minutes + PAIRING_SLACK_MINUTES)
+        else:
+            end = len(times)
+
+        # The return arrival is local to the origin, like the outbound departure,
+        # so this is the trip duration the scorer computes
+        candidates = [
+            (return_arrives - departs, return_flight)
+            for _, return_arrives, return_flight in legs[start:end]
+            if return_flight.currency == flight.currency
+            and (max_minutes is None or return_arrives - departs <= max_minutes)
+        ]
+        if capped and len(candidates) > max_per_outbound:
+            # Score each candidate as _score_flight would (lower is better) and
+            # keep the best, still in departure order
+            outbound_nonstop = leg.stops == 0
+            scores = []
+            for position, (trip_minutes, return_flight) in enumerate(candidates):
+                score = abs(trip_minutes / 60 - target_hours)
+                if nonstop_preferred:
+                    score += (5, -5, -10)[outbound_nonstop + (return_flight.leg.stops == 0)]
+                scores.append((score, position))
+            keep = sorted(position for _, position in heapq.nsmallest(max_per_outbound, scores))
+            candidates = [candidates[position] for position in keep]
+
+        for _, return_flight in candidates:
+            trips.append(_combine_legs(flight, return_flight, blackouts))
+    return trips
+
+def find_optimal_trips_columnar(columns, trip_length, trip_length_unit='days', nonstop_preferred=False, max_duration=None, max_duration_unit='days'):
+    """
+    Same ranking as find_optimal_trips, computed on a FlightColumns container
+
+    Durations come from precomputed epoch-minute columns, so no datetimes are
+    parsed; only the ranked rows are materialized as dicts.
+
+    Args:
+        columns: FlightColumns holding the offers
+        (remaining arguments as for find_optimal_trips)
+
+    Returns:
+        List of flight combinations sorted by how close they match desired duration
+    """
+    target_hours = _to_hours(trip_length, trip_length_unit)
+    max_hours = _to_hours(max_duration, max_duration_unit) if max_duration else None
+    out_stops, in_stops = columns.outbound.stops, columns.inbound.stops
+
+    ranked = []
+    for row in range(len(columns)):
+        trip_minutes = columns.trip_minutes(row)
+        if trip_minutes is None:
+            continue
+
+        actual_hours = trip_minutes * 60 / 3600
+        if max_hours and actual_hours > max_hours:
             continue
 
-    # Sort by score (best matches first)
-    scored_flights.sort(key=lambda x: x['duration_match_score'])
+        duration_diff = abs(actual_hours - target_hours)
+
+        nonstop_bonus = 0
+        if nonstop_preferred:
+            outbound_nonstop = out_stops[row] == 0
+            return_nonstop = in_stops[row] == 0
+            if outbound_nonstop and return_nonstop:
+                nonstop_bonus = -10
+            elif outbound_nonstop or return_nonstop:
+                nonstop_bonus = -5
+            else:
+                nonstop_bonus = 5
+
+        ranked.append((duration_diff + nonstop_bonus, row, actual_hours, duration_diff))
+
+    ranked.sort(key=lambda entry: (entry[0], entry[1]))
 
-    return scored_flights
+    trips = []
+    for score, row, actual_hours, duration_diff in ranked:
+        trips.append({
+            **columns.to_dict(row),
+            'trip_duration_hours': round(actual_hours, 2),
+            'trip_duration_display': format_duration_display(actual_hours),
+            'duration_match_score': score,
+            'duration_diff_hours': round(duration_diff, 2)
+        })
+    return trips
 
 def format_duration_display(hours):
     """Format duration in hours to friendly display"""